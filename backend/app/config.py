@@ -1,7 +1,7 @@
 import os
 from pathlib import Path
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Dict, List
 from dotenv import load_dotenv
 
 # Explicitly load .env from the backend directory
@@ -33,14 +33,116 @@ class Settings(BaseSettings):
     OPENROUTER_BASE_URL: str = "https://openrouter.ai/api/v1"
     OPENROUTER_VISION_MODEL: str = "qwen/qwen2.5-vl-32b-instruct:free"  # Vision-capable model
     OPENROUTER_AGENT_MODEL: str = "qwen/qwen2.5-vl-32b-instruct:free"  # Model for agent
-    
+
+    # Shared outbound HTTP client (connection pool reused across requests)
+    HTTP_CLIENT_HTTP2: bool = True
+    HTTP_CLIENT_MAX_CONNECTIONS: int = 100
+    HTTP_CLIENT_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_CLIENT_KEEPALIVE_EXPIRY_SECONDS: float = 60.0
+    HTTP_CLIENT_TIMEOUT_SECONDS: float = 120.0
+    HTTP_CLIENT_CONNECT_TIMEOUT_SECONDS: float = 10.0
+    HTTP_CLIENT_POOL_TIMEOUT_SECONDS: float = 30.0
+
+    # Vision result cache (keyed on image hash + model + prompt version)
+    VISION_CACHE_ENABLED: bool = True
+    VISION_CACHE_MAX_ENTRIES: int = 1024
+    VISION_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
+    VISION_CACHE_DISK_PATH: str = ""  # e.g. "data/vision_cache.db"; empty disables the disk tier
+    VISION_CACHE_DISK_MAX_ENTRIES: int = 50000
+
+    # Perceptual-hash near-duplicate detection (re-encoded/resized re-uploads)
+    PHASH_ENABLED: bool = True
+    PHASH_MAX_DISTANCE: int = 3  # Hamming distance out of 64 bits
+    PHASH_MAX_COLOUR_DIFF: int = 24  # Per RGB channel (0-255) of the 2x2 colour signature
+    PHASH_INDEX_MAX_ENTRIES: int = 10000
+
+    # Upload ingestion
+    MAX_UPLOAD_BYTES: int = 15 * 1024 * 1024
+    UPLOAD_CHUNK_BYTES: int = 64 * 1024
+
+    # Batch analysis (/api/analyze-items)
+    VISION_BATCH_MAX_ITEMS: int = 50
+    VISION_BATCH_CONCURRENCY: int = 8
+
+    # Vision completions: stream and stop reading once the analysis object is
+    # complete; output that goes off-schema is abandoned and retried
+    VISION_STREAMING: bool = True
+    VISION_MAX_ATTEMPTS: int = 2
+    # Send a JSON schema derived from AnalysisResult as response_format, with a
+    # compact prompt; needs a model whose provider supports structured outputs
+    VISION_STRUCTURED_OUTPUT: bool = False
+
+    # Prompt registry: <name>.v<N>.txt files read once at startup; the highest
+    # version of each is used unless pinned here, e.g. {"vision_system": 1}
+    PROMPTS_DIR: str = str(Path(__file__).parent / "data" / "prompts")
+    PROMPT_VERSIONS: Dict[str, int] = {}
+    # Model prefixes whose providers need an explicit cache_control breakpoint to
+    # cache the static system prompt; OpenAI, DeepSeek and others cache it unasked
+    PROMPT_CACHE_CONTROL_MODELS: List[str] = ["anthropic/", "google/gemini"]
+
+    # Background job queue (/api/analyze-item?async=true)
+    JOB_QUEUE_DB_PATH: str = "data/jobs.db"
+    JOB_QUEUE_WORKERS: int = 4
+    JOB_QUEUE_POLL_SECONDS: float = 2.0
+    JOB_RESULT_TTL_SECONDS: int = 24 * 3600
+    # A running job is re-queued once its worker has not renewed the lease for this long
+    JOB_LEASE_SECONDS: float = 60.0
+    JOB_WEBHOOK_TIMEOUT_SECONDS: float = 10.0
+    # Hosts webhooks may be sent to; empty allows any host that resolves only to public addresses
+    JOB_WEBHOOK_ALLOWED_HOSTS: List[str] = []
+
+    # Impact dashboard event log and rollups
+    IMPACT_DB_PATH: str = "data/impact.db"
+    IMPACT_RECENT_ACTIVITIES: int = 5
+    IMPACT_SNAPSHOT_REFRESH_SECONDS: float = 5.0  # Also the Cache-Control max-age
+    IMPACT_STREAM_MAX_SUBSCRIBERS: int = 10000  # Per worker
+    IMPACT_STREAM_BUFFER: int = 64  # Messages buffered per subscriber before it is dropped
+    IMPACT_STREAM_HEARTBEAT_SECONDS: float = 15.0
+
+    # Image preprocessing before upload to the vision model
+    IMAGE_PREPROCESS_ENABLED: bool = True
+    IMAGE_MAX_EDGE_PX: int = 1536
+    IMAGE_OUTPUT_FORMAT: str = "WEBP"  # WEBP or JPEG
+    IMAGE_OUTPUT_QUALITY: int = 80
+
+    # Organization drop-off points and distance-based matching
+    ORGANIZATIONS_DATA_PATH: str = str(Path(__file__).parent / "data" / "organizations.json")
+    ORG_REGISTRY_RELOAD_SECONDS: float = 5.0  # How often to check the file for changes; 0 disables
+    GEO_INDEX_CELL_DEGREES: float = 0.05  # Grid cell size, roughly 5.5 km
+    GEO_MATCH_RADIUS_KM: float = 50.0
+
+    # Match scoring weights (relative; normalized to sum to 1)
+    MATCH_WEIGHT_CATEGORY: float = 0.30
+    MATCH_WEIGHT_DISTANCE: float = 0.25
+    MATCH_WEIGHT_PICKUP: float = 0.10
+    MATCH_WEIGHT_CREDIT: float = 0.15
+    MATCH_WEIGHT_CAPACITY: float = 0.05
+    MATCH_WEIGHT_ACCEPTANCE: float = 0.15
+    MATCH_TOP_K: int = 5
+
     # Mock API settings
     MOCK_NGO_API_URL: str = "https://mock-api.ngo.example.com"
     MOCK_RECYCLING_API_URL: str = "https://mock-api.recycling.example.com"
+
+    # Partner API fan-out (POST {url}/matches on every partner concurrently)
+    PARTNER_QUERY_ENABLED: bool = False  # False uses the built-in mock matches
+    PARTNER_API_URLS: List[str] = []
+    PARTNER_TIMEOUT_SECONDS: float = 2.0
+    PARTNER_DEADLINE_SECONDS: float = 3.0
     
     # Rate limiting
     RATE_LIMIT_REQUESTS: int = 100
     RATE_LIMIT_PERIOD_SECONDS: int = 60
+    # "memory" is per worker process; "sqlite" shares counts between workers on
+    # one host, "redis" between hosts
+    RATE_LIMIT_BACKEND: str = "memory"
+    RATE_LIMIT_DB_PATH: str = "data/rate_limit.db"
+    RATE_LIMIT_REDIS_URL: str = "redis://localhost:6379/0"
+    # Longest a request waits on Redis (connect, queue and reply) before it is let through
+    RATE_LIMIT_REDIS_TIMEOUT_SECONDS: float = 0.25
+    # Separate, smaller quotas for expensive endpoints (path -> requests per period).
+    # /api/analyze-items counts images, so one full batch uses up its quota
+    RATE_LIMIT_ROUTES: Dict[str, int] = {"/api/analyze-item": 20, "/api/analyze-items": 50}
     
     class Config:
         env_file = ".env"
@@ -1,13 +1,22 @@
-from fastapi import FastAPI, Request, Response
-from fastapi.middleware.cors import CORSMiddleware
+from fastapi import FastAPI
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
+from contextlib import asynccontextmanager
 import logging
 import sys
 
-from app.routers import vision, trade, impact
+from app.routers import vision, trade, impact, metrics, jobs
 from app.config import settings
-from app.middleware.rate_limit import rate_limit_middleware
+from app.responses import ModelResponse
+from app.services.http_client import start_http_client, close_http_client
+from app.services.result_cache import vision_cache
+from app.services.job_queue import job_queue
+from app.services.impact_store import impact_store
+from app.services.agent_service import get_negotiation_graph
+from app.services.org_registry import organization_registry
+from app.services.prompt_registry import prompt_registry
+from app.middleware.edge import EdgeMiddleware
+from app.middleware.rate_limit import rate_limiter
 from app.middleware.error_handler import (
     validation_exception_handler,
     http_exception_handler,
@@ -31,10 +40,34 @@ logger.info(f"Agent Model: {settings.OPENROUTER_AGENT_MODEL}")
 logger.info(f"Base URL: {settings.OPENROUTER_BASE_URL}")
 logger.info("=" * 50)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Own application-lifetime resources: prompts, HTTP client, job workers, organization registry, negotiation graph."""
+    # Fail at startup, not on the first upload, if a prompt file or pin is missing
+    prompt_registry.load()
+    await start_http_client()
+    await job_queue.start()
+    await organization_registry.start()
+    await impact.impact_snapshot.start()
+    # Build the LLM client and compile the negotiation graph before the first trade
+    get_negotiation_graph()
+    yield
+    await impact.impact_snapshot.stop()
+    await organization_registry.stop()
+    await job_queue.stop()
+    await close_http_client()
+    vision_cache.close()
+    impact_store.close()
+    await rate_limiter.close()
+
+
 app = FastAPI(
     title="TerraSync API",
     description="Circular Economy Orchestration Platform - AI Vision & Agentic Negotiation",
     version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ModelResponse,
 )
 
 
@@ -50,47 +83,21 @@ async def debug_config():
     }
 
 
-# Add comprehensive CORS middleware to handle OPTIONS globally
-@app.middleware("http")
-async def add_cors_headers(request, call_next):
-    # Handle OPTIONS preflight requests directly
-    if request.method == "OPTIONS":
-        return Response(
-            status_code=200,
-            headers={
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-                "Access-Control-Allow-Headers": "*",
-                "Access-Control-Max-Age": "86400"  # Cache preflight for 24 hours
-            }
-        )
-    
-    response = await call_next(request)
-    
-    # Add CORS headers to all responses
-    response.headers["Access-Control-Allow-Origin"] = "*"
-    response.headers["Access-Control-Allow-Methods"] = "GET, POST, PUT, DELETE, OPTIONS"
-    response.headers["Access-Control-Allow-Headers"] = "*"
-    
-    return response
-
-# Configure CORS - Use production settings
-# app.add_middleware(
-#     CORSMiddleware,
-#     allow_origins=settings.ALLOWED_ORIGINS,
-#     allow_credentials=settings.CORS_ALLOW_CREDENTIALS,
-#     allow_methods=settings.CORS_ALLOW_METHODS,
-#     allow_headers=settings.CORS_ALLOW_HEADERS,
-# )
-
 # Debug: Log CORS configuration
 logger.info(f"CORS Origins: {settings.ALLOWED_ORIGINS}")
 logger.info(f"CORS Methods: {settings.CORS_ALLOW_METHODS}")
 logger.info(f"CORS Headers: {settings.CORS_ALLOW_HEADERS}")
 logger.info(f"🔒 SECURITY HARDENED - Deployment: 2026-02-26-23:05-UTC")
 
-# Add rate limiting middleware for production security
-app.middleware("http")(rate_limit_middleware)
+# CORS, rate limiting and early 413s for oversized uploads, in one ASGI layer
+app.add_middleware(
+    EdgeMiddleware,
+    limiter=rate_limiter,
+    allowed_origins=settings.ALLOWED_ORIGINS,
+    allow_credentials=settings.CORS_ALLOW_CREDENTIALS,
+    allow_methods=settings.CORS_ALLOW_METHODS,
+    allow_headers=settings.CORS_ALLOW_HEADERS,
+)
 
 # Add exception handlers
 app.add_exception_handler(RequestValidationError, validation_exception_handler)
@@ -101,6 +108,8 @@ app.add_exception_handler(Exception, general_exception_handler)
 app.include_router(vision.router, prefix="/api", tags=["vision"])
 app.include_router(trade.router, prefix="/api", tags=["trade"])
 app.include_router(impact.router, prefix="/api", tags=["impact"])
+app.include_router(jobs.router, prefix="/api", tags=["jobs"])
+app.include_router(metrics.router, prefix="/api", tags=["metrics"])
 
 
 @app.get("/")
@@ -0,0 +1,142 @@
+"""CORS, rate limiting and upload size checks in a single pure-ASGI middleware."""
+from typing import Iterable, Optional
+
+from starlette.responses import JSONResponse, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.middleware.rate_limit import RATE_LIMIT_EXEMPT_PATHS, RateLimiter
+from app.middleware.upload_limit import max_request_bytes, too_large_detail
+
+Headers = list[tuple[bytes, bytes]]
+
+
+class EdgeMiddleware:
+    """
+    Everything the API does to a request before routing, in one pass.
+
+    Preflight requests are answered here. Oversized uploads get a 413 and
+    over-quota clients a 429, both before the app is called. Every other
+    response has its CORS and X-RateLimit headers appended as its start
+    message goes out. The body is passed through untouched, so streaming
+    responses are neither buffered nor wrapped in another task.
+
+    Only origins in `allowed_origins` get CORS headers; "*" in the list
+    allows any origin.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        limiter: RateLimiter,
+        allowed_origins: Iterable[str],
+        allow_credentials: bool = False,
+        allow_methods: Iterable[str] = ("GET", "POST", "PUT", "DELETE", "OPTIONS"),
+        allow_headers: Iterable[str] = ("*",),
+        max_age: int = 86400,
+    ):
+        self.app = app
+        self.limiter = limiter
+        allowed_origins = list(allowed_origins)
+        allow_headers = list(allow_headers)
+        self.allow_any_origin = "*" in allowed_origins
+        self.allowed_origins = frozenset(origin.encode() for origin in allowed_origins)
+        self.allow_credentials = allow_credentials
+        self.allow_any_header = "*" in allow_headers
+        self._allow_methods = ", ".join(allow_methods).encode()
+        self._allow_headers = ", ".join(allow_headers).encode()
+        self._max_age = str(max_age).encode()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        origin = request_method = request_headers = api_key = content_length = None
+        for name, value in scope["headers"]:
+            if name == b"origin":
+                origin = value
+            elif name == b"access-control-request-method":
+                request_method = value
+            elif name == b"access-control-request-headers":
+                request_headers = value
+            elif name == b"x-api-key":
+                api_key = value
+            elif name == b"content-length":
+                content_length = value
+
+        cors = self._cors_headers(origin)
+        method, path = scope["method"], scope["path"]
+
+        if method == "OPTIONS" and origin is not None and request_method is not None:
+            await self._preflight(cors, request_headers)(scope, receive, send)
+            return
+
+        # Bodies without a Content-Length are still bounded chunk by chunk in the router
+        if method == "POST" and content_length is not None and content_length.isdigit():
+            limit = max_request_bytes(path)
+            if limit and int(content_length) > limit:
+                await _with_headers(JSONResponse(status_code=413, content={"detail": too_large_detail()}), cors)(
+                    scope, receive, send
+                )
+                return
+
+        extra, state = cors, None
+        if path not in RATE_LIMIT_EXEMPT_PATHS:
+            if api_key:
+                client_id = f"api:{api_key.decode('latin-1')}"
+            else:
+                client_id = scope["client"][0] if scope.get("client") else "unknown"
+            quota = str(self.limiter.limit_for(path)).encode()
+            allowed, remaining = await self.limiter.is_allowed(client_id, path)
+            if not allowed:
+                await _with_headers(self.limiter.rejection(), cors + [
+                    (b"x-ratelimit-limit", quota),
+                    (b"x-ratelimit-remaining", b"0"),
+                ])(scope, receive, send)
+                return
+            # Routes whose quota counts items charge the rest once the body is parsed
+            # and update the remaining count reported below
+            state = scope.setdefault("state", {})
+            state["rate_limit_client"] = client_id
+            state["rate_limit_remaining"] = remaining
+            extra = cors + [(b"x-ratelimit-limit", quota)]
+
+        if not extra:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = [*message.get("headers", ()), *extra]
+                if state is not None:
+                    headers.append((b"x-ratelimit-remaining", str(state["rate_limit_remaining"]).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+    def _cors_headers(self, origin: Optional[bytes]) -> Headers:
+        """Headers for a response to `origin`; none if the origin is absent or not allowed."""
+        if origin is None or not (self.allow_any_origin or origin in self.allowed_origins):
+            return []
+        if self.allow_any_origin and not self.allow_credentials:
+            return [(b"access-control-allow-origin", b"*")]
+        headers = [(b"access-control-allow-origin", origin), (b"vary", b"Origin")]
+        if self.allow_credentials:
+            headers.append((b"access-control-allow-credentials", b"true"))
+        return headers
+
+    def _preflight(self, cors: Headers, request_headers: Optional[bytes]) -> Response:
+        if not cors:
+            return JSONResponse(status_code=400, content={"detail": "Disallowed CORS origin"})
+        allow_headers = request_headers if self.allow_any_header and request_headers else self._allow_headers
+        return _with_headers(Response(status_code=200), cors + [
+            (b"access-control-allow-methods", self._allow_methods),
+            (b"access-control-allow-headers", allow_headers),
+            (b"access-control-max-age", self._max_age),
+        ])
+
+
+def _with_headers(response: Response, headers: Headers) -> Response:
+    response.raw_headers.extend(headers)
+    return response
@@ -1,87 +1,82 @@
-"""Rate limiting middleware for production."""
-from fastapi import Request, HTTPException
-from fastapi.responses import JSONResponse
-from collections import defaultdict
-from datetime import datetime, timedelta
-import asyncio
+"""Rate limiting for production."""
+import logging
+from typing import Optional
+from starlette.responses import JSONResponse
 from app.config import settings
+from app.middleware.rate_limit_backends import MemoryBackend, RateLimitBackend, create_backend
+
+logger = logging.getLogger(__name__)
+
+# Health checks and docs are never limited
+RATE_LIMIT_EXEMPT_PATHS = frozenset({"/", "/health", "/docs", "/openapi.json"})
 
 
 class RateLimiter:
-    """Simple in-memory rate limiter."""
+    """
+    Sliding-window rate limiter over a pluggable counter backend.
+    
+    Paths listed in `route_limits` get their own quota, counted separately
+    from the default one. If the backend is unreachable the request is
+    allowed and a warning logged, so a limiter outage never takes the API
+    down with it. A period of 0 or less disables limiting.
+    """
     
-    def __init__(self, requests: int = 100, period_seconds: int = 60):
+    def __init__(
+        self,
+        requests: int = 100,
+        period_seconds: float = 60,
+        backend: Optional[RateLimitBackend] = None,
+        route_limits: Optional[dict[str, int]] = None
+    ):
         self.requests = requests
         self.period_seconds = period_seconds
-        self.requests_log = defaultdict(list)
-        self._lock = asyncio.Lock()
+        self.backend = backend or MemoryBackend()
+        self.route_limits = dict(route_limits or {})
     
-    async def is_allowed(self, client_id: str) -> tuple[bool, int]:
-        """Check if client is allowed to make request. Returns (allowed, remaining)."""
-        async with self._lock:
-            now = datetime.utcnow()
-            cutoff = now - timedelta(seconds=self.period_seconds)
-            
-            # Clean old requests
-            self.requests_log[client_id] = [
-                ts for ts in self.requests_log[client_id] if ts > cutoff
-            ]
-            
-            # Check limit
-            current_count = len(self.requests_log[client_id])
-            remaining = max(0, self.requests - current_count - 1)
-            
-            if current_count >= self.requests:
-                return False, 0
-            
-            # Log this request
-            self.requests_log[client_id].append(now)
-            return True, remaining
-
-
-# Global rate limiter instance
-rate_limiter = RateLimiter(
-    requests=settings.RATE_LIMIT_REQUESTS,
-    period_seconds=settings.RATE_LIMIT_PERIOD_SECONDS
-)
-
-
-async def rate_limit_middleware(request: Request, call_next):
-    """Rate limiting middleware."""
-    # Skip rate limiting for health checks and docs
-    if request.url.path in ["/", "/health", "/docs", "/openapi.json"]:
-        return await call_next(request)
+    def limit_for(self, path: Optional[str]) -> int:
+        return self.route_limits.get(path, self.requests)
     
-    # Get client identifier (IP or API key)
-    client_id = request.client.host if request.client else "unknown"
+    async def is_allowed(self, client_id: str, path: Optional[str] = None, cost: int = 1) -> tuple[bool, int]:
+        """
+        Check if client is allowed to make request. Returns (allowed, remaining).
+        
+        `cost` is how many units of the quota the request uses, for routes
+        whose quota counts items rather than requests.
+        """
+        limit = self.limit_for(path)
+        if self.period_seconds <= 0:
+            return True, limit
+        key = f"{client_id}|{path}" if path in self.route_limits else client_id
+        try:
+            return await self.backend.hit(key, limit, self.period_seconds, cost)
+        except Exception as e:
+            logger.warning(f"Rate limit backend unavailable, allowing request: {type(e).__name__}: {e}")
+            return True, limit
     
-    # Check for API key header
-    api_key = request.headers.get("X-API-Key")
-    if api_key:
-        client_id = f"api:{api_key}"
-    
-    # Check rate limit
-    allowed, remaining = await rate_limiter.is_allowed(client_id)
-    
-    if not allowed:
+    def rejection(self) -> JSONResponse:
+        """The 429 returned to a client that is over its quota."""
         return JSONResponse(
             status_code=429,
             content={
                 "detail": "Rate limit exceeded. Please try again later.",
-                "retry_after": settings.RATE_LIMIT_PERIOD_SECONDS
+                "retry_after": self.period_seconds
             },
-            headers={
-                "X-RateLimit-Limit": str(settings.RATE_LIMIT_REQUESTS),
-                "X-RateLimit-Remaining": "0",
-                "Retry-After": str(settings.RATE_LIMIT_PERIOD_SECONDS)
-            }
+            headers={"Retry-After": str(self.period_seconds)}
         )
     
-    # Process request
-    response = await call_next(request)
-    
-    # Add rate limit headers
-    response.headers["X-RateLimit-Limit"] = str(settings.RATE_LIMIT_REQUESTS)
-    response.headers["X-RateLimit-Remaining"] = str(remaining)
-    
-    return response
+    async def close(self) -> None:
+        await self.backend.close()
+
+
+# Global rate limiter instance
+rate_limiter = RateLimiter(
+    requests=settings.RATE_LIMIT_REQUESTS,
+    period_seconds=settings.RATE_LIMIT_PERIOD_SECONDS,
+    backend=create_backend(
+        settings.RATE_LIMIT_BACKEND,
+        settings.RATE_LIMIT_DB_PATH,
+        settings.RATE_LIMIT_REDIS_URL,
+        settings.RATE_LIMIT_REDIS_TIMEOUT_SECONDS,
+    ),
+    route_limits=settings.RATE_LIMIT_ROUTES
+)
@@ -0,0 +1,314 @@
+"""Counter stores for the sliding-window rate limiter."""
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+
+def sliding_window(
+    previous: int, current: int, offset: float, limit: int, period_seconds: float, cost: int = 1
+) -> tuple[bool, int]:
+    """
+    Decide one request from the two window counts (current excludes this request).
+
+    The previous window counts in proportion to how much of it the sliding
+    window still covers. A request of `cost` units is allowed only if all of
+    them fit. Returns (allowed, remaining).
+    """
+    used = previous * (1.0 - offset / period_seconds) + current
+    if used + cost - 1 >= limit:
+        return False, 0
+    return True, max(0, int(limit - used - cost))
+
+
+class RateLimitBackend:
+    """Where the per-client window counts are kept."""
+
+    async def hit(self, key: str, limit: int, period_seconds: float, cost: int = 1) -> tuple[bool, int]:
+        """Count `cost` units for key unless that would take it over limit. Returns (allowed, remaining)."""
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+class _Windows:
+    __slots__ = ("window", "current", "previous")
+
+    def __init__(self):
+        self.window = 0
+        self.current: dict[str, int] = {}
+        self.previous: dict[str, int] = {}
+
+    def advance(self, window: int) -> None:
+        if window == self.window:
+            return
+        # Counts from two or more windows ago no longer affect any estimate
+        self.previous = self.current if window == self.window + 1 else {}
+        self.current = {}
+        self.window = window
+
+
+class MemoryBackend(RateLimitBackend):
+    """
+    Counts held in this process: two integers per client.
+
+    Each period keeps one dict for the current window and one for the
+    previous window. When the clock enters a new window the older dict is
+    dropped whole, so clients idle for two windows are evicted without a
+    sweep. take() never awaits between reading and writing a count, so on
+    the event loop no lock is needed. Limits are per worker process.
+    """
+
+    def __init__(self):
+        self._periods: dict[float, _Windows] = {}
+
+    async def hit(self, key: str, limit: int, period_seconds: float, cost: int = 1) -> tuple[bool, int]:
+        return self.take(key, limit, period_seconds, cost=cost)
+
+    def take(
+        self, key: str, limit: int, period_seconds: float, now: Optional[float] = None, cost: int = 1
+    ) -> tuple[bool, int]:
+        now = time.monotonic() if now is None else now
+        window, offset = divmod(now, period_seconds)
+        windows = self._periods.get(period_seconds)
+        if windows is None:
+            windows = self._periods[period_seconds] = _Windows()
+        windows.advance(int(window))
+
+        current = windows.current.get(key, 0)
+        allowed, remaining = sliding_window(
+            windows.previous.get(key, 0), current, offset, limit, period_seconds, cost
+        )
+        if allowed:
+            windows.current[key] = current + cost
+        return allowed, remaining
+
+    def clients(self) -> int:
+        """Number of keys with state still held (at most two windows' worth)."""
+        return sum(len(w.current.keys() | w.previous.keys()) for w in self._periods.values())
+
+
+class SQLiteBackend(RateLimitBackend):
+    """
+    Counts in a SQLite file shared by every worker process on the host.
+
+    Each check reads both windows and increments the current one in a single
+    BEGIN IMMEDIATE transaction, so concurrent workers never both admit the
+    last allowed request. Windows use wall-clock time, which all processes
+    share. Rows older than the previous window are deleted once per window.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._swept_window: dict[float, int] = {}
+
+    async def hit(self, key: str, limit: int, period_seconds: float, cost: int = 1) -> tuple[bool, int]:
+        return await asyncio.to_thread(self.take, key, limit, period_seconds, None, cost)
+
+    def take(
+        self, key: str, limit: int, period_seconds: float, now: Optional[float] = None, cost: int = 1
+    ) -> tuple[bool, int]:
+        now = time.time() if now is None else now
+        window, offset = divmod(now, period_seconds)
+        window = int(window)
+        scoped = f"{period_seconds:g}:{key}"
+        with self._db_lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                counts = dict(conn.execute(
+                    "SELECT window, count FROM rate_counts WHERE key = ? AND window IN (?, ?)",
+                    (scoped, window - 1, window),
+                ).fetchall())
+                allowed, remaining = sliding_window(
+                    counts.get(window - 1, 0), counts.get(window, 0), offset, limit, period_seconds, cost
+                )
+                if allowed:
+                    conn.execute(
+                        "INSERT INTO rate_counts (key, window, count) VALUES (?, ?, ?) "
+                        "ON CONFLICT(key, window) DO UPDATE SET count = count + excluded.count",
+                        (scoped, window, cost),
+                    )
+                if self._swept_window.get(period_seconds) != window:
+                    conn.execute(
+                        "DELETE FROM rate_counts WHERE window < ? AND key LIKE ?",
+                        (window - 1, f"{period_seconds:g}:%"),
+                    )
+                    self._swept_window[period_seconds] = window
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return allowed, remaining
+
+    async def close(self) -> None:
+        with self._db_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(
+                "CREATE TABLE IF NOT EXISTS rate_counts ("
+                "key TEXT NOT NULL, window INTEGER NOT NULL, count INTEGER NOT NULL, "
+                "PRIMARY KEY (key, window)) WITHOUT ROWID;"
+                "CREATE INDEX IF NOT EXISTS idx_rate_counts_window ON rate_counts(window);"
+            )
+        return self._conn
+
+
+class RedisError(Exception):
+    """Error reply from the Redis server."""
+
+
+class RedisBackend(RateLimitBackend):
+    """
+    Counts in Redis (or anything speaking its protocol), shared across hosts.
+
+    Speaks RESP directly over one pipelined connection, so no client library
+    is needed. INCRBY on the current window is atomic; a request that turns
+    out to be over the limit is taken back with DECRBY. Keys expire after two
+    windows, so Redis evicts idle clients itself.
+
+    Each call, including its wait for the connection, is bounded by
+    `timeout_seconds`, so a stalled server makes hit() raise (and the limiter
+    fail open) instead of holding up every request. A round trip that is
+    interrupted drops the connection, since its replies may still arrive
+    and would otherwise be read by the next caller.
+    """
+
+    def __init__(self, url: str, key_prefix: str = "ratelimit", timeout_seconds: float = 0.25):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.password = parsed.password
+        self.key_prefix = key_prefix
+        self.timeout_seconds = timeout_seconds
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._lock = asyncio.Lock()
+
+    async def hit(self, key: str, limit: int, period_seconds: float, cost: int = 1) -> tuple[bool, int]:
+        window, offset = divmod(time.time(), period_seconds)
+        window = int(window)
+        current_key = f"{self.key_prefix}:{period_seconds:g}:{window}:{key}"
+        previous_key = f"{self.key_prefix}:{period_seconds:g}:{window - 1}:{key}"
+        current, _, previous = await self.execute(
+            ("INCRBY", current_key, cost),
+            ("PEXPIRE", current_key, int(period_seconds * 2000)),
+            ("GET", previous_key),
+        )
+        allowed, remaining = sliding_window(int(previous or 0), current - cost, offset, limit, period_seconds, cost)
+        if not allowed:
+            await self.execute(("DECRBY", current_key, cost))
+        return allowed, remaining
+
+    async def execute(self, *commands: tuple) -> list:
+        """Send commands in one pipeline and return their replies in order. Raises asyncio.TimeoutError when slow."""
+        return await asyncio.wait_for(self._execute(commands), self.timeout_seconds)
+
+    async def _execute(self, commands) -> list:
+        async with self._lock:
+            try:
+                if self._writer is None:
+                    await self._connect()
+                return await self._roundtrip(commands)
+            except (OSError, asyncio.IncompleteReadError, asyncio.CancelledError):
+                # Cancelled covers the timeout: the connection may owe replies, so it cannot be reused
+                self._abort()
+                raise
+
+    async def close(self) -> None:
+        async with self._lock:
+            await self._disconnect()
+
+    async def _connect(self) -> None:
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        setup = []
+        if self.password:
+            setup.append(("AUTH", self.password))
+        if self.db:
+            setup.append(("SELECT", self.db))
+        if setup:
+            await self._roundtrip(setup)
+
+    def _abort(self) -> None:
+        writer, self._reader, self._writer = self._writer, None, None
+        if writer is not None:
+            writer.transport.abort()
+
+    async def _disconnect(self) -> None:
+        writer, self._reader, self._writer = self._writer, None, None
+        if writer is not None:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+    async def _roundtrip(self, commands) -> list:
+        self._writer.write(b"".join(encode_command(*command) for command in commands))
+        await self._writer.drain()
+        replies = [await read_reply(self._reader) for _ in commands]
+        for reply in replies:
+            if isinstance(reply, RedisError):
+                raise reply
+        return replies
+
+
+def encode_command(*args) -> bytes:
+    """Encode one command as a RESP array of bulk strings."""
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        data = arg if isinstance(arg, bytes) else str(arg).encode()
+        parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(parts)
+
+
+async def read_reply(reader: asyncio.StreamReader):
+    """Read one RESP reply; error replies are returned as RedisError instances."""
+    line = (await reader.readuntil(b"\r\n"))[:-2]
+    kind, rest = line[:1], line[1:]
+    if kind == b"+":
+        return rest.decode()
+    if kind == b"-":
+        return RedisError(rest.decode())
+    if kind == b":":
+        return int(rest)
+    if kind == b"$":
+        length = int(rest)
+        if length < 0:
+            return None
+        return (await reader.readexactly(length + 2))[:-2]
+    if kind == b"*":
+        count = int(rest)
+        if count < 0:
+            return None
+        return [await read_reply(reader) for _ in range(count)]
+    raise RedisError(f"Unexpected reply from server: {line[:40]!r}")
+
+
+def create_backend(name: str, db_path: str, redis_url: str, redis_timeout_seconds: float = 0.25) -> RateLimitBackend:
+    """Build the backend named by RATE_LIMIT_BACKEND."""
+    if name == "memory":
+        return MemoryBackend()
+    if name == "sqlite":
+        return SQLiteBackend(db_path)
+    if name == "redis":
+        return RedisBackend(redis_url, timeout_seconds=redis_timeout_seconds)
+    raise ValueError(f"Unknown rate limit backend {name!r}; expected memory, sqlite or redis")
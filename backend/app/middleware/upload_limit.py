@@ -0,0 +1,24 @@
+"""Reject oversized uploads before the multipart body is parsed."""
+from app.config import settings
+
+# Allowance for multipart boundaries and part headers around the file itself
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+def _max_upload_files(path: str) -> int:
+    """Number of images a request to path may carry, or 0 if it is not an upload endpoint."""
+    if path == "/api/analyze-item":
+        return 1
+    if path == "/api/analyze-items":
+        return settings.VISION_BATCH_MAX_ITEMS
+    return 0
+
+
+def max_request_bytes(path: str) -> int:
+    """Largest Content-Length accepted for a POST to path, or 0 if it is not an upload endpoint."""
+    max_files = _max_upload_files(path)
+    return settings.MAX_UPLOAD_BYTES * max_files + MULTIPART_OVERHEAD_BYTES if max_files else 0
+
+
+def too_large_detail() -> str:
+    return f"Image is too large. Maximum upload size is {settings.MAX_UPLOAD_BYTES // (1024 * 1024)} MB."
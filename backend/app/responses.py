@@ -0,0 +1,28 @@
+"""JSON responses serialized straight from Pydantic models to bytes."""
+from typing import Any
+
+from pydantic_core import to_json
+from starlette.responses import Response
+
+
+def dump_json(content: Any) -> bytes:
+    """
+    Compact UTF-8 JSON for a model, or for plain data containing models.
+
+    Models go through their compiled pydantic-core serializer in one pass,
+    with no intermediate dicts and no second encode by the json module.
+    """
+    return to_json(content)
+
+
+class ModelResponse(Response):
+    """
+    Drop-in for JSONResponse that takes models as content.
+
+    Return it from a route with the model itself, not `model.dict()`, so
+    FastAPI skips its own validate-and-encode pass for the response.
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dump_json(content)
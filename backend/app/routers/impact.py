@@ -1,8 +1,17 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List
-from datetime import datetime
-import random
+from typing import AsyncIterator, List
+from datetime import datetime, timezone
+import asyncio
+from app.config import settings
+from app.responses import dump_json
+from app.services.event_bus import Subscription, impact_events
+from app.services.impact_store import ImpactEvent, impact_store
+from app.services.response_snapshot import ResponseSnapshot
+
+# How long EventSource clients wait before reconnecting after a dropped stream
+STREAM_RETRY_MS = 3000
 
 router = APIRouter()
 
@@ -29,78 +38,130 @@ class ImpactResponse(BaseModel):
     stats: ImpactStats
     recent_activities: List[Activity]
     weekly_data: List[dict]
+    weekly_totals: List[dict] = []
 
 
 @router.get("/impact-stats", response_model=ImpactResponse)
-async def get_impact_stats():
+async def get_impact_stats(request: Request):
     """
     Get real-time impact statistics for the dashboard.
+    
+    Served from a shared pre-rendered snapshot with ETag/Last-Modified, so
+    a dashboard poll that sends If-None-Match gets an empty 304 until the
+    numbers change.
+    """
+    snapshot = await impact_snapshot.get()
+    headers = snapshot.headers(max_age=int(settings.IMPACT_SNAPSHOT_REFRESH_SECONDS))
+    
+    if snapshot.not_modified(request.headers.get("if-none-match"), request.headers.get("if-modified-since")):
+        return Response(status_code=304, headers=headers)
+    
+    return Response(content=snapshot.body, media_type="application/json", headers=headers)
+
+
+async def _render_impact_response() -> bytes:
     """
-    # In production, these would come from a database
+    Build the dashboard response from the impact rollups.
+    
+    Reads the pre-aggregated rollups maintained as analyses and trades
+    complete, so the cost does not grow with history.
+    """
+    dashboard = await impact_store.get_dashboard(recent=settings.IMPACT_RECENT_ACTIVITIES)
+    totals = dashboard["totals"]
+    
     stats = ImpactStats(
-        co2_sequestered_tons=2847,
-        waste_diverted_kg=156420,
-        eco_credits_earned=892340,
-        recovery_rate_percent=94,
-        items_processed=45231,
-        active_users=12847,
+        co2_sequestered_tons=round(totals["co2_kg"] / 1000),
+        waste_diverted_kg=round(totals["waste_kg"]),
+        eco_credits_earned=round(totals["eco_credits"]),
+        recovery_rate_percent=round(100 * totals["trades_matched"] / totals["trades"]) if totals["trades"] else 0,
+        items_processed=round(totals["analyses"]),
+        active_users=totals["active_users"],
     )
     
-    activities = [
-        Activity(
-            id="act-001",
-            type="trade",
-            description="Laptop donated to Tech for All",
-            impact=45,
-            timestamp=datetime.utcnow().isoformat(),
-            location="New York, NY"
-        ),
-        Activity(
-            id="act-002",
-            type="analysis",
-            description="Furniture analyzed for reuse",
-            impact=12,
-            timestamp=datetime.utcnow().isoformat(),
-            location=None
-        ),
-        Activity(
-            id="act-003",
-            type="credit",
-            description="Eco-credits earned from recycling",
-            impact=38,
-            timestamp=datetime.utcnow().isoformat(),
-            location=None
-        ),
-        Activity(
-            id="act-004",
-            type="trade",
-            description="Industrial scrap matched with recycler",
-            impact=67,
-            timestamp=datetime.utcnow().isoformat(),
-            location="Brooklyn, NY"
-        ),
-        Activity(
-            id="act-005",
-            type="analysis",
-            description="Electronics analyzed for refurbishment",
-            impact=23,
-            timestamp=datetime.utcnow().isoformat(),
-            location=None
-        ),
-    ]
+    activities = [Activity(**activity) for activity in dashboard["recent"]]
     
+    # Items analyzed and traded per day over the last week, oldest first
     weekly_data = [
-        {"day": "Mon", "value": random.randint(100, 200)},
-        {"day": "Tue", "value": random.randint(150, 250)},
-        {"day": "Wed", "value": random.randint(100, 200)},
-        {"day": "Thu", "value": random.randint(200, 300)},
-        {"day": "Fri", "value": random.randint(150, 250)},
-        {"day": "Sat", "value": random.randint(250, 350)},
-        {"day": "Sun", "value": random.randint(200, 300)},
+        {"day": datetime.strptime(bucket["bucket"], "%Y-%m-%d").strftime("%a"),
+         "value": round(bucket["analyses"] + bucket["trades"])}
+        for bucket in dashboard["daily"]
+    ]
+    weekly_totals = [
+        {"week": bucket["bucket"], "value": round(bucket["analyses"] + bucket["trades"])}
+        for bucket in dashboard["weekly"]
     ]
     
-    return ImpactResponse(
+    return dump_json(ImpactResponse(
         stats=stats,
         recent_activities=activities,
-        weekly_data=weekly_data
+        weekly_data=weekly_data,
+        weekly_totals=weekly_totals
+    ))
+
+
+@router.get("/impact-stream")
+async def stream_impact():
+    """
+    Live impact activity as Server-Sent Events.
+    
+    Each completed analysis or trade is pushed as an `activity` event with
+    the new Activity and the deltas it adds to the dashboard stats. Comment
+    heartbeats keep idle connections open through proxies.
+    """
+    subscription = impact_events.subscribe()
+    if subscription is None:
+        raise HTTPException(status_code=503, detail="Too many live dashboard connections. Please retry shortly.")
+    
+    return StreamingResponse(
+        _impact_stream(subscription, settings.IMPACT_STREAM_HEARTBEAT_SECONDS),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+async def _impact_stream(subscription: Subscription, heartbeat_seconds: float) -> AsyncIterator[bytes]:
+    try:
+        yield f"retry: {STREAM_RETRY_MS}\n: connected\n\n".encode("utf-8")
+        while True:
+            try:
+                message = await subscription.get(timeout=heartbeat_seconds)
+            except asyncio.TimeoutError:
+                yield b": heartbeat\n\n"
+                continue
+            if message is None:
+                # Dropped for falling behind; the client reconnects after STREAM_RETRY_MS
+                return
+            yield message
+    finally:
+        subscription.close()
+
+
+def _encode_activity_event(event: ImpactEvent) -> bytes:
+    """Encode an impact event once as an SSE message shared by every subscriber."""
+    analyses, trades, trades_matched, _, co2_kg, waste_kg, eco_credits = event.rollup_increments()
+    activity = Activity(
+        id=event.id,
+        type=event.type,
+        description=event.description,
+        impact=event.impact,
+        timestamp=datetime.fromtimestamp(event.created_at, tz=timezone.utc).replace(tzinfo=None).isoformat(),
+        location=event.location
     )
+    data = {
+        "activity": activity,
+        "stats_delta": {
+            "items_processed": analyses,
+            "trades": trades,
+            "trades_matched": trades_matched,
+            "co2_saved_kg": co2_kg,
+            "waste_diverted_kg": waste_kg,
+            "eco_credits_earned": eco_credits
+        }
+    }
+    return b"id: %s\nevent: activity\ndata: %s\n\n" % (event.id.encode("utf-8"), dump_json(data))
+
+
+# Shared across dashboard viewers; local events refresh it on the next read
+impact_snapshot = ResponseSnapshot(_render_impact_response, refresh_seconds=settings.IMPACT_SNAPSHOT_REFRESH_SECONDS)
+impact_store.add_listener(lambda event: impact_snapshot.invalidate())
+impact_store.add_listener(lambda event: impact_events.publish(_encode_activity_event(event)))
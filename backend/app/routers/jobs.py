@@ -0,0 +1,31 @@
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+from typing import Optional
+from app.responses import ModelResponse
+from app.services.job_queue import job_queue
+
+router = APIRouter()
+
+
+class JobStatusResponse(BaseModel):
+    job_id: str
+    kind: str
+    status: str
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    status_code: Optional[int] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+
+@router.get("/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_job(job_id: str):
+    """
+    Get the status, and once finished the result, of a background job.
+    """
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return ModelResponse(JobStatusResponse(**job))
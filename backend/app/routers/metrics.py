@@ -0,0 +1,28 @@
+from fastapi import APIRouter
+from app.services.http_client import get_pool_stats
+from app.services.result_cache import vision_cache
+from app.services.image_hash import near_duplicate_index
+from app.services.job_queue import job_queue
+from app.services.org_registry import organization_registry
+from app.services.event_bus import impact_events
+from app.services.prompt_registry import prompt_registry
+from app.services.llm_usage import vision_usage
+
+router = APIRouter()
+
+
+@router.get("/metrics")
+async def get_metrics():
+    """
+    Get runtime metrics for capacity planning.
+    """
+    return {
+        "http_pool": get_pool_stats(),
+        "vision_cache": vision_cache.get_stats(),
+        "near_duplicates": near_duplicate_index.get_stats(),
+        "job_queue": await job_queue.get_stats(),
+        "organizations": organization_registry.get_stats(),
+        "impact_stream": impact_events.get_stats(),
+        "prompts": prompt_registry.get_stats(),
+        "vision_usage": vision_usage.get_stats(),
+    }
@@ -1,10 +1,12 @@
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import JSONResponse, Response
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Optional
+from typing import AsyncIterator, Literal, Optional
 from enum import Enum
 import logging
-from app.services.agent_service import orchestrate_trade_negotiation
+from app.responses import ModelResponse, dump_json
+from app.services.agent_service import orchestrate_trade_negotiation, stream_trade_negotiation
+from app.services.impact_store import record_impact, trade_event
 
 logger = logging.getLogger(__name__)
 
@@ -53,17 +55,41 @@ class OrchestrateTradeResponse(BaseModel):
     best_match: Optional[MatchResult]
     eco_credits_earned: int
     carbon_impact_kg: float
+    unavailable_partners: list[str] = []
     error: Optional[str] = None
 
 
+class TradeStepEvent(BaseModel):
+    """NDJSON line emitted as each negotiation step completes."""
+    type: Literal["step"] = "step"
+    step: NegotiationStep
+
+
+class TradeResultEvent(BaseModel):
+    """Final NDJSON line of a streamed negotiation."""
+    type: Literal["result"] = "result"
+    result: OrchestrateTradeResponse
+
+
 @router.post("/orchestrate-trade", response_model=OrchestrateTradeResponse)
-async def orchestrate_trade_post(request: TradeRequest):
+async def orchestrate_trade_post(
+    request: TradeRequest,
+    stream: bool = Query(False, description="Stream each negotiation step as NDJSON as it completes")
+):
     """
     Orchestrate trade negotiation using AI agents.
     
     The agent negotiates with NGOs and recycling centers via mock API
-    to find best match for the item.
+    to find best match for the item. With stream=true the response is
+    NDJSON: one {"type": "step"} line per step, then a {"type": "result"}
+    line carrying the full OrchestrateTradeResponse.
     """
+    if stream:
+        return StreamingResponse(
+            _stream_negotiation(request),
+            media_type="application/x-ndjson"
+        )
+    
     try:
         result = await orchestrate_trade_negotiation(
             item_id=request.item_id,
@@ -72,47 +98,64 @@ async def orchestrate_trade_post(request: TradeRequest):
             location=request.location,
             constraints=request.constraints
         )
+        await record_impact(trade_event, result, request.user_id, request.location)
         
-        response_data = OrchestrateTradeResponse(
-            success=True,
-            trade_id=result["trade_id"],
-            status=TradeStatus(result["status"]),
-            negotiation_steps=[NegotiationStep(**step) for step in result["negotiation_steps"]],
-            matches=[MatchResult(**match) for match in result["matches"]],
-            best_match=MatchResult(**result["best_match"]) if result.get("best_match") else None,
-            eco_credits_earned=result["eco_credits_earned"],
-            carbon_impact_kg=result["carbon_impact_kg"]
-        )
-        
-        return JSONResponse(
+        return ModelResponse(
             status_code=200,
-            content=response_data.dict(),
-            headers={
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-                "Access-Control-Allow-Headers": "*"
-            }
+            content=_build_response(result)
         )
         
     except Exception as e:
-        error_response = OrchestrateTradeResponse(
-            success=False,
-            trade_id="",
-            status=TradeStatus.FAILED,
-            negotiation_steps=[],
-            matches=[],
-            best_match=None,
-            eco_credits_earned=0,
-            carbon_impact_kg=0,
-            error=str(e)
-        )
-        
-        return JSONResponse(
+        return ModelResponse(
             status_code=500,
-            content=error_response.dict(),
-            headers={
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-                "Access-Control-Allow-Headers": "*"
-            }
+            content=_error_response(e)
         )
+
+
+async def _stream_negotiation(request: TradeRequest) -> AsyncIterator[bytes]:
+    """Yield one NDJSON line per negotiation step, then the final response."""
+    try:
+        async for kind, payload in stream_trade_negotiation(
+            item_id=request.item_id,
+            user_id=request.user_id,
+            preferred_path=request.preferred_path,
+            location=request.location,
+            constraints=request.constraints
+        ):
+            if kind == "step":
+                yield dump_json(TradeStepEvent(step=NegotiationStep(**payload))) + b"\n"
+            else:
+                await record_impact(trade_event, payload, request.user_id, request.location)
+                yield dump_json(TradeResultEvent(result=_build_response(payload))) + b"\n"
+    except Exception as e:
+        # Headers are already sent, so the failure travels in the final line
+        logger.error(f"Streamed negotiation failed: {type(e).__name__}: {e}")
+        yield dump_json(TradeResultEvent(result=_error_response(e))) + b"\n"
+
+
+def _build_response(result: dict) -> OrchestrateTradeResponse:
+    return OrchestrateTradeResponse(
+        success=True,
+        trade_id=result["trade_id"],
+        status=TradeStatus(result["status"]),
+        negotiation_steps=[NegotiationStep(**step) for step in result["negotiation_steps"]],
+        matches=[MatchResult(**match) for match in result["matches"]],
+        best_match=MatchResult(**result["best_match"]) if result.get("best_match") else None,
+        eco_credits_earned=result["eco_credits_earned"],
+        carbon_impact_kg=result["carbon_impact_kg"],
+        unavailable_partners=result.get("unavailable_partners", [])
+    )
+
+
+def _error_response(error: Exception) -> OrchestrateTradeResponse:
+    return OrchestrateTradeResponse(
+        success=False,
+        trade_id="",
+        status=TradeStatus.FAILED,
+        negotiation_steps=[],
+        matches=[],
+        best_match=None,
+        eco_credits_earned=0,
+        carbon_impact_kg=0,
+        error=str(error)
+    )
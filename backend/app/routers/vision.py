@@ -1,11 +1,24 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from fastapi.responses import JSONResponse
-from typing import Optional
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import AsyncIterator, List, Optional
 from pydantic import BaseModel
 from enum import Enum
+from io import BytesIO
+import asyncio
 import base64
 import logging
-from app.services.vision_service import analyze_item_image
+import tempfile
+import uuid
+from app.config import settings
+from app.middleware.rate_limit import rate_limiter
+from app.responses import ModelResponse, dump_json
+from app.services.vision_service import analyze_item_image, get_matching_organizations, vision_prompt_version
+from app.services.result_cache import vision_cache, make_cache_key
+from app.services.image_hash import near_duplicate_index
+from app.services.image_preprocess import prepare_image
+from app.services.upload_ingest import ingest_upload, encode_base64
+from app.services.job_queue import job_queue, JobFailed, check_webhook_url
+from app.services.impact_store import analysis_event, record_impact
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -56,61 +69,356 @@ class AnalyzeItemResponse(BaseModel):
     error: Optional[str] = None
 
 
+class AnalyzeItemJobResponse(BaseModel):
+    success: bool
+    job_id: str
+    status: str
+    status_url: str
+
+
+class BatchItemResult(BaseModel):
+    index: int
+    filename: Optional[str] = None
+    success: bool
+    analysis: Optional[AnalysisResult] = None
+    cache: Optional[str] = None
+    status_code: int = 200
+    error: Optional[str] = None
+
+
+class AnalyzeItemsResponse(BaseModel):
+    success: bool
+    total: int
+    succeeded: int
+    failed: int
+    results: list[BatchItemResult]
+
+
 @router.post("/analyze-item")
-async def analyze_item(file: UploadFile = File(...)):
+async def analyze_item(
+    file: UploadFile = File(...),
+    async_mode: bool = Query(False, alias="async", description="Queue the analysis and return a job id immediately"),
+    webhook_url: Optional[str] = Query(None, description="URL to POST the job result to when async=true"),
+    fresh: bool = Query(False, description="Analyze the upload even if an identical or near-duplicate one was analyzed before")
+):
     """
     Analyze an uploaded item image using AI vision.
     
     Returns categorization, circular value estimation, and recommended recycling paths.
+    With async=true the upload is queued and 202 is returned with a job id to
+    poll at /api/jobs/{job_id}. With fresh=true the result caches are not
+    consulted; the new analysis replaces the cached one.
     """
+    if async_mode:
+        return await _submit_analysis_job(file, webhook_url, fresh)
+    
     try:
-        # Validate file type
-        if not file.content_type or not file.content_type.startswith("image/"):
-            raise HTTPException(status_code=400, detail="File must be an image")
-        
-        # Read image data
-        image_data = await file.read()
-        image_base64 = base64.b64encode(image_data).decode("utf-8")
-        
-        # Analyze using vision service
-        result = await analyze_item_image(image_base64, file.content_type)
+        result, cache_headers = await _analyze_upload(file, fresh)
         
         response_data = AnalyzeItemResponse(
             success=True,
             analysis=AnalysisResult(**result)
         )
         
-        return JSONResponse(
+        return ModelResponse(
             status_code=200,
-            content=response_data.dict(),
-            headers={
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-                "Access-Control-Allow-Headers": "*"
-            }
+            content=response_data,
+            headers=cache_headers
         )
         
     except HTTPException:
         raise
-    except ValueError as e:
-        logger.error(f"Configuration error: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
     except Exception as e:
-        error_msg = str(e)
-        logger.error(f"Analysis error: {error_msg}")
+        raise _analysis_error(e)
+
+
+@router.post("/analyze-items")
+async def analyze_items(
+    request: Request,
+    files: List[UploadFile] = File(...),
+    stream: bool = Query(False, description="Stream per-item results as NDJSON as each one completes"),
+    fresh: bool = Query(False, description="Analyze every upload even if an identical or near-duplicate one was analyzed before")
+):
+    """
+    Analyze a batch of item images concurrently.
+    
+    Items are analyzed with at most VISION_BATCH_CONCURRENCY in flight, so a
+    batch takes roughly as long as its slowest item. A failed item is reported
+    in its own result and does not fail the batch. The route's rate-limit
+    quota counts images, not requests.
+    """
+    if len(files) > settings.VISION_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many images. A batch may contain at most {settings.VISION_BATCH_MAX_ITEMS} images."
+        )
+    
+    rejection = await _charge_batch(request, len(files))
+    if rejection is not None:
+        return rejection
+    
+    semaphore = asyncio.Semaphore(settings.VISION_BATCH_CONCURRENCY)
+    if stream:
+        # The request closes its uploads when this handler returns, before the
+        # stream is consumed, so hand the generator its own copies
+        owned_files = [await _detach_upload(file) for file in files]
+        return StreamingResponse(
+            _stream_batch(owned_files, semaphore, fresh),
+            media_type="application/x-ndjson"
+        )
+    
+    results = await asyncio.gather(*(
+        _analyze_batch_item(index, file, semaphore, fresh) for index, file in enumerate(files)
+    ))
+    succeeded = sum(1 for item in results if item.success)
+    
+    response_data = AnalyzeItemsResponse(
+        success=succeeded == len(results),
+        total=len(results),
+        succeeded=succeeded,
+        failed=len(results) - succeeded,
+        results=results
+    )
+    
+    return ModelResponse(
+        status_code=200,
+        content=response_data
+    )
+
+
+async def _charge_batch(request: Request, items: int) -> Optional[JSONResponse]:
+    """
+    Charge a batch's images beyond the first against the route's quota.
+
+    The edge middleware admitted the request for one unit before the body
+    was parsed. Returns the 429 to send if the rest does not fit.
+    """
+    client_id = getattr(request.state, "rate_limit_client", None)
+    if client_id is None or items <= 1:
+        return None
+    allowed, remaining = await rate_limiter.is_allowed(client_id, request.url.path, cost=items - 1)
+    request.state.rate_limit_remaining = remaining
+    return None if allowed else rate_limiter.rejection()
+
+
+async def _submit_analysis_job(file: UploadFile, webhook_url: Optional[str], fresh: bool = False) -> ModelResponse:
+    """Validate an upload and queue it for background analysis."""
+    if webhook_url:
+        try:
+            await check_webhook_url(webhook_url)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    # Reject bad uploads now rather than in the worker
+    upload = await ingest_upload(file)
+    payload = await asyncio.to_thread(upload.file.read)
+    job_id = await job_queue.submit(
+        "analyze_item",
+        payload,
+        meta={"filename": file.filename, "fresh": fresh},
+        webhook_url=webhook_url
+    )
+    
+    response_data = AnalyzeItemJobResponse(
+        success=True,
+        job_id=job_id,
+        status="queued",
+        status_url=f"/api/jobs/{job_id}"
+    )
+    
+    return ModelResponse(
+        status_code=202,
+        content=response_data,
+        headers={"Location": response_data.status_url}
+    )
+
+
+async def _run_analysis_job(payload: bytes, meta: dict) -> dict:
+    """Job handler: analyze a queued upload."""
+    file = UploadFile(file=BytesIO(payload), filename=meta.get("filename"))
+    try:
+        result, cache_headers = await _analyze_upload(file, meta.get("fresh", False))
+    except Exception as e:
+        error = _analysis_error(e)
+        raise JobFailed(str(error.detail), error.status_code)
+    
+    return {
+        "analysis": AnalysisResult(**result).model_dump(mode="json"),
+        "cache": cache_headers["X-Cache"]
+    }
+
+
+job_queue.register_handler("analyze_item", _run_analysis_job)
+
+
+async def _analyze_upload(file: UploadFile, fresh: bool = False) -> tuple[dict, dict]:
+    """
+    Run one upload through ingestion, the result caches, preprocessing and the
+    vision model. Returns the analysis and the cache/byte-count response headers.
+    With fresh=True the caches are only written, never read.
+    """
+    # Stream the upload in chunks: enforce the size limit, sniff the real
+    # image type from magic bytes and hash it without holding it in memory
+    upload = await ingest_upload(file)
+    
+    # Identical uploads (retries, double-clicks, re-listed photos) reuse a prior analysis
+    prompt_version = vision_prompt_version()
+    cache_key = make_cache_key(
+        upload.sha256,
+        settings.OPENROUTER_VISION_MODEL,
+        prompt_version
+    )
+    result = await vision_cache.get(cache_key) if settings.VISION_CACHE_ENABLED and not fresh else None
+    cache_status = "HIT" if result is not None else "MISS"
+    cache_headers = {}
+    
+    # Decode once off the event loop to hash, downscale and re-encode the upload
+    prepared = None
+    if result is None and (settings.PHASH_ENABLED or settings.IMAGE_PREPROCESS_ENABLED):
+        prepared = await asyncio.to_thread(
+            prepare_image, upload.file, upload.content_type, settings.PHASH_ENABLED, upload.size
+        )
+        cache_headers["X-Image-Bytes-Original"] = str(prepared.original_bytes)
+        cache_headers["X-Image-Bytes-Sent"] = str(prepared.sent_bytes)
+    
+    # Re-encoded, resized or screenshotted copies of a known photo reuse its analysis too
+    namespace = f"{settings.OPENROUTER_VISION_MODEL}:{prompt_version}"
+    perceptual_hash = prepared.perceptual_hash if prepared else None
+    colour = prepared.colour_signature if prepared else None
+    if perceptual_hash is not None and not fresh:
+        near = await asyncio.to_thread(
+            near_duplicate_index.find,
+            perceptual_hash,
+            colour,
+            namespace,
+            settings.PHASH_MAX_DISTANCE,
+            settings.PHASH_MAX_COLOUR_DIFF
+        )
+        if near is not None:
+            distance, result = near
+            cache_status = "NEAR"
+            cache_headers["X-Near-Duplicate-Distance"] = str(distance)
+    
+    if result is None:
+        if prepared is not None and prepared.data is not None:
+            image_base64 = base64.b64encode(prepared.data).decode("utf-8")
+            content_type = prepared.content_type
+        else:
+            image_base64 = await asyncio.to_thread(encode_base64, upload.file)
+            content_type = upload.content_type
+        # Only the base64 copy is needed from here on
+        prepared = None
         
-        # Check for specific OpenRouter errors
-        if "No endpoints found" in error_msg:
-            raise HTTPException(
-                status_code=503, 
-                detail="The vision model is currently unavailable. Please try again later or contact support."
+        # Analyze using vision service
+        result = await analyze_item_image(image_base64, content_type)
+        if perceptual_hash is not None:
+            await asyncio.to_thread(near_duplicate_index.add, perceptual_hash, colour, namespace, result)
+    
+    if cache_status != "HIT" and settings.VISION_CACHE_ENABLED:
+        await vision_cache.set(cache_key, result)
+    
+    # Every upload is its own item, even when the analysis is shared
+    result = {**result, "item_id": str(uuid.uuid4())}
+    if cache_status != "MISS":
+        # Reused analyses get organizations from the current registry, not the one cached with them
+        result["matching_organizations"] = get_matching_organizations(
+            result.get("category", "other"), result.get("subcategory"), result.get("recommended_paths")
+        )
+    await record_impact(analysis_event, result)
+    return result, {"X-Cache": cache_status, **cache_headers}
+
+
+def _analysis_error(e: Exception) -> HTTPException:
+    """Map a failed analysis to the HTTP error returned to the client."""
+    if isinstance(e, HTTPException):
+        return e
+    
+    if isinstance(e, ValueError):
+        logger.error(f"Configuration error: {e}")
+        return HTTPException(status_code=500, detail=str(e))
+    
+    error_msg = str(e)
+    logger.error(f"Analysis error: {error_msg}")
+    
+    # Check for specific OpenRouter errors
+    if "No endpoints found" in error_msg:
+        return HTTPException(
+            status_code=503, 
+            detail="The vision model is currently unavailable. Please try again later or contact support."
+        )
+    elif "Timeout" in error_msg:
+        return HTTPException(
+            status_code=504,
+            detail="The analysis request timed out. Please try with a smaller image."
+        )
+    else:
+        return HTTPException(status_code=500, detail=f"Analysis failed: {error_msg}")
+
+
+async def _analyze_batch_item(
+    index: int, file: UploadFile, semaphore: asyncio.Semaphore, fresh: bool = False
+) -> BatchItemResult:
+    """Analyze one batch item, capturing its error instead of raising."""
+    async with semaphore:
+        try:
+            result, cache_headers = await _analyze_upload(file, fresh)
+            return BatchItemResult(
+                index=index,
+                filename=file.filename,
+                success=True,
+                analysis=AnalysisResult(**result),
+                cache=cache_headers["X-Cache"]
             )
-        elif "Timeout" in error_msg:
-            raise HTTPException(
-                status_code=504,
-                detail="The analysis request timed out. Please try with a smaller image."
+        except Exception as e:
+            error = _analysis_error(e)
+            return BatchItemResult(
+                index=index,
+                filename=file.filename,
+                success=False,
+                status_code=error.status_code,
+                error=str(error.detail)
             )
-        else:
-            raise HTTPException(status_code=500, detail=f"Analysis failed: {error_msg}")
 
 
+async def _detach_upload(file: UploadFile) -> UploadFile:
+    """
+    Copy an upload to a spool file that outlives the request's own.
+
+    At most one byte past MAX_UPLOAD_BYTES is copied: enough for the item's
+    own ingestion to fail it with 413 without spooling the whole part again.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    await file.seek(0)
+    await asyncio.to_thread(_copy_bounded, file.file, spool, settings.MAX_UPLOAD_BYTES + 1)
+    spool.seek(0)
+    return UploadFile(file=spool, filename=file.filename, headers=file.headers)
+
+
+def _copy_bounded(source, target, limit: int) -> None:
+    """Copy at most limit bytes from source to target in UPLOAD_CHUNK_BYTES reads."""
+    while limit > 0:
+        chunk = source.read(min(settings.UPLOAD_CHUNK_BYTES, limit))
+        if not chunk:
+            break
+        target.write(chunk)
+        limit -= len(chunk)
+
+
+async def _stream_batch(
+    files: list[UploadFile], semaphore: asyncio.Semaphore, fresh: bool = False
+) -> AsyncIterator[bytes]:
+    """Yield one NDJSON line per item, in completion order."""
+    tasks = [
+        asyncio.create_task(_analyze_batch_item(index, file, semaphore, fresh))
+        for index, file in enumerate(files)
+    ]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            item = await next_done
+            yield dump_json(item) + b"\n"
+    finally:
+        # The client may disconnect mid-stream
+        for task in tasks:
+            task.cancel()
+        for file in files:
+            await file.close()
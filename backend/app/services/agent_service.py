@@ -1,6 +1,9 @@
 import uuid
+import time
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Optional
+from functools import lru_cache
+from typing import AsyncIterator, Optional
 import random
 import json
 import httpx
@@ -13,10 +16,87 @@ from langgraph.graph import StateGraph, END
 from typing import TypedDict, Annotated
 import operator
 
+import numpy as np
+
 from app.config import settings
+from app.services.geo_index import haversine_km
+from app.services.match_scoring import rank_matches
+from app.services.org_registry import organization_registry
+from app.services.partner_client import PartnerQueryResult, query_partners
 
 logger = logging.getLogger(__name__)
 
+# Used when a trade request carries no usable location (New York City Hall)
+DEFAULT_LOCATION = {"lat": 40.7128, "lng": -74.0060}
+
+
+@dataclass(slots=True)
+class StepRecord:
+    """One negotiation step as recorded by a graph node."""
+    action: str
+    party: str
+    details: str
+    timestamp: float
+
+
+def _record_step(action: str, details: str, party: str = "agent") -> StepRecord:
+    return StepRecord(action=action, party=party, details=details, timestamp=time.time())
+
+
+class StepLog:
+    """
+    Append-only log of negotiation steps.
+    
+    Logs are views over a shared backing list. Extending the newest view
+    appends to that list in O(k), so no node copies the history. LangGraph
+    may apply the same writes to a copied channel first (for example when
+    evaluating conditional edges); those steps are recognised by identity and
+    reused. Only a genuinely diverging branch pays for a copy.
+    """
+    __slots__ = ("_items", "_length")
+    
+    def __init__(self, items: Optional[list] = None, length: Optional[int] = None):
+        self._items = items if items is not None else []
+        self._length = len(self._items) if length is None else length
+    
+    def extend(self, steps) -> "StepLog":
+        items, length = self._items, self._length
+        steps = list(steps)
+        end = length + len(steps)
+        if len(items) == length:
+            items.extend(steps)
+        elif not (end <= len(items) and all(items[length + i] is step for i, step in enumerate(steps))):
+            items = items[:length] + steps
+        return StepLog(items, end)
+    
+    def __len__(self) -> int:
+        return self._length
+    
+    def __iter__(self):
+        return iter(self._items[:self._length])
+
+
+def _append_steps(history, new_steps) -> StepLog:
+    """Reducer for negotiation_history: O(k) in the number of new steps."""
+    if not isinstance(history, StepLog):
+        history = StepLog(list(history or []))
+    return history.extend(new_steps or [])
+
+
+def _serialize_steps(history) -> list[dict]:
+    """Convert the step log to NegotiationStep dicts once, at the end."""
+    return [_serialize_step(record, number) for number, record in enumerate(history, start=1)]
+
+
+def _serialize_step(record: StepRecord, number: int) -> dict:
+    return {
+        "step": number,
+        "action": record.action,
+        "party": record.party,
+        "details": record.details,
+        "timestamp": datetime.utcfromtimestamp(record.timestamp).isoformat()
+    }
+
 
 class AgentState(TypedDict):
     """State for the negotiation agent."""
@@ -24,11 +104,13 @@ class AgentState(TypedDict):
     item_id: str
     user_id: str
     preferred_path: Optional[str]
+    category: Optional[str]
     location: Optional[dict]
     current_step: str
     matches: list
     best_match: Optional[dict]
-    negotiation_history: list
+    unavailable_partners: list
+    negotiation_history: Annotated[StepLog, _append_steps]
 
 
 async def orchestrate_trade_negotiation(
@@ -42,61 +124,83 @@ async def orchestrate_trade_negotiation(
     Orchestrate trade negotiation using LangGraph agent with OpenRouter.
     
     The agent negotiates with NGOs and recycling centers via mock API
-    to find the best match for the item.
+    to find the best match for the item. `constraints["category"]`, when
+    given, is the item's ItemCategory and feeds match scoring.
+    """
+    result = None
+    async for kind, payload in stream_trade_negotiation(item_id, user_id, preferred_path, location, constraints):
+        if kind == "result":
+            result = payload
+    return result
+
+
+async def stream_trade_negotiation(
+    item_id: str,
+    user_id: str,
+    preferred_path: Optional[str] = None,
+    location: Optional[dict] = None,
+    constraints: Optional[dict] = None
+) -> AsyncIterator[tuple[str, dict]]:
+    """
+    Run the negotiation, yielding ("step", step) as each graph node finishes
+    and ("result", result) once at the end.
+    
+    Steps are numbered as they are emitted and match the result's
+    negotiation_steps. If the graph fails part way, the mock fallback is
+    delivered as the result only; its negotiation_steps are authoritative.
     """
     trade_id = f"trade-{uuid.uuid4().hex[:8]}"
+    category = (constraints or {}).get("category")
     
-    # Initialize LLM with OpenRouter if API key is available
-    llm = None
-    if settings.OPENROUTER_API_KEY:
-        try:
-            logger.info(f"Initializing LLM with model: {settings.OPENROUTER_AGENT_MODEL}")
-            llm = ChatOpenAI(
-                api_key=settings.OPENROUTER_API_KEY,
-                base_url=settings.OPENROUTER_BASE_URL,
-                model=settings.OPENROUTER_AGENT_MODEL,
-                default_headers={
-                    "HTTP-Referer": "https://terrasync.app",
-                    "X-Title": "TerraSync"
-                }
-            )
-        except Exception as e:
-            logger.error(f"Failed to initialize LLM: {e}")
+    # Reuse the LLM client and compiled graph for the current OpenRouter config
+    graph = get_negotiation_graph()
     
     # If no LLM, use mock negotiation
-    if not llm:
+    if graph is None:
         logger.warning("No LLM available, using mock negotiation")
-        return _get_mock_negotiation_result(trade_id, item_id)
+        result = _get_mock_negotiation_result(trade_id, item_id, location, preferred_path, category)
+        for step in result["negotiation_steps"]:
+            yield "step", step
+        yield "result", result
+        return
     
     try:
-        logger.info(f"Building negotiation graph for item: {item_id}")
-        # Build the negotiation graph
-        graph = _build_negotiation_graph(llm)
-        
         # Initialize state
         initial_state = AgentState(
             messages=[],
             item_id=item_id,
             user_id=user_id,
             preferred_path=preferred_path,
-            location=location or {"lat": 40.7128, "lng": -74.0060},
+            category=category,
+            location=location or DEFAULT_LOCATION,
             current_step="init",
             matches=[],
             best_match=None,
-            negotiation_history=[]
+            unavailable_partners=[],
+            negotiation_history=StepLog()
         )
         
         logger.info("Invoking negotiation graph...")
-        # Run the graph
-        result = graph.invoke(initial_state)
-        logger.info(f"Negotiation complete, found {len(result.get('matches', []))} matches")
+        # "updates" carries each node's new steps as it finishes; "values" the merged state after it
+        emitted = 0
+        state = initial_state
+        async for mode, chunk in graph.astream(initial_state, stream_mode=["updates", "values"]):
+            if mode == "values":
+                state = chunk
+                continue
+            for update in chunk.values():
+                for record in (update or {}).get("negotiation_history") or ():
+                    emitted += 1
+                    yield "step", _serialize_step(record, emitted)
+        logger.info(f"Negotiation complete, found {len(state.get('matches', []))} matches")
         
-        return {
+        result = {
             "trade_id": trade_id,
-            "status": "matched",
-            "negotiation_steps": result["negotiation_history"],
-            "matches": result["matches"],
-            "best_match": result["best_match"],
+            "status": "matched" if state.get("best_match") else "failed",
+            "negotiation_steps": _serialize_steps(state["negotiation_history"]),
+            "matches": state["matches"],
+            "best_match": state.get("best_match"),
+            "unavailable_partners": state["unavailable_partners"],
             "eco_credits_earned": random.randint(20, 100),
             "carbon_impact_kg": round(random.uniform(5.0, 25.0), 2)
         }
@@ -105,74 +209,108 @@ async def orchestrate_trade_negotiation(
         logger.error(f"Agent negotiation error: {type(e).__name__}: {str(e)}")
         import traceback
         logger.error(traceback.format_exc())
-        return _get_mock_negotiation_result(trade_id, item_id)
+        result = _get_mock_negotiation_result(trade_id, item_id, location, preferred_path, category)
+    
+    yield "result", result
+
+
+def get_negotiation_graph():
+    """
+    Return the compiled negotiation graph, or None when no LLM is configured.
+    
+    The LLM client and graph are built once per model config and shared by
+    all requests: ChatOpenAI is stateless per call and the compiled graph
+    keeps no state between invocations.
+    """
+    if not settings.OPENROUTER_API_KEY:
+        return None
+    try:
+        return _get_compiled_graph(
+            settings.OPENROUTER_API_KEY,
+            settings.OPENROUTER_BASE_URL,
+            settings.OPENROUTER_AGENT_MODEL
+        )
+    except Exception as e:
+        logger.error(f"Failed to initialize LLM: {e}")
+        return None
+
+
+@lru_cache(maxsize=8)
+def _get_llm(api_key: str, base_url: str, model: str) -> ChatOpenAI:
+    logger.info(f"Initializing LLM with model: {model}")
+    return ChatOpenAI(
+        api_key=api_key,
+        base_url=base_url,
+        model=model,
+        default_headers={
+            "HTTP-Referer": "https://terrasync.app",
+            "X-Title": "TerraSync"
+        }
+    )
+
+
+@lru_cache(maxsize=8)
+def _get_compiled_graph(api_key: str, base_url: str, model: str):
+    logger.info(f"Compiling negotiation graph for model: {model}")
+    return _build_negotiation_graph(_get_llm(api_key, base_url, model))
 
 
 def _build_negotiation_graph(llm: ChatOpenAI) -> StateGraph:
     """Build the LangGraph negotiation agent."""
     
-    def init_node(state: AgentState) -> dict:
+    async def init_node(state: AgentState) -> dict:
         """Initialize the negotiation process."""
         return {
             "current_step": "query_organizations",
-            "negotiation_history": [{
-                "step": 1,
-                "action": "initialize",
-                "party": "agent",
-                "details": "Starting negotiation process for item",
-                "timestamp": datetime.utcnow().isoformat()
-            }]
+            "negotiation_history": [
+                _record_step("initialize", "Starting negotiation process for item")
+            ]
         }
     
-    def query_organizations_node(state: AgentState) -> dict:
-        """Query mock APIs for matching organizations."""
-        # Simulate querying mock APIs
-        matches = _query_mock_apis(state["item_id"], state["preferred_path"])
+    async def query_organizations_node(state: AgentState) -> dict:
+        """Query partner APIs for matching organizations."""
+        partner_result = await _fetch_partner_matches(
+            state["item_id"], state["preferred_path"], state["location"], state["category"]
+        )
+        matches = partner_result.matches
+        details = f"Found {len(matches)} potential matches from NGOs and recycling centers"
+        if partner_result.unavailable:
+            details += f" ({len(partner_result.unavailable)} partners did not respond in time)"
         
         return {
             "current_step": "evaluate_matches",
             "matches": matches,
-            "negotiation_history": state["negotiation_history"] + [{
-                "step": 2,
-                "action": "query_apis",
-                "party": "agent",
-                "details": f"Found {len(matches)} potential matches from NGOs and recycling centers",
-                "timestamp": datetime.utcnow().isoformat()
-            }]
+            "unavailable_partners": partner_result.unavailable,
+            "negotiation_history": [_record_step("query_apis", details)]
         }
     
-    def evaluate_matches_node(state: AgentState) -> dict:
-        """Use LLM to evaluate and rank matches."""
-        matches = state["matches"]
+    async def evaluate_matches_node(state: AgentState) -> dict:
+        """Score every candidate and keep the top-ranked matches."""
+        matches = rank_matches(state["matches"], category=state["category"], preferred_path=state["preferred_path"])
         
         if not matches:
             return {
                 "current_step": "no_match",
-                "negotiation_history": state["negotiation_history"] + [{
-                    "step": 3,
-                    "action": "evaluate",
-                    "party": "agent",
-                    "details": "No suitable matches found",
-                    "timestamp": datetime.utcnow().isoformat()
-                }]
+                "negotiation_history": [
+                    _record_step("evaluate", "No suitable matches found")
+                ]
             }
         
-        # Rank matches by score
-        best_match = max(matches, key=lambda x: x["match_score"])
+        best_match = matches[0]
         
         return {
             "current_step": "negotiate",
+            "matches": matches,
             "best_match": best_match,
-            "negotiation_history": state["negotiation_history"] + [{
-                "step": 3,
-                "action": "evaluate",
-                "party": "agent",
-                "details": f"Selected best match: {best_match['organization_name']} with score {best_match['match_score']}",
-                "timestamp": datetime.utcnow().isoformat()
-            }]
+            "negotiation_history": [
+                _record_step(
+                    "evaluate",
+                    f"Selected best match: {best_match['organization_name']} with score {best_match['match_score']}"
+                )
+            ]
         }
     
-    def negotiate_node(state: AgentState) -> dict:
+    async def negotiate_node(state: AgentState) -> dict:
         """Negotiate terms with the best match."""
         best_match = state["best_match"]
         
@@ -183,35 +321,23 @@ def _build_negotiation_graph(llm: ChatOpenAI) -> StateGraph:
         
         return {
             "current_step": "finalize",
-            "negotiation_history": state["negotiation_history"] + [
-                {
-                    "step": 4,
-                    "action": "negotiate",
-                    "party": "agent",
-                    "details": f"Sent negotiation request to {best_match['organization_name']}",
-                    "timestamp": datetime.utcnow().isoformat()
-                },
-                {
-                    "step": 5,
-                    "action": "respond",
-                    "party": best_match['organization_name'],
-                    "details": f"Accepted terms: Pickup within 3 days, {best_match['proposed_terms'].get('credit_offer', 50)} eco-credits offered",
-                    "timestamp": datetime.utcnow().isoformat()
-                }
+            "negotiation_history": [
+                _record_step("negotiate", f"Sent negotiation request to {best_match['organization_name']}"),
+                _record_step(
+                    "respond",
+                    f"Accepted terms: Pickup within 3 days, {best_match['proposed_terms'].get('credit_offer', 50)} eco-credits offered",
+                    party=best_match['organization_name']
+                )
             ]
         }
     
-    def finalize_node(state: AgentState) -> dict:
+    async def finalize_node(state: AgentState) -> dict:
         """Finalize the trade."""
         return {
             "current_step": "completed",
-            "negotiation_history": state["negotiation_history"] + [{
-                "step": 6,
-                "action": "finalize",
-                "party": "agent",
-                "details": "Trade successfully orchestrated and matched",
-                "timestamp": datetime.utcnow().isoformat()
-            }]
+            "negotiation_history": [
+                _record_step("finalize", "Trade successfully orchestrated and matched")
+            ]
         }
     
     # Build the graph
@@ -228,110 +354,153 @@ def _build_negotiation_graph(llm: ChatOpenAI) -> StateGraph:
     workflow.set_entry_point("init")
     workflow.add_edge("init", "query_organizations")
     workflow.add_edge("query_organizations", "evaluate_matches")
-    workflow.add_edge("evaluate_matches", "negotiate")
+    # Stop early when no partner offered a match
+    workflow.add_conditional_edges(
+        "evaluate_matches",
+        lambda state: "negotiate" if state.get("best_match") else END
+    )
     workflow.add_edge("negotiate", "finalize")
     workflow.add_edge("finalize", END)
     
     return workflow.compile()
 
 
-def _query_mock_apis(item_id: str, preferred_path: Optional[str] = None) -> list[dict]:
-    """Query mock NGO and recycling APIs."""
-    # Simulate API responses
+async def _fetch_partner_matches(
+    item_id: str,
+    preferred_path: Optional[str] = None,
+    location: Optional[dict] = None,
+    category: Optional[str] = None
+) -> PartnerQueryResult:
+    """Fetch candidate matches from NGO and recycling partners."""
+    if settings.PARTNER_QUERY_ENABLED:
+        result = await query_partners(item_id, preferred_path, location)
+        _fill_partner_distances(result.matches, location)
+        return result
+    
+    # Simulate querying mock APIs
+    return PartnerQueryResult(matches=_query_mock_apis(item_id, preferred_path, location, category))
+
+
+def _query_mock_apis(
+    item_id: str,
+    preferred_path: Optional[str] = None,
+    location: Optional[dict] = None,
+    category: Optional[str] = None
+) -> list[dict]:
+    """
+    Answer as the mock NGO and recycling APIs: every indexed organization
+    within GEO_MATCH_RADIUS_KM of the item, nearest first.
+    
+    With a category, only organizations that accept it are offered (all
+    nearby ones if none do), so the scorer ranks the whole eligible set
+    rather than whichever organizations happen to be closest.
+    """
+    registry = organization_registry.current()
+    lat, lng = _coordinates(location)
+    nearby = registry.geo.within(lat, lng, settings.GEO_MATCH_RADIUS_KM)
+    accepting = {organization["id"] for organization in registry.for_category(category)}
+    if accepting:
+        nearby = [(distance, organization) for distance, organization in nearby if organization["id"] in accepting]
     return [
         {
-            "organization_id": "ngo-001",
-            "organization_name": "Green Earth Initiative",
-            "organization_type": "ngo",
-            "match_score": 0.92,
-            "proposed_terms": {
-                "credit_offer": 45,
-                "pickup_available": True,
-                "estimated_carbon_savings": 15.5
-            },
-            "distance_km": 4.2
-        },
-        {
-            "organization_id": "recycle-001",
-            "organization_name": "EcoTech Recycling",
-            "organization_type": "recycling_center",
-            "match_score": 0.88,
+            "organization_id": organization["id"],
+            "organization_name": organization["name"],
+            "organization_type": organization["type"],
             "proposed_terms": {
-                "credit_offer": 38,
-                "pickup_available": True,
-                "estimated_carbon_savings": 12.0
+                "credit_offer": organization["credit_offer"],
+                "pickup_available": organization["pickup_available"],
+                "estimated_carbon_savings": organization["estimated_carbon_savings"]
             },
-            "distance_km": 2.8
-        },
-        {
-            "organization_id": "ngo-002",
-            "organization_name": "Community Reuse Hub",
-            "organization_type": "ngo",
-            "match_score": 0.85,
-            "proposed_terms": {
-                "credit_offer": 42,
-                "pickup_available": False,
-                "estimated_carbon_savings": 18.0
-            },
-            "distance_km": 6.5
+            "distance_km": round(distance, 2),
+            # Scoring inputs; match_score is filled in by rank_matches
+            "categories": organization.get("categories", []),
+            "accepted_paths": organization.get("accepted_paths", []),
+            "capacity": organization.get("capacity"),
+            "acceptance_rate": organization.get("acceptance_rate")
         }
+        for distance, organization in nearby
     ]
 
 
-def _get_mock_negotiation_result(trade_id: str, item_id: str) -> dict:
+def _coordinates(location: Optional[dict]) -> tuple[float, float]:
+    """(lat, lng) from a request location, falling back to DEFAULT_LOCATION."""
+    try:
+        lat, lng = float(location["lat"]), float(location["lng"])
+    except (KeyError, TypeError, ValueError):
+        return DEFAULT_LOCATION["lat"], DEFAULT_LOCATION["lng"]
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return DEFAULT_LOCATION["lat"], DEFAULT_LOCATION["lng"]
+    return lat, lng
+
+
+def _fill_partner_distances(matches: list[dict], location: Optional[dict]) -> None:
+    """Compute distance_km for partner matches that report coordinates but no distance."""
+    located = [
+        match for match in matches
+        if match.get("distance_km") is None and isinstance(match.get("location"), dict)
+        and {"lat", "lng"} <= match["location"].keys()
+    ]
+    if not located:
+        return
+    lat, lng = _coordinates(location)
+    distances = haversine_km(
+        lat, lng,
+        np.array([float(match["location"]["lat"]) for match in located]),
+        np.array([float(match["location"]["lng"]) for match in located])
+    )
+    for match, distance in zip(located, distances):
+        match["distance_km"] = round(float(distance), 2)
+
+
+def _get_mock_negotiation_result(
+    trade_id: str,
+    item_id: str,
+    location: Optional[dict] = None,
+    preferred_path: Optional[str] = None,
+    category: Optional[str] = None
+) -> dict:
     """Return mock negotiation result for development/testing."""
-    matches = _query_mock_apis(item_id)
-    best_match = max(matches, key=lambda x: x["match_score"])
+    matches = rank_matches(
+        _query_mock_apis(item_id, preferred_path, location, category), category=category, preferred_path=preferred_path
+    )
+    if not matches:
+        return {
+            "trade_id": trade_id,
+            "status": "failed",
+            "negotiation_steps": _serialize_steps([
+                _record_step("initialize", "Starting negotiation process for item"),
+                _record_step("query_apis", "Found 0 potential matches from NGOs and recycling centers"),
+                _record_step("evaluate", "No suitable matches found")
+            ]),
+            "matches": [],
+            "best_match": None,
+            "unavailable_partners": [],
+            "eco_credits_earned": 0,
+            "carbon_impact_kg": 0.0
+        }
+    best_match = matches[0]
     
     return {
         "trade_id": trade_id,
         "status": "matched",
-        "negotiation_steps": [
-            {
-                "step": 1,
-                "action": "initialize",
-                "party": "agent",
-                "details": "Starting negotiation process for item",
-                "timestamp": datetime.utcnow().isoformat()
-            },
-            {
-                "step": 2,
-                "action": "query_apis",
-                "party": "agent",
-                "details": f"Found {len(matches)} potential matches from NGOs and recycling centers",
-                "timestamp": datetime.utcnow().isoformat()
-            },
-            {
-                "step": 3,
-                "action": "evaluate",
-                "party": "agent",
-                "details": f"Selected best match: {best_match['organization_name']} with score {best_match['match_score']}",
-                "timestamp": datetime.utcnow().isoformat()
-            },
-            {
-                "step": 4,
-                "action": "negotiate",
-                "party": "agent",
-                "details": f"Sent negotiation request to {best_match['organization_name']}",
-                "timestamp": datetime.utcnow().isoformat()
-            },
-            {
-                "step": 5,
-                "action": "respond",
-                "party": best_match['organization_name'],
-                "details": f"Accepted terms: Pickup within 3 days, {best_match['proposed_terms']['credit_offer']} eco-credits offered",
-                "timestamp": datetime.utcnow().isoformat()
-            },
-            {
-                "step": 6,
-                "action": "finalize",
-                "party": "agent",
-                "details": "Trade successfully orchestrated and matched",
-                "timestamp": datetime.utcnow().isoformat()
-            }
-        ],
+        "negotiation_steps": _serialize_steps([
+            _record_step("initialize", "Starting negotiation process for item"),
+            _record_step("query_apis", f"Found {len(matches)} potential matches from NGOs and recycling centers"),
+            _record_step(
+                "evaluate",
+                f"Selected best match: {best_match['organization_name']} with score {best_match['match_score']}"
+            ),
+            _record_step("negotiate", f"Sent negotiation request to {best_match['organization_name']}"),
+            _record_step(
+                "respond",
+                f"Accepted terms: Pickup within 3 days, {best_match['proposed_terms']['credit_offer']} eco-credits offered",
+                party=best_match['organization_name']
+            ),
+            _record_step("finalize", "Trade successfully orchestrated and matched")
+        ]),
         "matches": matches,
         "best_match": best_match,
+        "unavailable_partners": [],
         "eco_credits_earned": best_match["proposed_terms"]["credit_offer"],
         "carbon_impact_kg": best_match["proposed_terms"]["estimated_carbon_savings"]
     }
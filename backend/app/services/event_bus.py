@@ -0,0 +1,100 @@
+"""In-process publish/subscribe fan-out for server-sent event streams."""
+import asyncio
+import logging
+from typing import Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """One subscriber's bounded buffer of pre-encoded messages."""
+
+    def __init__(self, bus: "EventBus", max_buffered: int):
+        self._bus = bus
+        self._queue: asyncio.Queue[Optional[bytes]] = asyncio.Queue(maxsize=max_buffered)
+        self.dropped = False
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[bytes]:
+        """
+        Next message, or None once the subscription has been dropped.
+
+        Raises asyncio.TimeoutError if nothing arrives within `timeout`.
+        """
+        return await asyncio.wait_for(self._queue.get(), timeout)
+
+    def close(self) -> None:
+        self._bus.unsubscribe(self)
+
+    def _offer(self, message: bytes) -> bool:
+        try:
+            self._queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    def _drop(self) -> None:
+        # Discard the backlog so the end-of-stream marker is delivered straight away
+        self.dropped = True
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        self._queue.put_nowait(None)
+
+
+class EventBus:
+    """
+    Fan-out of messages to many subscribers on one event loop.
+
+    Messages are bytes encoded once by the publisher and shared by every
+    subscriber. publish() never waits: a subscriber whose buffer is full is
+    too slow to keep up and is dropped (its stream ends and the client
+    reconnects) rather than holding up everyone else or growing memory.
+    """
+
+    def __init__(self, max_subscribers: int = 10000, max_buffered: int = 64):
+        self.max_subscribers = max_subscribers
+        self.max_buffered = max_buffered
+        self._subscribers: set[Subscription] = set()
+        self.stats = {"published": 0, "delivered": 0, "dropped_subscribers": 0, "rejected_subscribers": 0}
+
+    def subscribe(self) -> Optional[Subscription]:
+        """Register a subscriber, or return None when the bus is at capacity."""
+        if len(self._subscribers) >= self.max_subscribers:
+            self.stats["rejected_subscribers"] += 1
+            return None
+        subscription = Subscription(self, self.max_buffered)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscribers.discard(subscription)
+
+    def publish(self, message: bytes) -> int:
+        """Deliver to every subscriber; returns how many accepted it."""
+        self.stats["published"] += 1
+        delivered = 0
+        slow = []
+        for subscription in self._subscribers:
+            if subscription._offer(message):
+                delivered += 1
+            else:
+                slow.append(subscription)
+        for subscription in slow:
+            self._subscribers.discard(subscription)
+            subscription._drop()
+        if slow:
+            self.stats["dropped_subscribers"] += len(slow)
+            logger.warning(f"Dropped {len(slow)} slow event stream subscribers")
+        self.stats["delivered"] += delivered
+        return delivered
+
+    def get_stats(self) -> dict:
+        return {**self.stats, "subscribers": len(self._subscribers), "max_subscribers": self.max_subscribers}
+
+
+# Live impact activity for /api/impact-stream
+impact_events = EventBus(
+    max_subscribers=settings.IMPACT_STREAM_MAX_SUBSCRIBERS,
+    max_buffered=settings.IMPACT_STREAM_BUFFER,
+)
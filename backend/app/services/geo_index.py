@@ -0,0 +1,139 @@
+"""Geospatial index over organization drop-off points for distance-based matching."""
+import math
+from typing import Optional
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+HALF_CIRCUMFERENCE_KM = math.pi * EARTH_RADIUS_KM
+
+
+def haversine_km(lat: float, lng: float, lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+    """Great-circle distances in km from one point to arrays of points (degrees)."""
+    lat1, lng1 = math.radians(lat), math.radians(lng)
+    lat2, lng2 = np.radians(lats), np.radians(lngs)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class GeoIndex:
+    """
+    Fixed lat/lng grid over point records, with k-nearest and radius queries.
+
+    Points are sorted by grid cell so each cell is one contiguous slice of the
+    coordinate arrays. A query gathers the slices of the cells its radius can
+    reach and computes exact haversine distances for just those points in one
+    vectorized pass; k-nearest doubles the radius until it holds k points.
+    """
+
+    def __init__(self, records: list[dict], cell_degrees: float = 0.05):
+        self.cell_degrees = cell_degrees
+        self._rows = math.ceil(180 / cell_degrees)
+        self._cols = math.ceil(360 / cell_degrees)
+
+        lats = np.array([float(record["lat"]) for record in records], dtype=np.float64)
+        lngs = np.array([float(record["lng"]) for record in records], dtype=np.float64)
+        cells = self._row(lats) * self._cols + self._col(lngs)
+        order = np.argsort(cells, kind="stable")
+
+        self.records = [records[i] for i in order]
+        self._lat_rad = np.radians(lats[order])
+        self._lng_rad = np.radians(lngs[order])
+        self._cos_lat = np.cos(self._lat_rad)
+
+        occupied, starts, counts = np.unique(cells[order], return_index=True, return_counts=True)
+        self._cells = {
+            int(cell): (int(start), int(start + count))
+            for cell, start, count in zip(occupied, starts, counts)
+        }
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def nearest(self, lat: float, lng: float, k: int, max_km: Optional[float] = None) -> list[tuple[float, dict]]:
+        """Return up to k (distance_km, record) pairs, nearest first."""
+        if k <= 0 or not self.records:
+            return []
+        limit = HALF_CIRCUMFERENCE_KM if max_km is None else max_km
+        radius = min(self.cell_degrees * KM_PER_DEGREE, limit)
+        while True:
+            indices = self._candidates(lat, lng, radius)
+            distances = self._distances(lat, lng, indices)
+            full_scan = indices.size == len(self.records)
+            inside = distances <= (limit if full_scan else radius)
+            # Once k points lie within the radius, nothing outside it can be nearer
+            if full_scan or radius >= limit or np.count_nonzero(inside) >= k:
+                return self._ranked(indices[inside], distances[inside], k)
+            radius = min(radius * 2, limit)
+
+    def within(self, lat: float, lng: float, radius_km: float) -> list[tuple[float, dict]]:
+        """Return every (distance_km, record) pair within radius_km, nearest first."""
+        if not self.records:
+            return []
+        indices = self._candidates(lat, lng, radius_km)
+        distances = self._distances(lat, lng, indices)
+        inside = distances <= radius_km
+        return self._ranked(indices[inside], distances[inside])
+
+    def get_stats(self) -> dict:
+        return {"organizations": len(self.records), "cells": len(self._cells), "cell_degrees": self.cell_degrees}
+
+    def _row(self, lat):
+        return np.clip(np.floor((lat + 90) / self.cell_degrees), 0, self._rows - 1).astype(np.int64)
+
+    def _col(self, lng):
+        return (np.floor((lng + 180) / self.cell_degrees).astype(np.int64)) % self._cols
+
+    def _candidates(self, lat: float, lng: float, radius_km: float) -> np.ndarray:
+        """Indices of every point in a grid cell that the radius can reach."""
+        lat_span = radius_km / KM_PER_DEGREE
+        row_low, row_high = int(self._row(lat - lat_span)), int(self._row(lat + lat_span))
+
+        # A degree of longitude shrinks towards the poles; size for the widest latitude reached
+        cos_lat = math.cos(math.radians(min(90.0, abs(lat) + lat_span)))
+        lng_span = radius_km / (KM_PER_DEGREE * cos_lat) if cos_lat > 1e-9 else 360.0
+        if lng_span >= 180:
+            col_offsets = range(self._cols)
+            col_start = 0
+        else:
+            col_start = int(math.floor((lng - lng_span + 180) / self.cell_degrees))
+            col_end = int(math.floor((lng + lng_span + 180) / self.cell_degrees))
+            col_offsets = range(min(col_end - col_start + 1, self._cols))
+
+        # Past this many cells it is cheaper to measure every point
+        if (row_high - row_low + 1) * len(col_offsets) >= len(self._cells):
+            return np.arange(len(self.records))
+
+        spans = []
+        for row in range(row_low, row_high + 1):
+            base = row * self._cols
+            for offset in col_offsets:
+                span = self._cells.get(base + (col_start + offset) % self._cols)
+                if span is not None:
+                    spans.append(span)
+        if not spans:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate([np.arange(start, end) for start, end in spans])
+
+    def _distances(self, lat: float, lng: float, indices: np.ndarray) -> np.ndarray:
+        lat1, lng1 = math.radians(lat), math.radians(lng)
+        lat2 = self._lat_rad[indices]
+        a = (np.sin((lat2 - lat1) / 2) ** 2
+             + math.cos(lat1) * self._cos_lat[indices] * np.sin((self._lng_rad[indices] - lng1) / 2) ** 2)
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+    def _ranked(self, indices: np.ndarray, distances: np.ndarray, k: Optional[int] = None) -> list[tuple[float, dict]]:
+        if k is not None and distances.size > k:
+            top = np.argpartition(distances, k - 1)[:k]
+            indices, distances = indices[top], distances[top]
+        order = np.argsort(distances, kind="stable")
+        return [(float(distances[i]), self.records[indices[i]]) for i in order]
+
+
+def has_coordinates(record: dict) -> bool:
+    """Whether a record has a usable `lat`/`lng` pair."""
+    try:
+        return -90 <= float(record["lat"]) <= 90 and -180 <= float(record["lng"]) <= 180
+    except (KeyError, TypeError, ValueError):
+        return False
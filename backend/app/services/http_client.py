@@ -0,0 +1,100 @@
+"""Application-lifetime pooled HTTP client for outbound calls (OpenRouter, partners)."""
+import importlib.util
+import logging
+from typing import Optional
+
+import httpx
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _http2_available() -> bool:
+    """HTTP/2 needs the optional `h2` package (installed via `httpx[http2]`)."""
+    return importlib.util.find_spec("h2") is not None
+
+
+def _create_client() -> httpx.AsyncClient:
+    http2 = settings.HTTP_CLIENT_HTTP2 and _http2_available()
+    if settings.HTTP_CLIENT_HTTP2 and not http2:
+        logger.warning("HTTP/2 requested but `h2` is not installed, falling back to HTTP/1.1")
+
+    limits = httpx.Limits(
+        max_connections=settings.HTTP_CLIENT_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.HTTP_CLIENT_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.HTTP_CLIENT_KEEPALIVE_EXPIRY_SECONDS,
+    )
+    timeout = httpx.Timeout(
+        settings.HTTP_CLIENT_TIMEOUT_SECONDS,
+        connect=settings.HTTP_CLIENT_CONNECT_TIMEOUT_SECONDS,
+        pool=settings.HTTP_CLIENT_POOL_TIMEOUT_SECONDS,
+    )
+    logger.info(
+        f"Creating shared HTTP client (http2={http2}, max_connections={limits.max_connections}, "
+        f"max_keepalive={limits.max_keepalive_connections})"
+    )
+    return httpx.AsyncClient(http2=http2, limits=limits, timeout=timeout)
+
+
+async def start_http_client() -> httpx.AsyncClient:
+    """Create the shared client. Called from the app lifespan."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _create_client()
+    return _client
+
+
+async def close_http_client() -> None:
+    """Close the shared client and drop all pooled connections."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Return the shared client.
+
+    The lifespan normally creates it; fall back to lazy creation so code paths
+    that run without the lifespan (scripts, bare TestClient) keep working.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _create_client()
+    return _client
+
+
+def get_pool_stats() -> dict:
+    """Return connection pool usage for sizing the pool."""
+    stats = {
+        "started": _client is not None and not _client.is_closed,
+        "http2": settings.HTTP_CLIENT_HTTP2 and _http2_available(),
+        "max_connections": settings.HTTP_CLIENT_MAX_CONNECTIONS,
+        "max_keepalive_connections": settings.HTTP_CLIENT_MAX_KEEPALIVE_CONNECTIONS,
+        "connections": 0,
+        "in_use": 0,
+        "idle": 0,
+        "waiting": 0,
+    }
+    if not stats["started"]:
+        return stats
+
+    # httpx does not expose pool stats publicly, so read them from the
+    # underlying httpcore pool and degrade to zeros if its layout changes.
+    pool = getattr(getattr(_client, "_transport", None), "_pool", None)
+    if pool is None:
+        return stats
+
+    connections = list(getattr(pool, "connections", []))
+    idle = sum(1 for conn in connections if conn.is_idle())
+    stats["connections"] = len(connections)
+    stats["idle"] = idle
+    stats["in_use"] = len(connections) - idle
+    stats["waiting"] = sum(
+        1 for request in getattr(pool, "_requests", []) if request.is_queued()
+    )
+    return stats
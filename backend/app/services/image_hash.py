@@ -0,0 +1,170 @@
+"""Perceptual hashing and near-duplicate lookup for uploaded images."""
+import threading
+from collections import deque
+from typing import Optional
+
+from PIL import Image
+
+from app.config import settings
+
+HASH_SIZE = 8
+COLOUR_GRID = 2
+
+
+def dhash(image: Image.Image) -> int:
+    """
+    Compute a 64-bit difference hash.
+
+    The image is reduced to a 9x8 grayscale thumbnail and each bit records
+    whether a pixel is brighter than its right neighbour, which survives
+    re-encoding, resizing and mild colour changes.
+    """
+    small = image.convert("L").resize((HASH_SIZE + 1, HASH_SIZE), Image.Resampling.LANCZOS)
+    pixels = list(small.getdata())
+
+    value = 0
+    for row in range(HASH_SIZE):
+        offset = row * (HASH_SIZE + 1)
+        for col in range(HASH_SIZE):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def colour_signature(image: Image.Image) -> bytes:
+    """
+    Mean colour of each quadrant, as 12 RGB bytes.
+
+    dhash only sees grayscale gradients, so two objects of the same shape in
+    different colours can hash a few bits apart; this tells them apart.
+    """
+    return image.convert("RGB").resize((COLOUR_GRID, COLOUR_GRID), Image.Resampling.BOX).tobytes()
+
+
+def colour_distance(a: bytes, b: bytes) -> int:
+    """Largest per-channel difference between two colour signatures."""
+    return max(abs(x - y) for x, y in zip(a, b))
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class BKTree:
+    """BK-tree over 64-bit hashes for Hamming-radius queries."""
+
+    def __init__(self):
+        # Each node is [hash, value, {distance: child}]
+        self._root: Optional[list] = None
+        self.size = 0
+
+    def add(self, hash_value: int, value) -> None:
+        self.size += 1
+        if self._root is None:
+            self._root = [hash_value, value, {}]
+            return
+
+        node = self._root
+        while True:
+            distance = hamming_distance(hash_value, node[0])
+            if distance == 0:
+                node[1] = value
+                self.size -= 1
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [hash_value, value, {}]
+                return
+            node = child
+
+    def search(self, hash_value: int, max_distance: int) -> list[tuple[int, object]]:
+        """Return (distance, value) pairs within max_distance, nearest first."""
+        if self._root is None:
+            return []
+
+        results = []
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            distance = hamming_distance(hash_value, node[0])
+            if distance <= max_distance:
+                results.append((distance, node[1]))
+            # Triangle inequality: only subtrees in [d - r, d + r] can match
+            low, high = distance - max_distance, distance + max_distance
+            for child_distance, child in node[2].items():
+                if low <= child_distance <= high:
+                    stack.append(child)
+
+        results.sort(key=lambda item: item[0])
+        return results
+
+
+class NearDuplicateIndex:
+    """
+    Bounded perceptual-hash index of prior analyses.
+
+    A prior upload matches when its dhash is within the Hamming radius and its
+    colour signature is within the colour tolerance. BK-trees do not support
+    deletion, so once the index is over capacity it is rebuilt from the most
+    recent entries. Lookups and inserts take a lock so they can run in worker
+    threads.
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries: deque[tuple[int, bytes, str, dict]] = deque()
+        self._tree = BKTree()
+        self._lock = threading.Lock()
+        self.stats = {"near_hits": 0, "colour_rejects": 0, "lookups": 0, "rebuilds": 0}
+
+    def add(self, hash_value: int, colour: bytes, namespace: str, analysis: dict) -> None:
+        with self._lock:
+            self._entries.append((hash_value, colour, namespace, analysis))
+            self._tree.add(hash_value, (colour, namespace, analysis))
+            if len(self._entries) > self.max_entries:
+                self._rebuild()
+
+    def find(
+        self,
+        hash_value: int,
+        colour: bytes,
+        namespace: str,
+        max_distance: int,
+        max_colour_distance: int,
+    ) -> Optional[tuple[int, dict]]:
+        """Return (distance, analysis) for the closest matching prior upload in namespace."""
+        with self._lock:
+            self.stats["lookups"] += 1
+            for distance, (entry_colour, entry_namespace, analysis) in self._tree.search(hash_value, max_distance):
+                if entry_namespace != namespace:
+                    continue
+                if colour_distance(colour, entry_colour) > max_colour_distance:
+                    self.stats["colour_rejects"] += 1
+                    continue
+                self.stats["near_hits"] += 1
+                return distance, analysis
+        return None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._tree = BKTree()
+            for name in self.stats:
+                self.stats[name] = 0
+
+    def get_stats(self) -> dict:
+        return {**self.stats, "entries": self._tree.size, "max_entries": self.max_entries}
+
+    def _rebuild(self) -> None:
+        # Drop the oldest quarter so rebuilds stay amortized O(1) per insert
+        keep = self.max_entries - self.max_entries // 4
+        while len(self._entries) > keep:
+            self._entries.popleft()
+        tree = BKTree()
+        for hash_value, colour, namespace, analysis in self._entries:
+            tree.add(hash_value, (colour, namespace, analysis))
+        self._tree = tree
+        self.stats["rebuilds"] += 1
+
+
+# Global near-duplicate index instance
+near_duplicate_index = NearDuplicateIndex(max_entries=settings.PHASH_INDEX_MAX_ENTRIES)
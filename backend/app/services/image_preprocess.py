@@ -0,0 +1,109 @@
+"""Downscale and re-encode uploads before they are sent to the vision model."""
+import io
+import logging
+from dataclasses import dataclass
+from typing import BinaryIO, Optional, Union
+
+from PIL import Image, ImageOps
+
+from app.config import settings
+from app.services.image_hash import colour_signature, dhash
+
+logger = logging.getLogger(__name__)
+
+OUTPUT_CONTENT_TYPES = {"WEBP": "image/webp", "JPEG": "image/jpeg"}
+
+
+@dataclass
+class PreparedImage:
+    """
+    Image bytes ready for the model, plus what was learned while decoding.
+
+    `data` is None when the original upload should be sent unchanged.
+    """
+    data: Optional[bytes]
+    content_type: str
+    original_bytes: int
+    perceptual_hash: Optional[int] = None
+    colour_signature: Optional[bytes] = None
+
+    @property
+    def sent_bytes(self) -> int:
+        return self.original_bytes if self.data is None else len(self.data)
+
+
+def prepare_image(
+    source: Union[bytes, BinaryIO],
+    content_type: str,
+    compute_hash: bool = False,
+    original_bytes: Optional[int] = None,
+) -> PreparedImage:
+    """
+    Decode an upload once, then hash, downscale and re-encode it.
+
+    Caps the longest edge at IMAGE_MAX_EDGE_PX, applies and drops EXIF
+    orientation/metadata, and re-encodes at IMAGE_OUTPUT_QUALITY. `source` may
+    be a file object so large uploads are decoded straight from their spool
+    file. If Pillow cannot decode the upload, or it needed no resize or EXIF
+    removal and re-encoding would not make it smaller, the original is passed
+    through unchanged. Blocking: call it from a worker thread.
+    """
+    if isinstance(source, bytes):
+        original_bytes = len(source)
+        source = io.BytesIO(source)
+    elif original_bytes is None:
+        original_bytes = source.seek(0, io.SEEK_END)
+    original = PreparedImage(data=None, content_type=content_type, original_bytes=original_bytes)
+    if not settings.IMAGE_PREPROCESS_ENABLED and not compute_hash:
+        return original
+
+    max_edge = settings.IMAGE_MAX_EDGE_PX
+    output_format = settings.IMAGE_OUTPUT_FORMAT.upper()
+    if output_format not in OUTPUT_CONTENT_TYPES:
+        output_format = "JPEG"
+
+    try:
+        source.seek(0)
+        with Image.open(source) as image:
+            source_size = image.size
+            has_exif = "exif" in image.info or bool(image.getexif())
+            # JPEG decoders can scale down by 1/2..1/8 while decoding
+            image.draft("RGB", (max_edge, max_edge))
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+
+            perceptual_hash = dhash(image) if compute_hash else None
+            colour = colour_signature(image) if compute_hash else None
+            if not settings.IMAGE_PREPROCESS_ENABLED:
+                original.perceptual_hash = perceptual_hash
+                original.colour_signature = colour
+                return original
+
+            if output_format == "JPEG" or image.mode not in ("RGB", "RGBA"):
+                image = image.convert("RGBA" if output_format == "WEBP" and "A" in image.getbands() else "RGB")
+
+            buffer = io.BytesIO()
+            # No exif= argument, so metadata from the original is not carried over
+            image.save(buffer, format=output_format, quality=settings.IMAGE_OUTPUT_QUALITY)
+    except Exception as e:
+        logger.warning(f"Image preprocessing failed, sending original upload: {e}")
+        return original
+    finally:
+        source.seek(0)
+
+    # A small or already well-compressed upload can grow when re-encoded
+    if image.size == source_size and not has_exif and buffer.tell() >= original.original_bytes:
+        original.perceptual_hash = perceptual_hash
+        original.colour_signature = colour
+        logger.info(f"Sending original upload: re-encoding would not shrink {original.original_bytes} bytes")
+        return original
+
+    prepared = PreparedImage(
+        data=buffer.getvalue(),
+        content_type=OUTPUT_CONTENT_TYPES[output_format],
+        original_bytes=original.original_bytes,
+        perceptual_hash=perceptual_hash,
+        colour_signature=colour,
+    )
+    logger.info(f"Preprocessed image: {prepared.original_bytes} -> {prepared.sent_bytes} bytes ({output_format})")
+    return prepared
@@ -0,0 +1,267 @@
+"""Impact event log with incrementally maintained rollups for the dashboard."""
+import asyncio
+import logging
+import math
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Counters kept in the totals row and in every daily/weekly bucket
+ROLLUP_COLUMNS = ("analyses", "trades", "trades_matched", "impact", "co2_kg", "waste_kg", "eco_credits")
+
+
+@dataclass
+class ImpactEvent:
+    """
+    One completed analysis or trade.
+
+    Analyses carry the item's estimated CO2 and waste savings; trades carry the
+    eco-credits actually earned and whether a partner was matched.
+    """
+    type: str  # "analysis" or "trade"
+    description: str
+    impact: int
+    co2_kg: float = 0.0
+    waste_kg: float = 0.0
+    eco_credits: int = 0
+    matched: bool = False
+    user_id: Optional[str] = None
+    location: Optional[str] = None
+    created_at: float = 0.0
+    id: str = ""
+
+    def rollup_increments(self) -> tuple:
+        return (
+            int(self.type == "analysis"),
+            int(self.type == "trade"),
+            int(self.type == "trade" and self.matched),
+            self.impact,
+            self.co2_kg,
+            self.waste_kg,
+            self.eco_credits,
+        )
+
+
+class ImpactStore:
+    """
+    SQLite event log plus pre-aggregated totals, daily and ISO-week buckets.
+
+    Each event is inserted and folded into its rollup rows in the same
+    transaction, so reading the dashboard is a handful of primary-key
+    lookups however long the history grows. Several app processes can share
+    one file: writes use BEGIN IMMEDIATE and WAL keeps readers unblocked.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._listeners: list[Callable[[ImpactEvent], None]] = []
+
+    def add_listener(self, listener: Callable[[ImpactEvent], None]) -> None:
+        """Call `listener` with every event after it has been committed."""
+        self._listeners.append(listener)
+
+    async def record(self, event: ImpactEvent) -> ImpactEvent:
+        event.id = event.id or f"act-{uuid.uuid4().hex[:12]}"
+        event.created_at = event.created_at or time.time()
+        await asyncio.to_thread(self._insert, event)
+        for listener in self._listeners:
+            listener(event)
+        return event
+
+    async def get_dashboard(self, days: int = 7, weeks: int = 8, recent: int = 5) -> dict:
+        return await asyncio.to_thread(self._read_dashboard, days, weeks, recent)
+
+    def close(self) -> None:
+        with self._db_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            counters = ", ".join(f"{column} REAL NOT NULL DEFAULT 0" for column in ROLLUP_COLUMNS)
+            self._conn.executescript(
+                "CREATE TABLE IF NOT EXISTS events ("
+                "id TEXT PRIMARY KEY, type TEXT NOT NULL, description TEXT NOT NULL, impact INTEGER NOT NULL, "
+                "co2_kg REAL NOT NULL, waste_kg REAL NOT NULL, eco_credits INTEGER NOT NULL, matched INTEGER NOT NULL, "
+                "user_id TEXT, location TEXT, created_at REAL NOT NULL);"
+                "CREATE INDEX IF NOT EXISTS idx_events_created ON events(created_at);"
+                f"CREATE TABLE IF NOT EXISTS totals (id INTEGER PRIMARY KEY CHECK (id = 1), "
+                f"active_users INTEGER NOT NULL DEFAULT 0, {counters});"
+                "INSERT OR IGNORE INTO totals (id) VALUES (1);"
+                f"CREATE TABLE IF NOT EXISTS daily (bucket TEXT PRIMARY KEY, {counters});"
+                f"CREATE TABLE IF NOT EXISTS weekly (bucket TEXT PRIMARY KEY, {counters});"
+                "CREATE TABLE IF NOT EXISTS users (user_id TEXT PRIMARY KEY, first_seen REAL NOT NULL);"
+            )
+        return self._conn
+
+    def _insert(self, event: ImpactEvent) -> None:
+        increments = event.rollup_increments()
+        day, week = _day_bucket(event.created_at), _week_bucket(event.created_at)
+        placeholders = ", ".join("?" for _ in ROLLUP_COLUMNS)
+        additions = ", ".join(f"{column} = {column} + excluded.{column}" for column in ROLLUP_COLUMNS)
+        with self._db_lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT INTO events (id, type, description, impact, co2_kg, waste_kg, eco_credits, matched, "
+                    "user_id, location, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (event.id, event.type, event.description, event.impact, event.co2_kg, event.waste_kg,
+                     event.eco_credits, int(event.matched), event.user_id, event.location, event.created_at),
+                )
+                new_user = event.user_id is not None and conn.execute(
+                    "INSERT OR IGNORE INTO users (user_id, first_seen) VALUES (?, ?)", (event.user_id, event.created_at)
+                ).rowcount == 1
+                conn.execute(
+                    "UPDATE totals SET active_users = active_users + ?, "
+                    + ", ".join(f"{column} = {column} + ?" for column in ROLLUP_COLUMNS) + " WHERE id = 1",
+                    (int(new_user), *increments),
+                )
+                for table, bucket in (("daily", day), ("weekly", week)):
+                    conn.execute(
+                        f"INSERT INTO {table} (bucket, {', '.join(ROLLUP_COLUMNS)}) VALUES (?, {placeholders}) "
+                        f"ON CONFLICT(bucket) DO UPDATE SET {additions}",
+                        (bucket, *increments),
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _read_dashboard(self, days: int, weeks: int, recent: int) -> dict:
+        now = time.time()
+        day_keys = [_day_bucket(now - offset * 86400) for offset in range(days - 1, -1, -1)]
+        week_keys = [_week_bucket(now - offset * 7 * 86400) for offset in range(weeks - 1, -1, -1)]
+        columns = ", ".join(ROLLUP_COLUMNS)
+        with self._db_lock:
+            conn = self._connection()
+            totals_row = conn.execute(f"SELECT active_users, {columns} FROM totals WHERE id = 1").fetchone()
+            daily = _buckets(conn, "daily", day_keys)
+            weekly = _buckets(conn, "weekly", week_keys)
+            recent_rows = conn.execute(
+                "SELECT id, type, description, impact, location, created_at FROM events "
+                "ORDER BY created_at DESC LIMIT ?",
+                (recent,),
+            ).fetchall()
+
+        return {
+            "totals": {"active_users": totals_row[0], **dict(zip(ROLLUP_COLUMNS, totals_row[1:]))},
+            "daily": [{"bucket": key, **daily.get(key, _empty_bucket())} for key in day_keys],
+            "weekly": [{"bucket": key, **weekly.get(key, _empty_bucket())} for key in week_keys],
+            "recent": [
+                {
+                    "id": row[0],
+                    "type": row[1],
+                    "description": row[2],
+                    "impact": row[3],
+                    "location": row[4],
+                    "timestamp": datetime.fromtimestamp(row[5], tz=timezone.utc).replace(tzinfo=None).isoformat(),
+                }
+                for row in recent_rows
+            ],
+        }
+
+
+def analysis_event(analysis: dict) -> ImpactEvent:
+    """Event for a completed item analysis; missing or non-numeric model output counts as zero."""
+    paths = analysis.get("recommended_paths") or []
+    item = str(analysis.get("subcategory") or analysis.get("category") or "item").replace("_", " ")
+    environmental = analysis.get("environmental_impact") or {}
+    return ImpactEvent(
+        type="analysis",
+        description=f"{item.capitalize()} analyzed for {paths[0]}" if paths else f"{item.capitalize()} analyzed",
+        impact=int(_number((analysis.get("circular_value") or {}).get("eco_credits"))),
+        co2_kg=_number(environmental.get("co2_saved_kg")),
+        waste_kg=_number(environmental.get("waste_diverted_kg")),
+    )
+
+
+def trade_event(result: dict, user_id: Optional[str] = None, location: Optional[dict] = None) -> ImpactEvent:
+    """Event for a finished trade negotiation, matched or not."""
+    best_match = result.get("best_match")
+    credits = int(_number(result.get("eco_credits_earned"))) if best_match else 0
+    return ImpactEvent(
+        type="trade",
+        description=f"Item matched with {best_match['organization_name']}" if best_match else "Trade found no match",
+        impact=credits,
+        eco_credits=credits,
+        matched=best_match is not None,
+        user_id=user_id,
+        location=_format_location(location),
+    )
+
+
+async def record_impact(build: Callable[..., ImpactEvent], *args) -> None:
+    """
+    Build an event with build(*args) and record it.
+
+    Dashboard bookkeeping never fails the request that produced it, so
+    building the event from model or client output is guarded too.
+    """
+    try:
+        event = build(*args)
+        await impact_store.record(event)
+    except Exception as e:
+        logger.warning(f"Could not record {build.__name__} impact: {type(e).__name__}: {e}")
+
+
+def _number(value) -> float:
+    """A finite float from model or client output, or 0.0."""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return number if math.isfinite(number) else 0.0
+
+
+def _format_location(location) -> Optional[str]:
+    """'lat, lng' for a usable request location (numbers or numeric strings), else None."""
+    if not isinstance(location, dict):
+        return None
+    try:
+        lat, lng = float(location["lat"]), float(location["lng"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return None
+    return f"{lat:.4f}, {lng:.4f}"
+
+
+def _buckets(conn: sqlite3.Connection, table: str, keys: list[str]) -> dict[str, dict]:
+    rows = conn.execute(
+        f"SELECT bucket, {', '.join(ROLLUP_COLUMNS)} FROM {table} WHERE bucket IN ({', '.join('?' for _ in keys)})",
+        keys,
+    ).fetchall()
+    return {row[0]: dict(zip(ROLLUP_COLUMNS, row[1:])) for row in rows}
+
+
+def _empty_bucket() -> dict:
+    return dict.fromkeys(ROLLUP_COLUMNS, 0)
+
+
+def _day_bucket(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).strftime("%Y-%m-%d")
+
+
+def _week_bucket(timestamp: float) -> str:
+    year, week, _ = datetime.fromtimestamp(timestamp, tz=timezone.utc).isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+# Global impact store instance
+impact_store = ImpactStore(db_path=settings.IMPACT_DB_PATH)
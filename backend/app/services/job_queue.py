@@ -0,0 +1,401 @@
+"""Persistent background job queue with submit/poll/webhook semantics."""
+import asyncio
+import ipaddress
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+from urllib.parse import urlsplit
+
+from app.config import settings
+from app.services.http_client import get_http_client
+
+logger = logging.getLogger(__name__)
+
+# A handler receives the job payload and metadata and returns a JSON-serializable result
+JobHandler = Callable[[bytes, dict], Awaitable[dict]]
+
+
+class JobFailed(Exception):
+    """Raised by handlers to fail a job with a specific status code."""
+
+    def __init__(self, message: str, status_code: int = 500):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class JobQueue:
+    """
+    SQLite-backed job queue drained by an in-process worker pool.
+
+    Jobs survive restarts. Claiming uses BEGIN IMMEDIATE so several app
+    processes can share one queue file, and a claimed job carries its
+    worker's owner id and a lease that is renewed while it runs. A job is
+    only taken over once its lease has expired, that is when the process
+    running it died, so jobs other live processes are running are never
+    run (or their webhooks sent) twice. A process that stops cleanly hands
+    its running jobs back at once.
+    """
+
+    def __init__(self, db_path: str, workers: int = 4, result_ttl_seconds: int = 86400, lease_seconds: float = 60.0):
+        self.db_path = db_path
+        self.workers = workers
+        self.result_ttl_seconds = result_ttl_seconds
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._handlers: dict[str, JobHandler] = {}
+        self._conn: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: list[asyncio.Task] = []
+        self._wait_times: deque[float] = deque(maxlen=1000)
+        self._service_times: deque[float] = deque(maxlen=1000)
+        self.stats = {
+            "submitted": 0, "succeeded": 0, "failed": 0, "lost_leases": 0,
+            "worker_errors": 0, "webhooks_sent": 0, "webhooks_failed": 0
+        }
+
+    def register_handler(self, kind: str, handler: JobHandler) -> None:
+        self._handlers[kind] = handler
+
+    async def start(self) -> None:
+        """Re-queue jobs whose worker died and start the worker pool."""
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        recovered = await asyncio.to_thread(self._recover)
+        if recovered:
+            logger.info(f"Re-queued {recovered} interrupted jobs")
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        self._wakeup.set()
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        with self._db_lock:
+            if self._conn is not None:
+                # Hand interrupted jobs back now rather than when their leases run out
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'queued', owner = NULL, lease_expires_at = NULL, started_at = NULL "
+                    "WHERE status = 'running' AND owner = ?",
+                    (self.owner,),
+                )
+                self._conn.close()
+                self._conn = None
+
+    async def submit(self, kind: str, payload: bytes, meta: Optional[dict] = None, webhook_url: Optional[str] = None) -> str:
+        """Persist a job and wake a worker. Returns the job id."""
+        if kind not in self._handlers:
+            raise ValueError(f"No handler registered for job kind: {kind}")
+        job_id = f"job-{uuid.uuid4().hex}"
+        await asyncio.to_thread(self._insert, job_id, kind, payload, meta or {}, webhook_url)
+        self.stats["submitted"] += 1
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job_id
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        return await asyncio.to_thread(self._fetch, job_id)
+
+    async def get_stats(self) -> dict:
+        counts = await asyncio.to_thread(self._status_counts)
+        return {
+            **self.stats,
+            "workers": len(self._tasks),
+            "depth": counts.get("queued", 0),
+            "running": counts.get("running", 0),
+            "wait_time_seconds": _summarize(self._wait_times),
+            "service_time_seconds": _summarize(self._service_times),
+        }
+
+    async def _worker(self, worker_id: int) -> None:
+        errors = 0
+        while True:
+            try:
+                job = await asyncio.to_thread(self._claim)
+                if job is None:
+                    self._wakeup.clear()
+                    try:
+                        # Poll as a fallback for jobs submitted by other processes
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=settings.JOB_QUEUE_POLL_SECONDS)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                await self._run(job)
+                errors = 0
+            except Exception as e:
+                # A locked or unavailable queue file must not kill the worker for good;
+                # a job left running is taken over once its lease runs out
+                errors += 1
+                self.stats["worker_errors"] += 1
+                delay = settings.JOB_QUEUE_POLL_SECONDS * min(2 ** (errors - 1), 16)
+                logger.error(f"Job worker {worker_id} error, retrying in {delay:.1f}s: {type(e).__name__}: {e}")
+                await asyncio.sleep(delay)
+
+    async def _run(self, job: dict) -> None:
+        started_at = time.time()
+        self._wait_times.append(started_at - job["created_at"])
+        status, result, error, status_code = "succeeded", None, None, 200
+        renewal = asyncio.create_task(self._renew_lease(job["id"]))
+        try:
+            result = await self._handlers[job["kind"]](job["payload"], job["meta"])
+        except asyncio.CancelledError:
+            # stop() hands the job back to the queue
+            raise
+        except JobFailed as e:
+            status, error, status_code = "failed", str(e), e.status_code
+        except Exception as e:
+            logger.error(f"Job {job['id']} failed: {type(e).__name__}: {e}")
+            status, error, status_code = "failed", str(e), 500
+        finally:
+            renewal.cancel()
+
+        finished_at = time.time()
+        self._service_times.append(finished_at - started_at)
+        if not await asyncio.to_thread(self._finish, job["id"], status, result, error, status_code, finished_at):
+            # The lease ran out and another worker took the job over; its result and webhook win
+            self.stats["lost_leases"] += 1
+            logger.warning(f"Job {job['id']} finished after its lease was taken over; result discarded")
+            return
+        self.stats[status] += 1
+
+        if job["webhook_url"]:
+            await self._send_webhook(job["webhook_url"], {
+                "job_id": job["id"],
+                "status": status,
+                "status_code": status_code,
+                "result": result,
+                "error": error,
+            })
+
+    async def _renew_lease(self, job_id: str) -> None:
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                await asyncio.to_thread(self._extend_lease, job_id)
+            except sqlite3.Error as e:
+                logger.warning(f"Could not renew the lease on job {job_id}: {e}")
+
+    async def _send_webhook(self, url: str, body: dict) -> None:
+        try:
+            # Checked again at delivery: the host may resolve differently than at submit
+            address = await check_webhook_url(url)
+            request_url, headers, extensions = url, {}, {}
+            if address is not None:
+                # Connect to the address that was checked rather than resolving the name again
+                request_url, headers, extensions = _pin_address(url, address)
+            response = await get_http_client().post(
+                request_url,
+                json=body,
+                headers=headers,
+                extensions=extensions,
+                timeout=settings.JOB_WEBHOOK_TIMEOUT_SECONDS
+            )
+            response.raise_for_status()
+            self.stats["webhooks_sent"] += 1
+        except Exception as e:
+            self.stats["webhooks_failed"] += 1
+            logger.warning(f"Webhook delivery to {url} failed: {e}")
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL, "
+                "payload BLOB, meta TEXT NOT NULL, webhook_url TEXT, "
+                "result TEXT, error TEXT, status_code INTEGER, "
+                "created_at REAL NOT NULL, started_at REAL, finished_at REAL, "
+                "owner TEXT, lease_expires_at REAL)"
+            )
+            # Queue files created before leases existed
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            for column, kind in (("owner", "TEXT"), ("lease_expires_at", "REAL")):
+                if column not in columns:
+                    self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs(status, created_at)")
+        return self._conn
+
+    def _insert(self, job_id: str, kind: str, payload: bytes, meta: dict, webhook_url: Optional[str]) -> None:
+        with self._db_lock:
+            self._connection().execute(
+                "INSERT INTO jobs (id, kind, status, payload, meta, webhook_url, created_at) "
+                "VALUES (?, ?, 'queued', ?, ?, ?, ?)",
+                (job_id, kind, payload, json.dumps(meta), webhook_url, time.time()),
+            )
+
+    def _recover(self) -> int:
+        with self._db_lock:
+            conn = self._connection()
+            conn.execute(
+                "DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?",
+                (time.time() - self.result_ttl_seconds,),
+            )
+            # Only expired leases: a running job with a live lease belongs to another process
+            return conn.execute(
+                "UPDATE jobs SET status = 'queued', owner = NULL, lease_expires_at = NULL, started_at = NULL "
+                "WHERE status = 'running' AND (lease_expires_at IS NULL OR lease_expires_at < ?)",
+                (time.time(),),
+            ).rowcount
+
+    def _claim(self) -> Optional[dict]:
+        with self._db_lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                # Jobs whose worker died while it was running are taken over here too
+                row = conn.execute(
+                    "SELECT id, kind, payload, meta, webhook_url, created_at FROM jobs "
+                    "WHERE status = 'queued' OR (status = 'running' AND lease_expires_at < ?) "
+                    "ORDER BY created_at LIMIT 1",
+                    (now,),
+                ).fetchone()
+                if row is not None:
+                    conn.execute(
+                        "UPDATE jobs SET status = 'running', started_at = ?, owner = ?, lease_expires_at = ? WHERE id = ?",
+                        (now, self.owner, now + self.lease_seconds, row[0]),
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        return {
+            "id": row[0],
+            "kind": row[1],
+            "payload": row[2],
+            "meta": json.loads(row[3]),
+            "webhook_url": row[4],
+            "created_at": row[5],
+        }
+
+    def _extend_lease(self, job_id: str) -> None:
+        with self._db_lock:
+            self._connection().execute(
+                "UPDATE jobs SET lease_expires_at = ? WHERE id = ? AND owner = ? AND status = 'running'",
+                (time.time() + self.lease_seconds, job_id, self.owner),
+            )
+
+    def _finish(self, job_id: str, status: str, result: Optional[dict], error: Optional[str],
+                status_code: int, finished_at: float) -> bool:
+        """Store the outcome. Returns False if this worker no longer holds the job."""
+        with self._db_lock:
+            # The payload is only needed until the job has run
+            return self._connection().execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, status_code = ?, finished_at = ?, payload = NULL, "
+                "owner = NULL, lease_expires_at = NULL "
+                "WHERE id = ? AND owner = ? AND status = 'running'",
+                (status, json.dumps(result) if result is not None else None, error, status_code, finished_at,
+                 job_id, self.owner),
+            ).rowcount == 1
+
+    def _status_counts(self) -> dict[str, int]:
+        with self._db_lock:
+            return dict(self._connection().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def _fetch(self, job_id: str) -> Optional[dict]:
+        with self._db_lock:
+            row = self._connection().execute(
+                "SELECT id, kind, status, result, error, status_code, created_at, started_at, finished_at "
+                "FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "job_id": row[0],
+            "kind": row[1],
+            "status": row[2],
+            "result": json.loads(row[3]) if row[3] else None,
+            "error": row[4],
+            "status_code": row[5],
+            "created_at": row[6],
+            "started_at": row[7],
+            "finished_at": row[8],
+        }
+
+
+async def check_webhook_url(url: str) -> Optional[str]:
+    """
+    Raise ValueError unless the server may POST job results to url.
+
+    Hosts listed in JOB_WEBHOOK_ALLOWED_HOSTS are trusted as they are, and
+    when that list is set no other host is accepted. Without it, every
+    address the host resolves to must be public, so a webhook cannot reach
+    loopback, private networks or link-local metadata endpoints such as
+    169.254.169.254. Returns the checked address to connect to, or None
+    for an allowed host.
+    """
+    parsed = urlsplit(url)
+    if parsed.scheme not in ("http", "https") or not parsed.hostname:
+        raise ValueError("webhook_url must be an http(s) URL")
+    host = parsed.hostname.lower()
+    allowed_hosts = settings.JOB_WEBHOOK_ALLOWED_HOSTS
+    if allowed_hosts:
+        if host not in allowed_hosts:
+            raise ValueError("webhook_url host is not in the allowed webhook hosts")
+        return None
+    try:
+        port = parsed.port or (443 if parsed.scheme == "https" else 80)
+        addresses = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except (OSError, UnicodeError, ValueError):
+        raise ValueError("webhook_url host cannot be resolved") from None
+    for *_, sockaddr in addresses:
+        address = ipaddress.ip_address(sockaddr[0].split("%", 1)[0])
+        if isinstance(address, ipaddress.IPv6Address) and address.ipv4_mapped is not None:
+            address = address.ipv4_mapped
+        if not address.is_global or address.is_multicast:
+            raise ValueError("webhook_url must resolve to a public address")
+    return addresses[0][4][0].split("%", 1)[0]
+
+
+def _pin_address(url: str, address: str) -> tuple[str, dict, dict]:
+    """
+    Point url at an already-checked address.
+
+    Returns the rewritten URL, the Host header and, for https, the SNI
+    hostname extension, so the certificate is still verified against the
+    original host while a DNS answer that changed since the check (DNS
+    rebinding) is never used.
+    """
+    parsed = urlsplit(url)
+    host = f"[{address}]" if ":" in address else address
+    netloc = f"{host}:{parsed.port}" if parsed.port else host
+    headers = {"Host": parsed.netloc.rsplit("@", 1)[-1]}
+    extensions = {"sni_hostname": parsed.hostname} if parsed.scheme == "https" else {}
+    return parsed._replace(netloc=netloc).geturl(), headers, extensions
+
+
+def _summarize(samples: deque) -> dict:
+    """Count, mean, p50 and p95 over the most recent samples."""
+    if not samples:
+        return {"count": 0, "mean": 0.0, "p50": 0.0, "p95": 0.0}
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "mean": round(sum(ordered) / len(ordered), 4),
+        "p50": round(ordered[len(ordered) // 2], 4),
+        "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 4),
+    }
+
+
+# Global job queue instance
+job_queue = JobQueue(
+    db_path=settings.JOB_QUEUE_DB_PATH,
+    workers=settings.JOB_QUEUE_WORKERS,
+    result_ttl_seconds=settings.JOB_RESULT_TTL_SECONDS,
+    lease_seconds=settings.JOB_LEASE_SECONDS,
+)
@@ -0,0 +1,150 @@
+"""Incremental parsing of a JSON object that arrives in chunks, such as streamed LLM output."""
+import json
+from bisect import bisect_right
+from typing import Any, Callable, Iterable, Optional
+
+# Returns whether a top-level field's parsed value is acceptable
+FieldCheck = Callable[[Any], bool]
+
+
+class OffSchema(Exception):
+    """The text so far can no longer become an acceptable object."""
+
+
+class StreamingObjectParser:
+    """
+    Scan streamed text for the first top-level JSON object, field by field.
+
+    Text before the object (prose, a ``` fence) is skipped. Each top-level
+    value is parsed and checked the moment it is complete, so a bad category
+    or a malformed nested object is caught while the model is still
+    generating, not after the whole completion arrives. feed() raises
+    OffSchema as soon as the output cannot be accepted; `complete` turns true
+    at the object's closing brace, after which the rest of the stream can be
+    dropped.
+
+    Chunks are kept as they arrive rather than joined into one growing
+    string. Every character is scanned once, and each key and value is
+    sliced out of the chunks and handed to json.loads once, so the total
+    cost stays linear in the output length.
+    """
+
+    def __init__(
+        self,
+        checks: Optional[dict[str, FieldCheck]] = None,
+        required: Iterable[str] = (),
+        max_preamble_chars: int = 500,
+        max_object_chars: int = 20000,
+    ):
+        self.checks = checks or {}
+        self.required = tuple(required)
+        self.max_preamble_chars = max_preamble_chars
+        self.max_object_chars = max_object_chars
+        self.fields: dict[str, Any] = {}
+        self.complete = False
+        self._chunks: list[str] = []
+        self._chunk_starts: list[int] = []
+        self._length = 0
+        self._start: Optional[int] = None
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._expect_key = True
+        self._key: Optional[str] = None
+        self._key_start = 0
+        self._value_start: Optional[int] = None
+
+    @property
+    def text(self) -> str:
+        """Everything fed so far."""
+        return "".join(self._chunks)
+
+    def feed(self, chunk: str) -> bool:
+        """Consume the next chunk. Returns True once the object is complete."""
+        if self.complete:
+            return True
+        if not chunk:
+            return False
+        offset = self._length
+        self._chunks.append(chunk)
+        self._chunk_starts.append(offset)
+        self._length += len(chunk)
+        for i, c in enumerate(chunk, offset):
+            if self._start is None:
+                if c == "{":
+                    self._start, self._depth = i, 1
+                elif i >= self.max_preamble_chars:
+                    raise OffSchema(f"no JSON object in the first {self.max_preamble_chars} characters")
+                continue
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif c == "\\":
+                    self._escaped = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._expect_key:
+                        self._key = json.loads(self._span(self._key_start, i + 1))
+                continue
+
+            if c == '"':
+                self._in_string = True
+                if self._depth == 1:
+                    if self._expect_key:
+                        self._key_start = i
+                    elif self._value_start is None:
+                        self._value_start = i
+            elif c in "{[":
+                if self._depth == 1 and not self._expect_key and self._value_start is None:
+                    self._value_start = i
+                self._depth += 1
+            elif c in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._end_value(i)
+                    self._finish()
+                    return True
+            elif self._depth == 1:
+                if c == ":":
+                    self._expect_key, self._value_start = False, None
+                elif c == ",":
+                    self._end_value(i)
+                    self._expect_key = True
+                elif self._value_start is None and not self._expect_key and not c.isspace():
+                    self._value_start = i
+
+        if self._start is not None and self._length - self._start > self.max_object_chars:
+            raise OffSchema(f"object longer than {self.max_object_chars} characters")
+        return False
+
+    def _span(self, start: int, end: int) -> str:
+        """The fed text from start to end, which may cross chunk boundaries."""
+        index = bisect_right(self._chunk_starts, start) - 1
+        parts = []
+        while start < end:
+            chunk, chunk_start = self._chunks[index], self._chunk_starts[index]
+            parts.append(chunk[start - chunk_start:end - chunk_start])
+            start = chunk_start + len(chunk)
+            index += 1
+        return "".join(parts)
+
+    def _end_value(self, end: int) -> None:
+        if self._value_start is None or self._key is None:
+            return
+        raw = self._span(self._value_start, end)
+        key, self._key, self._value_start = self._key, None, None
+        try:
+            value = json.loads(raw)
+        except json.JSONDecodeError as e:
+            raise OffSchema(f"malformed value for {key!r}: {e}") from None
+        check = self.checks.get(key)
+        if check is not None and not check(value):
+            raise OffSchema(f"unexpected value for {key!r}: {raw.strip()[:80]}")
+        self.fields[key] = value
+
+    def _finish(self) -> None:
+        missing = [field for field in self.required if field not in self.fields]
+        if missing:
+            raise OffSchema(f"missing required field {missing[0]!r}")
+        self.complete = True
@@ -0,0 +1,69 @@
+"""Token usage reported by OpenRouter, per completion request."""
+import logging
+import time
+from collections import deque
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class UsageLog:
+    """
+    Prompt, cached and completion token counts for each request.
+
+    Totals are kept per prompt version, so the effect of a prompt change or
+    of provider-side prefix caching shows up side by side; the most recent
+    requests are kept individually. A request whose stream was closed
+    before the usage report arrived (to stop a model that kept talking) is
+    counted as unreported.
+    """
+
+    def __init__(self, recent: int = 50):
+        self.recent: deque[dict] = deque(maxlen=recent)
+        self.by_prompt: dict[str, dict] = {}
+        self.stats = {"requests": 0, "unreported": 0}
+
+    def record(self, model: str, prompt_id: str, usage: Optional[dict]) -> None:
+        self.stats["requests"] += 1
+        if not usage:
+            self.stats["unreported"] += 1
+            return
+        prompt_tokens = usage.get("prompt_tokens") or 0
+        cached_tokens = (usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0
+        completion_tokens = usage.get("completion_tokens") or 0
+
+        totals = self.by_prompt.get(prompt_id)
+        if totals is None:
+            totals = self.by_prompt[prompt_id] = {
+                "requests": 0, "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0
+            }
+        totals["requests"] += 1
+        totals["prompt_tokens"] += prompt_tokens
+        totals["cached_tokens"] += cached_tokens
+        totals["completion_tokens"] += completion_tokens
+        self.recent.append({
+            "at": time.time(),
+            "model": model,
+            "prompt": prompt_id,
+            "prompt_tokens": prompt_tokens,
+            "cached_tokens": cached_tokens,
+            "completion_tokens": completion_tokens,
+        })
+        logger.info(
+            f"{model} ({prompt_id}) used {prompt_tokens} prompt tokens ({cached_tokens} cached), "
+            f"{completion_tokens} completion tokens"
+        )
+
+    def get_stats(self) -> dict:
+        by_prompt = {
+            prompt_id: {
+                **totals,
+                "cached_ratio": round(totals["cached_tokens"] / totals["prompt_tokens"], 3) if totals["prompt_tokens"] else 0.0,
+            }
+            for prompt_id, totals in self.by_prompt.items()
+        }
+        return {**self.stats, "by_prompt": by_prompt, "recent": list(self.recent)}
+
+
+# Usage of the vision analysis calls, for /api/metrics
+vision_usage = UsageLog()
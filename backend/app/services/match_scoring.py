@@ -0,0 +1,148 @@
+"""Vectorized ranking of candidate organizations for a trade."""
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+from app.config import settings
+
+FEATURES = ("category_fit", "distance", "pickup", "credit_offer", "capacity", "acceptance_rate")
+
+# Feature value used when a candidate does not report the underlying field
+NEUTRAL = 0.5
+
+
+def default_weights() -> np.ndarray:
+    """Feature weights from settings, in FEATURES order, normalized to sum to 1."""
+    weights = np.array([
+        settings.MATCH_WEIGHT_CATEGORY,
+        settings.MATCH_WEIGHT_DISTANCE,
+        settings.MATCH_WEIGHT_PICKUP,
+        settings.MATCH_WEIGHT_CREDIT,
+        settings.MATCH_WEIGHT_CAPACITY,
+        settings.MATCH_WEIGHT_ACCEPTANCE,
+    ], dtype=np.float64)
+    total = weights.sum()
+    return weights / total if total > 0 else np.full(len(FEATURES), 1 / len(FEATURES))
+
+
+@dataclass
+class CandidateColumns:
+    """
+    Raw candidate attributes as one array per field.
+
+    NaN marks a value the candidate did not report; scoring substitutes a
+    neutral feature value so unknown fields neither help nor hurt.
+    """
+    category_fit: np.ndarray
+    distance_km: np.ndarray
+    pickup: np.ndarray
+    credit_offer: np.ndarray
+    capacity: np.ndarray
+    acceptance_rate: np.ndarray
+
+    def __len__(self) -> int:
+        return self.category_fit.size
+
+    @classmethod
+    def from_matches(
+        cls,
+        matches: list[dict],
+        category: Optional[str] = None,
+        preferred_path: Optional[str] = None,
+    ) -> "CandidateColumns":
+        """Extract columns from match dicts (organization fields plus proposed_terms)."""
+        count = len(matches)
+
+        def column(values) -> np.ndarray:
+            return np.fromiter((np.nan if v is None else v for v in values), dtype=np.float64, count=count)
+
+        terms = [match.get("proposed_terms") or {} for match in matches]
+        return cls(
+            category_fit=column(_category_fit(match, category, preferred_path) for match in matches),
+            distance_km=column(match.get("distance_km") for match in matches),
+            pickup=column(t.get("pickup_available") for t in terms),
+            credit_offer=column(t.get("credit_offer") for t in terms),
+            capacity=column(match.get("capacity") for match in matches),
+            acceptance_rate=column(match.get("acceptance_rate") for match in matches),
+        )
+
+    def take(self, rows: np.ndarray, category_fit: Optional[np.ndarray] = None) -> "CandidateColumns":
+        """Columns for a subset of candidates, with category fit optionally replaced."""
+        return CandidateColumns(
+            category_fit=self.category_fit[rows] if category_fit is None else category_fit,
+            distance_km=self.distance_km[rows],
+            pickup=self.pickup[rows],
+            credit_offer=self.credit_offer[rows],
+            capacity=self.capacity[rows],
+            acceptance_rate=self.acceptance_rate[rows],
+        )
+
+    def feature_matrix(self, max_distance_km: float) -> np.ndarray:
+        """Normalize every column to [0, 1], higher is better, as a (features, candidates) matrix."""
+        matrix = np.empty((len(FEATURES), len(self)), dtype=np.float64)
+        matrix[0] = self.category_fit
+        matrix[1] = 1.0 - np.clip(self.distance_km / max_distance_km, 0.0, 1.0)
+        matrix[2] = self.pickup
+        matrix[3] = _scale_to_max(self.credit_offer)
+        matrix[4] = _scale_to_max(self.capacity)
+        matrix[5] = np.clip(self.acceptance_rate, 0.0, 1.0)
+        return np.nan_to_num(matrix, nan=NEUTRAL)
+
+
+def score_columns(
+    columns: CandidateColumns,
+    weights: Optional[np.ndarray] = None,
+    max_distance_km: Optional[float] = None,
+) -> np.ndarray:
+    """Weighted score in [0, 1] for every candidate, in one matrix-vector product."""
+    weights = default_weights() if weights is None else weights
+    return weights @ columns.feature_matrix(max_distance_km or settings.GEO_MATCH_RADIUS_KM)
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first; O(n) selection plus an O(k log k) sort."""
+    if k <= 0 or scores.size == 0:
+        return np.empty(0, dtype=np.int64)
+    if scores.size > k:
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(scores.size)
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+def rank_matches(
+    matches: list[dict],
+    k: Optional[int] = None,
+    category: Optional[str] = None,
+    preferred_path: Optional[str] = None,
+    weights: Optional[np.ndarray] = None,
+) -> list[dict]:
+    """Score every match, set its match_score and return the best k, best first."""
+    if not matches:
+        return []
+    columns = CandidateColumns.from_matches(matches, category, preferred_path)
+    scores = score_columns(columns, weights)
+    ranked = []
+    for index in top_k(scores, k or settings.MATCH_TOP_K):
+        match = dict(matches[index])
+        match["match_score"] = round(float(scores[index]), 3)
+        ranked.append(match)
+    return ranked
+
+
+def _category_fit(match: dict, category: Optional[str], preferred_path: Optional[str]) -> Optional[float]:
+    """Share of the known item requirements (category, recycling path) the organization accepts."""
+    checks = []
+    if category and "categories" in match:
+        checks.append(category in match["categories"])
+    if preferred_path and "accepted_paths" in match:
+        checks.append(preferred_path in match["accepted_paths"])
+    return sum(checks) / len(checks) if checks else None
+
+
+def _scale_to_max(values: np.ndarray) -> np.ndarray:
+    if np.isnan(values).all():
+        return values
+    peak = np.nanmax(values)
+    return values / peak if peak > 0 else np.zeros_like(values)
@@ -0,0 +1,221 @@
+"""Organization registry: inverted indexes over the organizations data file, hot-reloaded."""
+import asyncio
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from types import MappingProxyType
+from typing import Mapping, Optional
+
+import numpy as np
+
+from app.config import settings
+from app.services.geo_index import GeoIndex, has_coordinates
+from app.services.match_scoring import CandidateColumns
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class RegistrySnapshot:
+    """
+    One immutable, fully built view of the organizations file.
+
+    Readers take a snapshot once and use it for the whole request, so a reload
+    in between never mixes old and new organizations. Besides the dict
+    indexes, each key maps to the sorted row numbers of its organizations,
+    and `columns` holds every organization's scoring attributes, so a
+    request ranks a group with array operations instead of rebuilding
+    candidate dicts.
+    """
+    organizations: tuple[dict, ...]
+    by_category: Mapping[str, tuple[dict, ...]]
+    by_subcategory: Mapping[str, tuple[dict, ...]]
+    by_path: Mapping[str, tuple[dict, ...]]
+    rows_by_category: Mapping[str, np.ndarray]
+    rows_by_subcategory: Mapping[str, np.ndarray]
+    rows_by_path: Mapping[str, np.ndarray]
+    columns: CandidateColumns
+    geo: GeoIndex
+    source_mtime_ns: int
+    loaded_at: float
+
+    @classmethod
+    def build(cls, organizations: list[dict], cell_degrees: float, source_mtime_ns: int = 0) -> "RegistrySnapshot":
+        located = [org for org in organizations if has_coordinates(org)]
+        if len(located) < len(organizations):
+            logger.warning(f"Skipped {len(organizations) - len(located)} organizations without valid coordinates")
+        rows_by_category = _invert_rows(located, "categories")
+        rows_by_subcategory = _invert_rows(located, "subcategories")
+        rows_by_path = _invert_rows(located, "accepted_paths")
+        return cls(
+            organizations=tuple(located),
+            by_category=_rows_to_orgs(located, rows_by_category),
+            by_subcategory=_rows_to_orgs(located, rows_by_subcategory),
+            by_path=_rows_to_orgs(located, rows_by_path),
+            rows_by_category=rows_by_category,
+            rows_by_subcategory=rows_by_subcategory,
+            rows_by_path=rows_by_path,
+            columns=CandidateColumns.from_matches([_scoring_fields(org) for org in located]),
+            geo=GeoIndex(located, cell_degrees),
+            source_mtime_ns=source_mtime_ns,
+            loaded_at=time.time(),
+        )
+
+    def for_category(self, category: Optional[str]) -> tuple[dict, ...]:
+        return self.by_category.get((category or "").lower(), ())
+
+    def for_subcategory(self, subcategory: Optional[str]) -> tuple[dict, ...]:
+        return self.by_subcategory.get((subcategory or "").lower(), ())
+
+    def for_path(self, path: Optional[str]) -> tuple[dict, ...]:
+        return self.by_path.get((path or "").lower(), ())
+
+    def category_rows(self, category: Optional[str]) -> np.ndarray:
+        return self.rows_by_category.get((category or "").lower(), _NO_ROWS)
+
+    def subcategory_rows(self, subcategory: Optional[str]) -> np.ndarray:
+        return self.rows_by_subcategory.get((subcategory or "").lower(), _NO_ROWS)
+
+    def path_rows(self, path: Optional[str]) -> np.ndarray:
+        return self.rows_by_path.get((path or "").lower(), _NO_ROWS)
+
+    def category_fit(self, category: Optional[str], preferred_path: Optional[str]) -> np.ndarray:
+        """Per row, the share of the item's category and preferred path the organization accepts (NaN if neither is known)."""
+        fit = np.zeros(len(self.organizations), dtype=np.float64)
+        checks = 0
+        if category:
+            fit[self.category_rows(category)] += 1.0
+            checks += 1
+        if preferred_path:
+            fit[self.path_rows(preferred_path)] += 1.0
+            checks += 1
+        return fit / checks if checks else np.full(fit.size, np.nan)
+
+
+class OrganizationRegistry:
+    """
+    Holds the current RegistrySnapshot and swaps in a new one when the data file changes.
+
+    A replacement snapshot is built completely off to the side and then
+    published with a single attribute assignment, so requests see either the
+    old registry or the new one, never a half-built index. A file that fails to
+    parse is logged and the previous snapshot keeps serving.
+    """
+
+    def __init__(self, path: str, cell_degrees: float = 0.05, reload_seconds: float = 5.0):
+        self.path = path
+        self.cell_degrees = cell_degrees
+        self.reload_seconds = reload_seconds
+        self._snapshot: Optional[RegistrySnapshot] = None
+        self._failed_mtime_ns: Optional[int] = None
+        self._watcher: Optional[asyncio.Task] = None
+        self.stats = {"reloads": 0, "reload_errors": 0}
+
+    def current(self) -> RegistrySnapshot:
+        """Return the live snapshot, loading it on first use outside the lifespan (tests, scripts)."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self.load()
+        return snapshot
+
+    def load(self) -> RegistrySnapshot:
+        """Read and index the data file, then publish it. Raises if the file is invalid."""
+        start = time.perf_counter()
+        mtime_ns = os.stat(self.path).st_mtime_ns
+        organizations = json.loads(Path(self.path).read_text(encoding="utf-8"))
+        if not isinstance(organizations, list):
+            raise ValueError(f"{self.path} must contain a JSON list of organizations")
+        snapshot = RegistrySnapshot.build(organizations, self.cell_degrees, mtime_ns)
+        self._snapshot = snapshot
+        logger.info(
+            f"Loaded {len(snapshot.organizations)} organizations in "
+            f"{(time.perf_counter() - start) * 1000:.1f} ms from {self.path}"
+        )
+        return snapshot
+
+    def reload_if_changed(self) -> bool:
+        """Rebuild the registry if the data file changed since it was loaded. Blocking."""
+        try:
+            mtime_ns = os.stat(self.path).st_mtime_ns
+        except OSError as e:
+            logger.warning(f"Cannot stat organizations file {self.path}: {e}")
+            return False
+        current = self._snapshot
+        if current is not None and mtime_ns == current.source_mtime_ns:
+            return False
+        if mtime_ns == self._failed_mtime_ns:
+            return False
+        try:
+            self.load()
+        except Exception as e:
+            self._failed_mtime_ns = mtime_ns
+            self.stats["reload_errors"] += 1
+            logger.error(f"Reload of {self.path} failed, keeping the previous registry: {type(e).__name__}: {e}")
+            return False
+        self._failed_mtime_ns = None
+        self.stats["reloads"] += 1
+        return True
+
+    async def start(self) -> None:
+        """Load the registry and start watching the data file. Called from the app lifespan."""
+        await asyncio.to_thread(self.load)
+        if self.reload_seconds > 0 and self._watcher is None:
+            self._watcher = asyncio.create_task(self._watch())
+
+    async def stop(self) -> None:
+        if self._watcher is not None:
+            self._watcher.cancel()
+            await asyncio.gather(self._watcher, return_exceptions=True)
+            self._watcher = None
+
+    def get_stats(self) -> dict:
+        snapshot = self.current()
+        return {
+            **self.stats,
+            "organizations": len(snapshot.organizations),
+            "categories": len(snapshot.by_category),
+            "subcategories": len(snapshot.by_subcategory),
+            "loaded_at": snapshot.loaded_at,
+            "geo": snapshot.geo.get_stats(),
+        }
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(self.reload_seconds)
+            await asyncio.to_thread(self.reload_if_changed)
+
+
+_NO_ROWS = np.empty(0, dtype=np.int64)
+
+
+def _invert_rows(organizations: list[dict], field: str) -> Mapping[str, np.ndarray]:
+    index: dict[str, list[int]] = {}
+    for row, org in enumerate(organizations):
+        # dict.fromkeys drops repeats, so every row list stays strictly increasing
+        for key in dict.fromkeys(str(key).lower() for key in org.get(field) or ()):
+            index.setdefault(key, []).append(row)
+    return MappingProxyType({key: np.array(rows, dtype=np.int64) for key, rows in index.items()})
+
+
+def _rows_to_orgs(organizations: list[dict], rows_by_key: Mapping[str, np.ndarray]) -> Mapping[str, tuple[dict, ...]]:
+    return MappingProxyType({key: tuple(organizations[row] for row in rows) for key, rows in rows_by_key.items()})
+
+
+def _scoring_fields(org: dict) -> dict:
+    """Registry entry in the shape CandidateColumns reads; category fit depends on the item and is filled per request."""
+    return {
+        "proposed_terms": {"credit_offer": org.get("credit_offer"), "pickup_available": org.get("pickup_available")},
+        "capacity": org.get("capacity"),
+        "acceptance_rate": org.get("acceptance_rate"),
+    }
+
+
+# Global organization registry instance
+organization_registry = OrganizationRegistry(
+    path=settings.ORGANIZATIONS_DATA_PATH,
+    cell_degrees=settings.GEO_INDEX_CELL_DEGREES,
+    reload_seconds=settings.ORG_REGISTRY_RELOAD_SECONDS,
+)
@@ -0,0 +1,93 @@
+"""Concurrent fan-out to NGO and recycling partner APIs."""
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Optional
+from urllib.parse import urlparse
+
+import httpx
+
+from app.config import settings
+from app.services.http_client import get_http_client
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PartnerQueryResult:
+    """Matches that arrived in time, plus the partners that did not answer."""
+    matches: list[dict] = field(default_factory=list)
+    timed_out: list[str] = field(default_factory=list)
+    failed: list[str] = field(default_factory=list)
+
+    @property
+    def unavailable(self) -> list[str]:
+        return self.timed_out + self.failed
+
+
+def configured_partners() -> list[str]:
+    """Base URLs of every partner API to query."""
+    partners = [settings.MOCK_NGO_API_URL, settings.MOCK_RECYCLING_API_URL, *settings.PARTNER_API_URLS]
+    return list(dict.fromkeys(url.rstrip("/") for url in partners if url))
+
+
+def partner_name(base_url: str) -> str:
+    parsed = urlparse(base_url)
+    return f"{parsed.netloc}{parsed.path}" if parsed.path not in ("", "/") else parsed.netloc
+
+
+async def query_partners(
+    item_id: str,
+    preferred_path: Optional[str] = None,
+    location: Optional[dict] = None,
+    partners: Optional[list[str]] = None,
+    client: Optional[httpx.AsyncClient] = None,
+    timeout_seconds: Optional[float] = None,
+    deadline_seconds: Optional[float] = None,
+) -> PartnerQueryResult:
+    """
+    Ask every partner for matches at once.
+
+    Each partner gets `timeout_seconds`; the whole fan-out is cut off at
+    `deadline_seconds`, and whatever has arrived by then is returned.
+    Partners that time out or fail are listed rather than raised.
+    """
+    partners = configured_partners() if partners is None else partners
+    client = client or get_http_client()
+    timeout_seconds = timeout_seconds or settings.PARTNER_TIMEOUT_SECONDS
+    deadline_seconds = deadline_seconds or settings.PARTNER_DEADLINE_SECONDS
+    body = {"item_id": item_id, "preferred_path": preferred_path, "location": location}
+
+    async def query_one(base_url: str) -> list[dict]:
+        response = await asyncio.wait_for(
+            client.post(f"{base_url}/matches", json=body),
+            timeout=timeout_seconds
+        )
+        response.raise_for_status()
+        return response.json().get("matches", [])
+
+    tasks = {asyncio.create_task(query_one(url)): url for url in partners}
+    result = PartnerQueryResult()
+    if not tasks:
+        return result
+
+    done, pending = await asyncio.wait(tasks, timeout=deadline_seconds)
+    for task in pending:
+        task.cancel()
+        result.timed_out.append(partner_name(tasks[task]))
+    await asyncio.gather(*pending, return_exceptions=True)
+
+    for task in done:
+        name = partner_name(tasks[task])
+        error = task.exception()
+        if error is None:
+            result.matches.extend(task.result())
+        elif isinstance(error, asyncio.TimeoutError):
+            result.timed_out.append(name)
+        else:
+            logger.warning(f"Partner {name} failed: {type(error).__name__}: {error}")
+            result.failed.append(name)
+
+    if result.unavailable:
+        logger.warning(f"Partners unavailable: timed out={result.timed_out}, failed={result.failed}")
+    return result
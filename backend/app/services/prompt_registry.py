@@ -0,0 +1,105 @@
+"""Versioned prompt files, read once at startup and served from memory."""
+import hashlib
+import logging
+import re
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Mapping, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# <name>.v<version>.txt, e.g. vision_system.v2.txt
+PROMPT_FILENAME = re.compile(r"^(?P<name>[a-z0-9_]+)\.v(?P<version>\d+)\.txt$")
+
+
+@dataclass(frozen=True)
+class Prompt:
+    name: str
+    version: int
+    text: str
+
+    @property
+    def id(self) -> str:
+        return f"{self.name}.v{self.version}"
+
+
+class PromptRegistry:
+    """
+    Every prompt file in one directory, keyed by name and version.
+
+    get(name) returns the highest version on disk unless `pins` names
+    another, so a revision can be added next to the one it replaces and
+    rolled back by pinning. The text is read once and never changes while
+    the process runs, so every request sends a byte-identical prefix, which
+    is what provider-side prompt caches match on.
+    """
+
+    def __init__(self, directory: str, pins: Optional[Mapping[str, int]] = None):
+        self.directory = directory
+        self.pins = dict(pins or {})
+        self._prompts: Optional[dict[str, Prompt]] = None
+        self._available: dict[str, list[int]] = {}
+        self._fingerprints: dict[tuple[str, ...], str] = {}
+        self.loaded_at: Optional[float] = None
+
+    def load(self) -> None:
+        """Read the directory and select the version of each prompt. Raises if a pin cannot be met."""
+        found: dict[str, dict[int, Path]] = {}
+        for path in sorted(Path(self.directory).iterdir()):
+            match = PROMPT_FILENAME.match(path.name)
+            if match is None:
+                logger.warning(f"Ignoring {path.name} in {self.directory}: expected <name>.v<version>.txt")
+                continue
+            found.setdefault(match["name"], {})[int(match["version"])] = path
+
+        for name, version in self.pins.items():
+            if version not in found.get(name, {}):
+                raise ValueError(f"Prompt {name!r} is pinned to v{version}, which is not in {self.directory}")
+
+        prompts = {}
+        for name, versions in found.items():
+            version = self.pins.get(name, max(versions))
+            # A trailing newline is how the file ends, not part of the prompt
+            text = versions[version].read_text(encoding="utf-8").rstrip("\n")
+            prompts[name] = Prompt(name=name, version=version, text=text)
+        self._available = {name: sorted(versions) for name, versions in found.items()}
+        self._fingerprints = {}
+        self._prompts = prompts
+        self.loaded_at = time.time()
+        logger.info(f"Loaded prompts {', '.join(p.id for p in prompts.values())} from {self.directory}")
+
+    def get(self, name: str) -> Prompt:
+        """The selected version of a prompt, loading the directory on first use outside the lifespan."""
+        prompts = self._prompts
+        if prompts is None:
+            self.load()
+            prompts = self._prompts
+        try:
+            return prompts[name]
+        except KeyError:
+            raise KeyError(f"No prompt named {name!r} in {self.directory}") from None
+
+    def fingerprint(self, *names: str) -> str:
+        """Short hash of the selected prompts' text, for keying cached model output."""
+        fingerprint = self._fingerprints.get(names)
+        if fingerprint is None:
+            digest = hashlib.sha256()
+            for name in names:
+                prompt = self.get(name)
+                digest.update(f"{prompt.id}\0{prompt.text}\0".encode("utf-8"))
+            fingerprint = self._fingerprints[names] = digest.hexdigest()[:12]
+        return fingerprint
+
+    def get_stats(self) -> dict:
+        return {
+            "directory": self.directory,
+            "selected": {name: prompt.id for name, prompt in (self._prompts or {}).items()},
+            "available": self._available,
+            "loaded_at": self.loaded_at,
+        }
+
+
+prompt_registry = PromptRegistry(settings.PROMPTS_DIR, settings.PROMPT_VERSIONS)
@@ -0,0 +1,120 @@
+"""Pre-rendered response bodies with validators, refreshed in the background."""
+import asyncio
+import hashlib
+import logging
+import time
+from dataclasses import dataclass
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class RenderedResponse:
+    body: bytes
+    etag: str
+    last_modified: float
+    rendered_at: float
+
+    def headers(self, max_age: int) -> dict:
+        return {
+            "ETag": self.etag,
+            "Last-Modified": formatdate(self.last_modified, usegmt=True),
+            "Cache-Control": f"public, max-age={max_age}",
+        }
+
+    def not_modified(self, if_none_match: Optional[str], if_modified_since: Optional[str]) -> bool:
+        """Evaluate conditional request headers (If-None-Match takes precedence, RFC 9110)."""
+        if if_none_match is not None:
+            tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+            return "*" in tags or self.etag in tags
+        if if_modified_since is not None:
+            try:
+                since = parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return int(self.last_modified) <= since
+        return False
+
+
+class ResponseSnapshot:
+    """
+    One serialized response shared by every caller.
+
+    The body is re-rendered every `refresh_seconds` by a background task, and
+    on the next read after invalidate() so local writes show up at once. The
+    ETag is a hash of the body, so it only changes (and Last-Modified only
+    moves) when the content does, and every worker computes the same tag.
+    """
+
+    def __init__(self, render: Callable[[], Awaitable[bytes]], refresh_seconds: float = 5.0):
+        self.render = render
+        self.refresh_seconds = refresh_seconds
+        self._current: Optional[RenderedResponse] = None
+        self._stale = True
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"renders": 0, "changes": 0}
+
+    async def get(self) -> RenderedResponse:
+        current = self._current
+        if current is not None and not self._stale and time.time() - current.rendered_at < self.refresh_seconds:
+            return current
+        async with self._lock:
+            # Another caller may have refreshed while this one waited
+            current = self._current
+            if current is not None and not self._stale and time.time() - current.rendered_at < self.refresh_seconds:
+                return current
+            try:
+                return await self._refresh()
+            except Exception as e:
+                if current is None:
+                    raise
+                logger.error(f"Snapshot refresh failed, serving the previous one: {type(e).__name__}: {e}")
+                return current
+
+    def invalidate(self) -> None:
+        self._stale = True
+
+    async def start(self) -> None:
+        """Render once and keep the snapshot fresh. Called from the app lifespan."""
+        if self._task is None:
+            await self.get()
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _refresh(self) -> RenderedResponse:
+        self._stale = False
+        try:
+            body = await self.render()
+        except Exception:
+            self._stale = True
+            raise
+        now = time.time()
+        etag = f'"{hashlib.blake2b(body, digest_size=12).hexdigest()}"'
+        previous = self._current
+        if previous is not None and previous.etag == etag:
+            rendered = RenderedResponse(body=previous.body, etag=etag, last_modified=previous.last_modified, rendered_at=now)
+        else:
+            rendered = RenderedResponse(body=body, etag=etag, last_modified=now, rendered_at=now)
+            self.stats["changes"] += 1
+        self.stats["renders"] += 1
+        self._current = rendered
+        return rendered
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_seconds)
+            try:
+                async with self._lock:
+                    await self._refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Snapshot refresh failed, serving the previous one: {type(e).__name__}: {e}")
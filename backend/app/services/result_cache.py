@@ -0,0 +1,170 @@
+"""Content-addressed cache for vision analysis results."""
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(image_digest: str, model: str, prompt_version: str) -> str:
+    """Build a cache key from the image content hash, model and prompt version."""
+    return hashlib.sha256(f"{image_digest}:{model}:{prompt_version}".encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    Two-tier result cache.
+
+    An in-memory LRU sits in front of an optional SQLite file that survives
+    restarts. Both tiers expire entries after `ttl_seconds` and evict the least
+    recently used entries once they hold more than their maximum entry count.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: int = 86400,
+        disk_path: str = "",
+        disk_max_entries: int = 50000,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_path = disk_path
+        self.disk_max_entries = disk_max_entries
+        self._memory: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._disk_lock = threading.Lock()
+        self.stats = {
+            "hits": 0,
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+        }
+
+    async def get(self, key: str) -> Optional[dict]:
+        """Return the cached value for key, or None on a miss."""
+        now = time.time()
+        entry = self._memory.get(key)
+        if entry is not None:
+            stored_at, value = entry
+            if now - stored_at <= self.ttl_seconds:
+                self._memory.move_to_end(key)
+                self.stats["hits"] += 1
+                self.stats["memory_hits"] += 1
+                return value
+            del self._memory[key]
+            self.stats["expirations"] += 1
+
+        if self.disk_path:
+            row = await asyncio.to_thread(self._disk_get, key, now)
+            if row is not None:
+                stored_at, value = row
+                self._memory_set(key, value, stored_at)
+                self.stats["hits"] += 1
+                self.stats["disk_hits"] += 1
+                return value
+
+        self.stats["misses"] += 1
+        return None
+
+    async def set(self, key: str, value: dict) -> None:
+        """Store value under key in every enabled tier."""
+        now = time.time()
+        self._memory_set(key, value, now)
+        if self.disk_path:
+            await asyncio.to_thread(self._disk_set, key, value, now)
+
+    def clear(self) -> None:
+        """Drop all entries and reset counters."""
+        self._memory.clear()
+        if self.disk_path:
+            with self._disk_lock:
+                self._connection().execute("DELETE FROM results")
+        for name in self.stats:
+            self.stats[name] = 0
+
+    def close(self) -> None:
+        """Close the disk tier connection."""
+        with self._disk_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def get_stats(self) -> dict:
+        return {
+            **self.stats,
+            "memory_entries": len(self._memory),
+            "memory_max_entries": self.max_entries,
+            "disk_enabled": bool(self.disk_path),
+        }
+
+    def _memory_set(self, key: str, value: dict, stored_at: float) -> None:
+        self._memory[key] = (stored_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            Path(self.disk_path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.disk_path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "stored_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_results_accessed ON results(accessed_at)")
+        return self._conn
+
+    def _disk_get(self, key: str, now: float) -> Optional[tuple[float, dict]]:
+        with self._disk_lock:
+            conn = self._connection()
+            row = conn.execute("SELECT value, stored_at FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            value, stored_at = row
+            if now - stored_at > self.ttl_seconds:
+                conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                self.stats["expirations"] += 1
+                return None
+            conn.execute("UPDATE results SET accessed_at = ? WHERE key = ?", (now, key))
+            return stored_at, json.loads(value)
+
+    def _disk_set(self, key: str, value: dict, now: float) -> None:
+        with self._disk_lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO results (key, value, stored_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now, now),
+            )
+            conn.execute("DELETE FROM results WHERE stored_at < ?", (now - self.ttl_seconds,))
+            overflow = conn.execute("SELECT COUNT(*) FROM results").fetchone()[0] - self.disk_max_entries
+            if overflow > 0:
+                conn.execute(
+                    "DELETE FROM results WHERE key IN "
+                    "(SELECT key FROM results ORDER BY accessed_at LIMIT ?)",
+                    (overflow,),
+                )
+                self.stats["evictions"] += overflow
+
+
+# Global result cache instance
+vision_cache = ResultCache(
+    max_entries=settings.VISION_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.VISION_CACHE_TTL_SECONDS,
+    disk_path=settings.VISION_CACHE_DISK_PATH,
+    disk_max_entries=settings.VISION_CACHE_DISK_MAX_ENTRIES,
+)
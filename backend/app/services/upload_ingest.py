@@ -0,0 +1,112 @@
+"""Streaming, size-bounded ingestion of image uploads."""
+import base64
+import hashlib
+from dataclasses import dataclass
+from typing import BinaryIO, Optional
+
+from fastapi import HTTPException, UploadFile
+
+from app.config import settings
+
+# Magic-byte prefixes for the image formats the vision models accept
+IMAGE_SIGNATURES = [
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"BM", "image/bmp"),
+]
+
+HEIF_BRANDS = {b"heic", b"heix", b"hevc", b"hevx", b"mif1", b"msf1"}
+
+# Read size used for sniffing; every signature fits in the first 16 bytes
+SNIFF_BYTES = 16
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """Return the image MIME type from the leading bytes, or None if unrecognised."""
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head[4:8] == b"ftyp":
+        brand = head[8:12]
+        if brand in HEIF_BRANDS:
+            return "image/heic"
+        if brand == b"avif":
+            return "image/avif"
+    for signature, content_type in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    return None
+
+
+@dataclass
+class IngestedUpload:
+    """An upload that has been size-checked, typed and hashed, still on its spool file."""
+    file: BinaryIO
+    size: int
+    sha256: str
+    content_type: str
+
+
+async def ingest_upload(
+    upload: UploadFile,
+    max_bytes: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+) -> IngestedUpload:
+    """
+    Read an upload in chunks, hashing as it goes.
+
+    Rejects with 413 as soon as more than max_bytes have been read and with 400
+    when the leading bytes are not a known image format. The bytes are never
+    accumulated: the upload stays on Starlette's spooled temp file, rewound, for
+    the next stage to read.
+    """
+    max_bytes = max_bytes or settings.MAX_UPLOAD_BYTES
+    chunk_size = chunk_size or settings.UPLOAD_CHUNK_BYTES
+
+    digest = hashlib.sha256()
+    size = 0
+    content_type = None
+
+    await upload.seek(0)
+    while True:
+        chunk = await upload.read(chunk_size)
+        if not chunk:
+            break
+        if content_type is None:
+            content_type = sniff_image_type(chunk[:SNIFF_BYTES])
+            if content_type is None:
+                raise HTTPException(status_code=400, detail="File must be an image")
+        size += len(chunk)
+        if size > max_bytes:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Image is too large. Maximum upload size is {max_bytes // (1024 * 1024)} MB."
+            )
+        digest.update(chunk)
+
+    if content_type is None:
+        raise HTTPException(status_code=400, detail="File must be an image")
+
+    await upload.seek(0)
+    return IngestedUpload(file=upload.file, size=size, sha256=digest.hexdigest(), content_type=content_type)
+
+
+def encode_base64(source: BinaryIO, chunk_size: Optional[int] = None) -> str:
+    """
+    Base64-encode a file chunk by chunk.
+
+    Chunks are a multiple of 3 bytes so each one encodes without padding and the
+    pieces concatenate into the same string as a one-shot encode. Blocking:
+    call it from a worker thread.
+    """
+    chunk_size = (chunk_size or settings.UPLOAD_CHUNK_BYTES) // 3 * 3 or 3
+    source.seek(0)
+    pieces = []
+    while True:
+        chunk = source.read(chunk_size)
+        if not chunk:
+            break
+        pieces.append(base64.b64encode(chunk).decode("ascii"))
+    source.seek(0)
+    return "".join(pieces)
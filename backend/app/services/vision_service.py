@@ -2,17 +2,143 @@ import uuid
 import json
 import httpx
 import logging
-from typing import Optional
+import numpy as np
+from functools import lru_cache
+from typing import AsyncIterator, Optional
+from pydantic import create_model
 from app.config import settings
+from app.services.http_client import get_http_client
+from app.services.json_stream import OffSchema, StreamingObjectParser
+from app.services.llm_usage import vision_usage
+from app.services.match_scoring import score_columns, top_k
+from app.services.org_registry import organization_registry
+from app.services.prompt_registry import Prompt, prompt_registry
 
 logger = logging.getLogger(__name__)
 
+# Prompts (from the prompt registry) the analysis can be sent with
+VISION_PROMPTS = ("vision_system", "vision_structured", "vision_user")
+
+# Stand-in for the image data URL while the request JSON is serialized
+IMAGE_URL_PLACEHOLDER = "__TERRASYNC_IMAGE_URL__"
+BODY_CHUNK_CHARS = 64 * 1024
+
+# Streamed text after the analysis object that is still part of a well-formed reply
+TRAILING_FENCE_CHARS = " \t\r\n`"
+
+
+# Top-level fields of an analysis, each checked as soon as the model finishes writing it
+ANALYSIS_CATEGORIES = frozenset({
+    "electronics", "furniture", "industrial_scrap", "textiles", "plastics", "metals", "organic", "other"
+})
+CIRCULAR_VALUE_FIELDS = ("monetary_value", "eco_credits", "carbon_savings_kg", "confidence_score")
+ANALYSIS_FIELD_CHECKS = {
+    "category": lambda value: value in ANALYSIS_CATEGORIES,
+    "subcategory": lambda value: isinstance(value, str),
+    "description": lambda value: isinstance(value, str),
+    "condition": lambda value: isinstance(value, str),
+    "circular_value": lambda value: isinstance(value, dict) and all(
+        value.get(field) is not None for field in CIRCULAR_VALUE_FIELDS
+    ),
+    "recommended_paths": lambda value: isinstance(value, list) and all(isinstance(path, str) for path in value),
+    "environmental_impact": lambda value: isinstance(value, dict),
+}
+ENVIRONMENTAL_IMPACT_FIELDS = ("co2_saved_kg", "waste_diverted_kg", "water_saved_liters", "energy_saved_kwh")
+
+# AnalysisResult fields the service fills in rather than the model
+SERVER_FIELDS = ("item_id", "matching_organizations")
+
+# Models whose providers rejected response_format; they get the full prompt from then on
+_structured_output_unsupported: set[str] = set()
+
+
+class _StructuredOutputRejected(Exception):
+    """The provider refused the response_format request."""
+
+
+# Error text that blames the structured-output request itself rather than the image or payload.
+# With provider.require_parameters, OpenRouter answers "No endpoints found that support the
+# requested parameters" when no provider for the model can honour response_format.
+STRUCTURED_OUTPUT_ERROR_MARKERS = (
+    "response_format", "json_schema", "structured output", "support the requested parameters"
+)
+
+
+def _rejects_structured_output(status_code: int, error_text: str) -> bool:
+    if status_code not in (400, 404, 422):
+        return False
+    error_text = error_text.lower()
+    return any(marker in error_text for marker in STRUCTURED_OUTPUT_ERROR_MARKERS)
+
+
+def vision_prompt_version() -> str:
+    """Identifies the prompt revisions in use, so cached analyses are invalidated when they change."""
+    return prompt_registry.fingerprint(*VISION_PROMPTS)
+
+
+@lru_cache(maxsize=1)
+def analysis_json_schema() -> dict:
+    """
+    Strict JSON schema for the model's answer, derived from AnalysisResult.
+    
+    Server-filled fields are dropped, references are inlined and every
+    object is closed (all properties required, no extras), as strict
+    structured-output mode requires.
+    """
+    # Imported here because the vision router imports this module
+    from app.routers.vision import AnalysisResult
+    
+    fields = {
+        name: (field.annotation, field)
+        for name, field in AnalysisResult.model_fields.items()
+        if name not in SERVER_FIELDS
+    }
+    schema = create_model("ItemAnalysis", **fields).model_json_schema()
+    # AnalysisResult types this as a plain dict; spell out what the dashboard reads
+    schema["properties"]["environmental_impact"] = {
+        "type": "object",
+        "properties": {field: {"type": "number"} for field in ENVIRONMENTAL_IMPACT_FIELDS}
+    }
+    return _strict_schema(schema, schema.get("$defs", {}))
+
+
+def _response_format() -> dict:
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": "item_analysis", "strict": True, "schema": analysis_json_schema()}
+    }
+
+
+def _strict_schema(node, defs: dict):
+    if isinstance(node, list):
+        return [_strict_schema(item, defs) for item in node]
+    if not isinstance(node, dict):
+        return node
+    if "$ref" in node:
+        return _strict_schema(defs[node["$ref"].rsplit("/", 1)[-1]], defs)
+    strict = {}
+    for key, value in node.items():
+        if key == "properties":
+            strict[key] = {name: _strict_schema(prop, defs) for name, prop in value.items()}
+        elif key not in ("title", "$defs"):
+            strict[key] = _strict_schema(value, defs)
+    if strict.get("type") == "object" and "properties" in strict:
+        strict["required"] = list(strict["properties"])
+        strict["additionalProperties"] = False
+    return strict
+
 
 async def analyze_item_image(image_base64: str, content_type: str) -> dict:
     """
     Analyze an item image using OpenRouter API with vision-capable models.
     
     Returns categorization, circular value estimation, and recommended paths.
+    The completion is streamed and parsed as it arrives: reading stops at
+    the analysis object's closing brace, and output that goes off-schema is
+    abandoned mid-stream and retried, up to VISION_MAX_ATTEMPTS in total.
+    With VISION_STRUCTURED_OUTPUT the answer is constrained by a JSON schema
+    and a compact prompt is sent; models whose provider rejects that fall
+    back to the full prompt.
     """
     # If no API key, raise error - don't silently return mock data
     if not settings.OPENROUTER_API_KEY:
@@ -25,169 +151,38 @@ async def analyze_item_image(image_base64: str, content_type: str) -> dict:
     logger.info(f"Analyzing image with model: {vision_model}")
     
     try:
-        # Prepare the image URL for the vision API
-        image_url = f"data:{content_type};base64,{image_base64}"
-        
-        # OpenRouter API request
-        async with httpx.AsyncClient(timeout=120.0) as client:
-            logger.info(f"Sending request to OpenRouter API with model: {vision_model}")
-            
-            response = await client.post(
-                f"{settings.OPENROUTER_BASE_URL}/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {settings.OPENROUTER_API_KEY}",
-                    "Content-Type": "application/json",
-                    "HTTP-Referer": "https://terrasync.app",
-                    "X-Title": "TerraSync"
-                },
-                json={
-                    "model": vision_model,
-                    "messages": [
-                        {
-                            "role": "system",
-                            "content": """You are an expert in circular economy and waste management. Analyze images ACCURATELY and provide REALISTIC valuations.
-
-ANALYSIS RULES:
-1. Identify what you see in the image honestly
-2. If the image shows a physical item (electronics, furniture, etc.), provide ACCURATE market values based on:
-   - Current resale market prices (eBay, Craigslist, etc.)
-   - Item condition visible in image
-   - Age and wear apparent
-3. If image shows agricultural products/crops, provide realistic values based on:
-   - Crops in field: Estimate yield potential value ($50-500 per acre based on crop type and condition)
-   - Harvested crops: $0.20-2.00 per kg depending on type
-   - Agricultural waste: $0.05-0.15 per kg for biomass
-4. If image is unclear/doesn't show a sellable item, set monetary_value to 0 and explain why
-5. Be specific about what you see - brand, model, type if identifiable
-
-PRICING GUIDELINES (be realistic):
-- Working laptop (3-5 years old): $100-300
-- Broken/damaged laptop: $20-50 for parts
-- Working smartphone (2-3 years old): $150-400
-- Furniture (good condition): $50-500 depending on type
-- Scrap metal: $0.05-0.20 per lb
-- Clothing (good condition): $5-50
-- Broken/small electronics: $5-30
-- Books: $1-20
-- Appliances (working): $50-300
-- Appliances (broken): $10-50 for parts
-- Crops in field (healthy): $200-500 per acre yield potential
-- Crops in field (stressed/diseased): $50-150 per acre yield potential
-- Harvested grains: $0.20-0.50 per kg
-- Vegetables: $0.50-3.00 per kg
-- Agricultural waste: $0.05-0.15 per kg
-
-ECO-CREDITS (based on recyclability/value):
-- Electronics: 20-80 credits
-- Furniture: 15-50 credits
-- Metals: 30-70 credits
-- Plastics: 5-20 credits
-- Textiles: 5-25 credits
-- Organic waste: 5-15 credits
-- Agricultural crops (healthy): 15-40 credits
-- Agricultural crops (stressed): 5-15 credits
-- Biomass/agricultural waste: 10-30 credits
-
-CONFIDENCE SCORE:
-- 0.8-0.95: Clear image, easily identifiable item
-- 0.5-0.7: Somewhat clear, reasonable identification
-- 0.2-0.4: Unclear image or uncertain identification
-- 0.1: Cannot identify anything useful
-
-Provide a JSON response with these exact fields:
-{
-    "category": "electronics|furniture|industrial_scrap|textiles|plastics|metals|organic|other",
-    "subcategory": "specific type (e.g., 'laptop_computer', 'office_chair', 'rice_crop', 'soybean_field')",
-    "description": "Detailed description of what you see including brand/model if visible, condition details, any damage",
-    "condition": "excellent|good|fair|poor",
-    "circular_value": {
-        "monetary_value": realistic USD value (for crops in field, estimate yield potential per acre),
-        "eco_credits": 1-100 based on recyclability/environmental value,
-        "carbon_savings_kg": realistic estimate,
-        "confidence_score": 0.1-0.95 based on image clarity
-    },
-    "recommended_paths": ["reuse", "refurbish", "recycle", "upcycle", "donate", "dispose"],
-    "environmental_impact": {
-        "co2_saved_kg": realistic estimate,
-        "waste_diverted_kg": realistic estimate,
-        "water_saved_liters": realistic estimate,
-        "energy_saved_kwh": realistic estimate
-    }
-}
-
-Be ACCURATE and REALISTIC. For agricultural products, consider their yield potential and environmental value. Respond ONLY with valid JSON."""
-                        },
-                        {
-                            "role": "user",
-                            "content": [
-                                {"type": "text", "text": "Analyze this image for circular economy potential. Be HONEST and CRITICAL. If the image is unclear or shows trash/waste, say so. Describe ONLY what you actually see in the image."},
-                                {"type": "image_url", "image_url": {"url": image_url}}
-                            ]
-                        }
-                    ],
-                    "max_tokens": 2000
-                }
-            )
-            
-            logger.info(f"Response status: {response.status_code}")
-            
-            if response.status_code != 200:
-                error_text = response.text
-                logger.error(f"API error response: {error_text}")
-                raise Exception(f"OpenRouter API error ({response.status_code}): {error_text}")
-            
-            data = response.json()
-            logger.info(f"API response received, choices: {len(data.get('choices', []))}")
-            
-            if not data.get("choices"):
-                raise Exception(f"No choices in OpenRouter response: {data}")
-            
-            # Parse the response
-            content = data["choices"][0]["message"]["content"]
-            logger.info(f"Raw response content (first 500 chars): {content[:500]}...")
-            
-            # Clean up potential markdown code blocks
-            if content.startswith("```"):
-                content = content.split("```")[1]
-                if content.startswith("json"):
-                    content = content[4:]
-                content = content.strip()
-            
-            # Handle trailing content after JSON
+        structured = settings.VISION_STRUCTURED_OUTPUT and vision_model not in _structured_output_unsupported
+        attempts = max(1, settings.VISION_MAX_ATTEMPTS)
+        attempt = 1
+        while True:
+            parser = StreamingObjectParser(ANALYSIS_FIELD_CHECKS, required=ANALYSIS_FIELD_CHECKS)
             try:
-                # Find the JSON object
-                start_idx = content.find('{')
-                end_idx = content.rfind('}') + 1
-                if start_idx != -1 and end_idx > start_idx:
-                    content = content[start_idx:end_idx]
-                
-                result = json.loads(content)
-            except json.JSONDecodeError as je:
-                logger.error(f"JSON parse error: {je}")
-                logger.error(f"Problematic content: {content}")
-                raise Exception(f"Failed to parse AI response as JSON: {je}")
-            
-            # Validate required fields
-            required_fields = ["category", "subcategory", "description", "condition", "circular_value", "recommended_paths", "environmental_impact"]
-            for field in required_fields:
-                if field not in result:
-                    raise Exception(f"Missing required field in AI response: {field}")
-            
-            # Validate circular_value subfields
-            cv = result.get("circular_value", {})
-            for cv_field in ["monetary_value", "eco_credits", "carbon_savings_kg", "confidence_score"]:
-                if cv_field not in cv:
-                    raise Exception(f"Missing circular_value field: {cv_field}")
-            
-            result["item_id"] = str(uuid.uuid4())
-            
-            # Add matching organizations
-            result["matching_organizations"] = _get_matching_organizations(result.get("category", "other"))
-            
-            logger.info(f"Successfully analyzed item: {result.get('category', 'unknown')} - {result.get('subcategory', 'unknown')} (confidence: {result.get('circular_value', {}).get('confidence_score', 0)})")
-            
-            return result
-            
+                await _request_analysis(vision_model, image_base64, content_type, parser, structured)
+                break
+            except _StructuredOutputRejected as e:
+                # No answer was produced, so this does not use up an attempt
+                logger.warning(f"{vision_model} does not accept response_format, using the full prompt: {e}")
+                _structured_output_unsupported.add(vision_model)
+                structured = False
+            except OffSchema as e:
+                logger.warning(f"Discarded vision output on attempt {attempt}/{attempts}: {e}")
+                logger.warning(f"Problematic content: {parser.text[:500]}")
+                if attempt == attempts:
+                    raise Exception(f"Failed to parse AI response as JSON: {e}")
+                attempt += 1
+        
+        result = parser.fields
+        result["item_id"] = str(uuid.uuid4())
+        
+        # Add matching organizations
+        result["matching_organizations"] = get_matching_organizations(
+            result.get("category", "other"), result.get("subcategory"), result.get("recommended_paths")
+        )
+        
+        logger.info(f"Successfully analyzed item: {result.get('category', 'unknown')} - {result.get('subcategory', 'unknown')} (confidence: {result.get('circular_value', {}).get('confidence_score', 0)})")
+        
+        return result
+        
     except httpx.HTTPStatusError as e:
         logger.error(f"HTTP error calling OpenRouter: {e}")
         raise Exception(f"HTTP error calling OpenRouter: {e.response.text if hasattr(e, 'response') else str(e)}")
@@ -201,6 +196,139 @@ Be ACCURATE and REALISTIC. For agricultural products, consider their yield poten
         raise
 
 
+async def _request_analysis(
+    vision_model: str, image_base64: str, content_type: str, parser: StreamingObjectParser, structured: bool = False
+) -> None:
+    """
+    Run one completion, feeding its text to parser until the object is complete.
+    
+    Raises OffSchema when the output is rejected or ends early.
+    """
+    system_prompt = prompt_registry.get("vision_structured" if structured else "vision_system")
+    # Static content first and the image last, so consecutive requests share
+    # the longest possible prefix for the provider's prompt cache. The image
+    # URL is spliced into the body while it is sent, so the base64 image is
+    # never copied into a second, JSON-encoded string
+    payload = {
+        "model": vision_model,
+        "messages": [
+            _system_message(vision_model, system_prompt),
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": prompt_registry.get("vision_user").text},
+                    {"type": "image_url", "image_url": {"url": IMAGE_URL_PLACEHOLDER}}
+                ]
+            }
+        ],
+        "max_tokens": 2000,
+        "stream": settings.VISION_STREAMING,
+        # Report prompt, cached and completion tokens (in the last event when streaming)
+        "usage": {"include": True}
+    }
+    if structured:
+        payload["response_format"] = _response_format()
+        # Only route to providers that honour response_format instead of ignoring it
+        payload["provider"] = {"require_parameters": True}
+    content_length, body = _stream_json_body(payload, f"data:{content_type};base64,", image_base64)
+    
+    # OpenRouter API request over the shared, pooled client
+    client = get_http_client()
+    logger.info(f"Sending request to OpenRouter API with model: {vision_model}")
+    
+    async with client.stream(
+        "POST",
+        f"{settings.OPENROUTER_BASE_URL}/chat/completions",
+        headers={
+            "Authorization": f"Bearer {settings.OPENROUTER_API_KEY}",
+            "Content-Type": "application/json",
+            "Content-Length": str(content_length),
+            "HTTP-Referer": "https://terrasync.app",
+            "X-Title": "TerraSync"
+        },
+        content=body
+    ) as response:
+        logger.info(f"Response status: {response.status_code}")
+        
+        if response.status_code != 200:
+            error_text = (await response.aread()).decode("utf-8", errors="replace")
+            if structured and _rejects_structured_output(response.status_code, error_text):
+                raise _StructuredOutputRejected(f"({response.status_code}) {error_text[:200]}")
+            logger.error(f"API error response: {error_text}")
+            raise Exception(f"OpenRouter API error ({response.status_code}): {error_text}")
+        
+        usage = None
+        try:
+            if not settings.VISION_STREAMING:
+                data = json.loads(await response.aread())
+                if not data.get("choices"):
+                    raise Exception(f"No choices in OpenRouter response: {data}")
+                usage = data.get("usage")
+                parser.feed(data["choices"][0]["message"]["content"] or "")
+            else:
+                async for line in response.aiter_lines():
+                    # Skip blank separators and ": OPENROUTER PROCESSING" keep-alive comments
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        break
+                    event = json.loads(data)
+                    if event.get("error"):
+                        raise Exception(f"OpenRouter API error: {event['error']}")
+                    usage = event.get("usage") or usage
+                    chatter = False
+                    for choice in event.get("choices") or ():
+                        delta = (choice.get("delta") or {}).get("content")
+                        if not delta:
+                            continue
+                        if not parser.complete:
+                            parser.feed(delta)
+                        elif delta.strip(TRAILING_FENCE_CHARS):
+                            chatter = True
+                    # After the object only a closing fence and the usage report are
+                    # worth waiting for. Leaving the block closes the stream, which
+                    # stops generation upstream, at the cost of the usage report
+                    if chatter:
+                        break
+        finally:
+            vision_usage.record(vision_model, system_prompt.id, usage)
+    
+    if not parser.complete:
+        raise OffSchema("completion ended before the JSON object was complete")
+
+
+def _system_message(vision_model: str, prompt: Prompt) -> dict:
+    """The system message, with a cache breakpoint after it for providers that need one."""
+    if not any(vision_model.startswith(prefix) for prefix in settings.PROMPT_CACHE_CONTROL_MODELS):
+        return {"role": "system", "content": prompt.text}
+    return {
+        "role": "system",
+        "content": [{"type": "text", "text": prompt.text, "cache_control": {"type": "ephemeral"}}]
+    }
+
+
+def _stream_json_body(payload: dict, image_url_prefix: str, image_base64: str) -> tuple[int, AsyncIterator[bytes]]:
+    """
+    Serialize payload with the image data URL streamed in place of IMAGE_URL_PLACEHOLDER.
+
+    Base64 and the data URL prefix contain no characters that need JSON
+    escaping, so they can be written between the serialized halves verbatim.
+    """
+    head, tail = json.dumps(payload).split(IMAGE_URL_PLACEHOLDER)
+    head_bytes = (head + image_url_prefix).encode("utf-8")
+    tail_bytes = tail.encode("utf-8")
+    content_length = len(head_bytes) + len(image_base64) + len(tail_bytes)
+
+    async def body() -> AsyncIterator[bytes]:
+        yield head_bytes
+        for start in range(0, len(image_base64), BODY_CHUNK_CHARS):
+            yield image_base64[start:start + BODY_CHUNK_CHARS].encode("ascii")
+        yield tail_bytes
+
+    return content_length, body()
+
+
 def _get_mock_analysis() -> dict:
     """Return mock analysis data for development/testing."""
     return {
@@ -216,7 +344,9 @@ def _get_mock_analysis() -> dict:
             "confidence_score": 0.85
         },
         "recommended_paths": ["refurbish", "donate", "recycle"],
-        "matching_organizations": _get_matching_organizations("electronics"),
+        "matching_organizations": get_matching_organizations(
+            "electronics", "laptop_computer", ["refurbish", "donate", "recycle"]
+        ),
         "environmental_impact": {
             "co2_saved_kg": 12.5,
             "waste_diverted_kg": 2.8,
@@ -226,24 +356,40 @@ def _get_mock_analysis() -> dict:
     }
 
 
-def _get_matching_organizations(category: str) -> list[dict]:
-    """Get mock matching organizations based on category."""
-    organizations = {
-        "electronics": [
-            {"id": "ngo-001", "name": "Tech for All", "type": "ngo", "match_score": 0.92, "distance_km": 5.2},
-            {"id": "recycle-001", "name": "E-Waste Solutions", "type": "recycling_center", "match_score": 0.88, "distance_km": 3.1},
-            {"id": "ngo-002", "name": "Digital Bridge", "type": "ngo", "match_score": 0.85, "distance_km": 8.7}
-        ],
-        "furniture": [
-            {"id": "ngo-003", "name": "Habitat ReStore", "type": "ngo", "match_score": 0.95, "distance_km": 2.5},
-            {"id": "recycle-002", "name": "Furniture Recycling Co", "type": "recycling_center", "match_score": 0.82, "distance_km": 6.3}
-        ],
-        "industrial_scrap": [
-            {"id": "recycle-003", "name": "Industrial Metals Inc", "type": "recycling_center", "match_score": 0.97, "distance_km": 12.0},
-            {"id": "recycle-004", "name": "Scrap Solutions", "type": "recycling_center", "match_score": 0.89, "distance_km": 8.5}
-        ]
-    }
+def get_matching_organizations(
+    category: str,
+    subcategory: Optional[str] = None,
+    recommended_paths: Optional[list] = None,
+    limit: int = 3
+) -> list[dict]:
+    """
+    Organizations that accept the item, from the organization registry.
+    
+    Subcategory specialists are listed ahead of general category matches;
+    each group is ranked by the match scorer. Items in a category nobody
+    lists fall back to the "other" (general reuse) organizations.
+    """
+    registry = organization_registry.current()
+    preferred_path = recommended_paths[0] if recommended_paths else None
+    category_rows = registry.category_rows(category)
+    if category_rows.size == 0:
+        category_rows = registry.category_rows("other")
+    # Row lists are sorted and unique, so the split is a merge, not a nested scan
+    specialists = np.intersect1d(registry.subcategory_rows(subcategory), category_rows, assume_unique=True)
+    generalists = np.setdiff1d(category_rows, specialists, assume_unique=True)
+    fit = registry.category_fit(category, preferred_path)
     
-    return organizations.get(category, [
-        {"id": "ngo-default", "name": "General Reuse Center", "type": "ngo", "match_score": 0.75, "distance_km": 10.0}
-    ])
+    matches = []
+    for rows in (specialists, generalists):
+        if len(matches) < limit and rows.size:
+            scores = score_columns(registry.columns.take(rows, fit[rows]))
+            for index in top_k(scores, limit - len(matches)):
+                org = registry.organizations[rows[index]]
+                matches.append({
+                    "id": org["id"],
+                    "name": org["name"],
+                    "type": org["type"],
+                    # No distance_km: analyze-item does not receive the item's location
+                    "match_score": round(float(scores[index]), 3)
+                })
+    return matches
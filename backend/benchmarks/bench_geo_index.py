@@ -0,0 +1,75 @@
+"""
+Micro-benchmark: organization lookups by distance.
+
+Builds a synthetic set of drop-off points clustered around a few metro areas
+and compares k-nearest / radius queries on the grid index with a vectorized
+full scan of every point.
+
+Run from the backend directory:
+    python -m benchmarks.bench_geo_index --organizations 50000 --queries 2000
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from app.services.geo_index import GeoIndex, haversine_km
+
+METROS = [(40.7128, -74.0060), (34.0522, -118.2437), (41.8781, -87.6298), (51.5074, -0.1278), (48.8566, 2.3522)]
+
+
+def synthetic_organizations(count: int, seed: int = 0) -> list[dict]:
+    rng = random.Random(seed)
+    organizations = []
+    for i in range(count):
+        lat, lng = rng.choice(METROS)
+        organizations.append({"id": f"org-{i}", "lat": lat + rng.gauss(0, 0.3), "lng": lng + rng.gauss(0, 0.4)})
+    return organizations
+
+
+def measure(fn, queries: list[tuple[float, float]]) -> float:
+    start = time.perf_counter()
+    for lat, lng in queries:
+        fn(lat, lng)
+    return (time.perf_counter() - start) / len(queries)
+
+
+def main(count: int, query_count: int, k: int, radius_km: float) -> None:
+    organizations = synthetic_organizations(count)
+    start = time.perf_counter()
+    index = GeoIndex(organizations)
+    print(f"build {count} organizations: {(time.perf_counter() - start) * 1e3:9.1f} ms")
+
+    lats = np.array([o["lat"] for o in organizations])
+    lngs = np.array([o["lng"] for o in organizations])
+    rng = random.Random(1)
+    queries = [(lat + rng.gauss(0, 0.2), lng + rng.gauss(0, 0.2)) for lat, lng in (rng.choice(METROS) for _ in range(query_count))]
+
+    def scan_nearest(lat, lng):
+        distances = haversine_km(lat, lng, lats, lngs)
+        top = np.argpartition(distances, k - 1)[:k]
+        return top[np.argsort(distances[top])]
+
+    def scan_within(lat, lng):
+        distances = haversine_km(lat, lng, lats, lngs)
+        return np.nonzero(distances <= radius_km)[0]
+
+    rows = [
+        (f"full scan k={k}", measure(scan_nearest, queries)),
+        (f"grid index k={k}", measure(lambda lat, lng: index.nearest(lat, lng, k), queries)),
+        (f"full scan r={radius_km:g}km", measure(scan_within, queries)),
+        (f"grid index r={radius_km:g}km", measure(lambda lat, lng: index.within(lat, lng, radius_km), queries)),
+    ]
+    for label, seconds in rows:
+        print(f"{label:24s} {seconds * 1e6:9.1f} µs/query")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--organizations", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--radius-km", type=float, default=5.0)
+    args = parser.parse_args()
+    main(args.organizations, args.queries, args.k, args.radius_km)
@@ -0,0 +1,68 @@
+"""
+Micro-benchmark: cost of one dashboard poll of /api/impact-stats.
+
+Compares rendering the response from the rollups on every request with
+serving the shared snapshot, and with a conditional poll that gets a 304:
+first for the handler work alone, then end to end through the middleware
+stack over an in-memory ASGI transport (no network).
+
+Run from the backend directory:
+    python -m benchmarks.bench_impact_stats --requests 2000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import httpx
+
+
+async def main(requests: int) -> None:
+    os.environ.setdefault("IMPACT_DB_PATH", os.path.join(tempfile.mkdtemp(), "impact.db"))
+    from app.main import app
+    from app.middleware.rate_limit import rate_limiter
+    from app.routers import impact
+    from app.services.impact_store import ImpactEvent, impact_store
+
+    # Keep the limiter's per-client history empty so it stays out of the measurement
+    rate_limiter.period_seconds = 0
+    for i in range(200):
+        await impact_store.record(ImpactEvent(type="trade", description=f"trade {i}", impact=10, matched=True, user_id=f"u{i}"))
+
+    async def handler_cost(label, fn):
+        start = time.perf_counter()
+        for _ in range(requests):
+            await fn()
+        print(f"{label:32s} {(time.perf_counter() - start) / requests * 1e6:9.1f} µs/request")
+
+    async def snapshot_poll():
+        snapshot = await impact.impact_snapshot.get()
+        snapshot.not_modified(snapshot.etag, None)
+
+    print("handler only")
+    await handler_cost("render on every request", impact._render_impact_response)
+    await handler_cost("shared snapshot + validators", snapshot_poll)
+
+    print("end to end")
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def measure(label, headers=None, invalidate=False):
+            start = time.perf_counter()
+            for _ in range(requests):
+                if invalidate:
+                    impact.impact_snapshot.invalidate()
+                response = await client.get("/api/impact-stats", headers=headers)
+            elapsed = (time.perf_counter() - start) / requests
+            print(f"{label:32s} {elapsed * 1e6:9.1f} µs/request  ({response.status_code}, {len(response.content)} B)")
+
+        etag = (await client.get("/api/impact-stats")).headers["etag"]
+        await measure("render on every request", invalidate=True)
+        await measure("shared snapshot")
+        await measure("conditional poll (304)", headers={"If-None-Match": etag})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests))
@@ -0,0 +1,106 @@
+"""
+Benchmark: requests/sec through the middleware stack, before and after.
+
+"before" rebuilds the previous stack: three @app.middleware("http") layers
+(CORS, rate limit, upload limit), each a BaseHTTPMiddleware that re-wraps
+the response body in its own task and stream. "after" is the app as
+shipped, with the single EdgeMiddleware. Both serve the same routers over
+an in-memory ASGI transport (no network), with an Origin header so CORS
+headers are produced, and a quota high enough never to reject.
+
+Run from the backend directory:
+    python -m benchmarks.bench_middleware --requests 3000 --concurrency 32
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import httpx
+
+
+def legacy_app(limiter):
+    """The app's routes behind the previous three BaseHTTPMiddleware layers."""
+    from fastapi import FastAPI, Response
+    from fastapi.responses import JSONResponse
+    from app.main import health_check
+    from app.middleware.upload_limit import max_request_bytes, too_large_detail
+    from app.routers import impact
+
+    app = FastAPI()
+    app.include_router(impact.router, prefix="/api")
+    app.get("/health")(health_check)
+
+    @app.middleware("http")
+    async def add_cors_headers(request, call_next):
+        if request.method == "OPTIONS":
+            return Response(status_code=200, headers={"Access-Control-Allow-Origin": "*"})
+        response = await call_next(request)
+        response.headers["Access-Control-Allow-Origin"] = "*"
+        response.headers["Access-Control-Allow-Methods"] = "GET, POST, PUT, DELETE, OPTIONS"
+        response.headers["Access-Control-Allow-Headers"] = "*"
+        return response
+
+    @app.middleware("http")
+    async def rate_limit_middleware(request, call_next):
+        if request.url.path in ["/", "/health", "/docs", "/openapi.json"]:
+            return await call_next(request)
+        client_id = request.client.host if request.client else "unknown"
+        allowed, remaining = await limiter.is_allowed(client_id, request.url.path)
+        if not allowed:
+            return JSONResponse(status_code=429, content={"detail": "Rate limit exceeded."})
+        response = await call_next(request)
+        response.headers["X-RateLimit-Limit"] = str(limiter.limit_for(request.url.path))
+        response.headers["X-RateLimit-Remaining"] = str(remaining)
+        return response
+
+    @app.middleware("http")
+    async def upload_limit_middleware(request, call_next):
+        limit = max_request_bytes(request.url.path)
+        content_length = request.headers.get("content-length")
+        if limit and request.method == "POST" and content_length and int(content_length) > limit:
+            return JSONResponse(status_code=413, content={"detail": too_large_detail()})
+        return await call_next(request)
+
+    return app
+
+
+async def measure(label: str, app, path: str, requests: int, concurrency: int) -> None:
+    headers = {"Origin": "http://localhost:3000"}
+    transport = httpx.ASGITransport(app=app, client=("10.0.0.1", 50000))
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers) as client:
+        await client.get(path)
+        per_worker = requests // concurrency
+
+        async def worker():
+            for _ in range(per_worker):
+                response = await client.get(path)
+                assert response.status_code == 200, response.status_code
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    print(f"{label:8s} {path:20s} {per_worker * concurrency / elapsed:9,.0f} req/s  {elapsed / (per_worker * concurrency) * 1e6:7.1f} µs/req")
+
+
+async def main(requests: int, concurrency: int) -> None:
+    os.environ.setdefault("IMPACT_DB_PATH", os.path.join(tempfile.mkdtemp(), "impact.db"))
+    from app.main import app
+    from app.middleware.rate_limit import rate_limiter
+
+    # Generous quota: every request is checked and counted but none is rejected
+    rate_limiter.requests = 10 ** 9
+    before = legacy_app(rate_limiter)
+    print(f"{requests:,} requests, {concurrency} concurrent")
+    for path in ("/health", "/api/impact-stats"):
+        await measure("before", before, path, requests, concurrency)
+        await measure("after", app, path, requests, concurrency)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency))
@@ -0,0 +1,90 @@
+"""
+Micro-benchmark: rate limiter cost with many distinct clients.
+
+Compares the previous limiter (one asyncio.Lock, a list of datetimes per
+client rebuilt on every request, no eviction) with the sliding-window
+counter, driving both from one event loop as the middleware does, and
+reports how many clients each still holds once they have all gone idle.
+The SQLite backend shared by worker processes is measured separately on
+fewer clients, since every check is a transaction on a worker thread.
+
+Run from the backend directory:
+    python -m benchmarks.bench_rate_limit --clients 100000 --requests 5
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from app.middleware.rate_limit import RateLimiter
+from app.middleware.rate_limit_backends import SQLiteBackend
+
+
+class TimestampListLimiter:
+    """The limiter this module replaced, kept here as the baseline."""
+
+    def __init__(self, requests: int = 100, period_seconds: int = 60):
+        self.requests = requests
+        self.period_seconds = period_seconds
+        self.requests_log = defaultdict(list)
+        self._lock = asyncio.Lock()
+
+    async def is_allowed(self, client_id: str) -> tuple[bool, int]:
+        async with self._lock:
+            now = datetime.utcnow()
+            cutoff = now - timedelta(seconds=self.period_seconds)
+            self.requests_log[client_id] = [ts for ts in self.requests_log[client_id] if ts > cutoff]
+            current_count = len(self.requests_log[client_id])
+            if current_count >= self.requests:
+                return False, 0
+            self.requests_log[client_id].append(now)
+            return True, max(0, self.requests - current_count - 1)
+
+
+async def run(label: str, limiter, clients: int, requests: int, settle=None) -> None:
+    ids = [f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}" for i in range(clients)]
+    start = time.perf_counter()
+    for _ in range(requests):
+        for client_id in ids:
+            await limiter.is_allowed(client_id)
+    elapsed = time.perf_counter() - start
+    total = clients * requests
+    held = ""
+    if settle is not None:
+        held = f"{settle(limiter):>8,} clients held after idle"
+    print(f"{label:24s} {total / elapsed:12,.0f} checks/s  {elapsed / total * 1e6:7.2f} µs/check  {held}")
+
+
+def idle_baseline(limiter: TimestampListLimiter) -> int:
+    # Entries are only pruned when the same client comes back, so nothing leaves
+    return len(limiter.requests_log)
+
+
+def idle_sliding(limiter: RateLimiter) -> int:
+    # Two windows later, as seen by the next request from anyone
+    backend = limiter.backend
+    backend.take("late-client", limiter.requests, limiter.period_seconds, now=time.monotonic() + 2 * limiter.period_seconds)
+    return backend.clients()
+
+
+async def main(clients: int, requests: int, shared_clients: int) -> None:
+    print(f"{clients:,} distinct clients x {requests} requests")
+    await run("timestamp lists + lock", TimestampListLimiter(), clients, requests, idle_baseline)
+    await run("sliding-window counter", RateLimiter(), clients, requests, idle_sliding)
+
+    print(f"{shared_clients:,} distinct clients x {requests} requests")
+    backend = SQLiteBackend(os.path.join(tempfile.mkdtemp(), "rate_limit.db"))
+    await run("sqlite (multi-worker)", RateLimiter(backend=backend), shared_clients, requests)
+    await backend.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=100_000)
+    parser.add_argument("--requests", type=int, default=5)
+    parser.add_argument("--shared-clients", type=int, default=10_000)
+    args = parser.parse_args()
+    asyncio.run(main(args.clients, args.requests, args.shared_clients))
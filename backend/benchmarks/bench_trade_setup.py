@@ -0,0 +1,55 @@
+"""
+Micro-benchmark: per-request setup cost of the negotiation agent.
+
+Compares building a ChatOpenAI client and compiling the StateGraph on every
+trade (the old behaviour) with the memoized get_negotiation_graph() lookup.
+
+Run from the backend directory:
+    python -m benchmarks.bench_trade_setup --iterations 200
+"""
+import argparse
+import time
+
+from app.config import settings
+from app.services import agent_service
+
+
+def per_request_setup() -> None:
+    llm = agent_service.ChatOpenAI(
+        api_key=settings.OPENROUTER_API_KEY,
+        base_url=settings.OPENROUTER_BASE_URL,
+        model=settings.OPENROUTER_AGENT_MODEL,
+        default_headers={"HTTP-Referer": "https://terrasync.app", "X-Title": "TerraSync"},
+    )
+    agent_service._build_negotiation_graph(llm)
+
+
+def memoized_setup() -> None:
+    agent_service.get_negotiation_graph()
+
+
+def measure(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations
+
+
+def main(iterations: int) -> None:
+    settings.OPENROUTER_API_KEY = settings.OPENROUTER_API_KEY or "benchmark-key"
+    # Warm imports and the memoized graph so both sides measure steady state
+    per_request_setup()
+    memoized_setup()
+
+    before = measure(per_request_setup, iterations)
+    after = measure(memoized_setup, iterations * 100)
+    print(f"per-request ChatOpenAI + compile: {before * 1e3:10.3f} ms/request")
+    print(f"memoized get_negotiation_graph:   {after * 1e3:10.4f} ms/request")
+    print(f"speedup:                          {before / after:10.0f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+    main(args.iterations)
@@ -0,0 +1,57 @@
+"""
+Micro-benchmark: time to first negotiation step, blocking vs streamed.
+
+The partner query is replaced by a fixed sleep standing in for slow partner
+APIs or LLM calls, so the numbers show where the first byte can go out:
+after the whole graph (blocking) or after the first node (streamed).
+
+Run from the backend directory:
+    python -m benchmarks.bench_trade_stream --latency 0.5 --runs 5
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+
+async def main(latency: float, runs: int) -> None:
+    from app.config import settings
+    from app.services import agent_service
+    from app.services.partner_client import PartnerQueryResult
+
+    settings.OPENROUTER_API_KEY = settings.OPENROUTER_API_KEY or "bench-key"
+
+    async def slow_fetch(item_id, preferred_path=None, location=None, category=None):
+        await asyncio.sleep(latency)
+        return PartnerQueryResult(matches=agent_service._query_mock_apis(item_id, preferred_path, location, category))
+
+    agent_service._fetch_partner_matches = slow_fetch
+    agent_service.get_negotiation_graph()
+    agent_service.organization_registry.current()
+
+    blocking, first_step, streamed_total = [], [], []
+    for i in range(runs):
+        start = time.perf_counter()
+        await agent_service.orchestrate_trade_negotiation(item_id=f"item-{i}", user_id="bench")
+        blocking.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        first = None
+        async for kind, _ in agent_service.stream_trade_negotiation(item_id=f"item-{i}", user_id="bench"):
+            if first is None:
+                first = time.perf_counter() - start
+        first_step.append(first)
+        streamed_total.append(time.perf_counter() - start)
+
+    print(f"simulated partner latency {latency * 1000:.0f} ms, {runs} runs (median)")
+    print(f"{'blocking: first byte':28s} {statistics.median(blocking) * 1000:8.1f} ms")
+    print(f"{'streamed: first step':28s} {statistics.median(first_step) * 1000:8.1f} ms")
+    print(f"{'streamed: final result':28s} {statistics.median(streamed_total) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.latency, args.runs))
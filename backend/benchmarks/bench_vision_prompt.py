@@ -0,0 +1,83 @@
+"""
+Benchmark: request size and latency per analysis, prose prompt vs structured output.
+
+A simulated OpenRouter charges `--prefill-us` per ~4-character prompt token
+(system prompt plus response_format schema) and `--token-ms` per generated
+token. With the full prompt the model answers with fenced, indented JSON
+and a paragraph of commentary; with VISION_STRUCTURED_OUTPUT the provider
+constrains it to the bare object. Both runs use the streamed parser.
+
+Run from the backend directory:
+    python -m benchmarks.bench_vision_prompt --token-ms 5 --prefill-us 200
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+from benchmarks.bench_vision_stream import ANALYSIS, COMMENTARY
+
+
+class SimulatedProvider:
+    def __init__(self, prefill_seconds: float, token_seconds: float):
+        self.prefill_seconds = prefill_seconds
+        self.token_seconds = token_seconds
+        self.prompt_chars = 0
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        payload = json.loads(await request.aread())
+        prompt = payload["messages"][0]["content"]
+        if "response_format" in payload:
+            prompt += json.dumps(payload["response_format"])
+            text = json.dumps(ANALYSIS)
+        else:
+            text = "```json\n" + json.dumps(ANALYSIS, indent=2) + "\n```" + COMMENTARY
+        self.prompt_chars = len(prompt)
+        return httpx.Response(200, content=self._stream(len(prompt) // 4, text))
+
+    async def _stream(self, prompt_tokens: int, text: str):
+        await asyncio.sleep(prompt_tokens * self.prefill_seconds)
+        for i in range(0, len(text), 4):
+            await asyncio.sleep(self.token_seconds)
+            yield f"data: {json.dumps({'choices': [{'delta': {'content': text[i:i + 4]}}]})}\n\n".encode()
+        yield b"data: [DONE]\n\n"
+
+
+async def run(structured: bool, prefill_seconds: float, token_seconds: float) -> None:
+    from app.config import settings
+    from app.services import vision_service
+
+    settings.VISION_STRUCTURED_OUTPUT = structured
+    provider = SimulatedProvider(prefill_seconds, token_seconds)
+    client = httpx.AsyncClient(transport=httpx.MockTransport(provider.handle))
+    vision_service.get_http_client = lambda: client
+    start = time.perf_counter()
+    await vision_service.analyze_item_image("aGVsbG8=", "image/png")
+    elapsed = time.perf_counter() - start
+    mode = "structured" if structured else "prompt"
+    print(f"{mode:10s} {provider.prompt_chars:6d} prompt chars  {elapsed * 1000:8.0f} ms")
+
+
+async def main(token_ms: float, prefill_us: float) -> None:
+    import logging
+    from app.config import settings
+    from app.services import vision_service
+
+    logging.disable(logging.WARNING)
+    # Build the schema (and import the router it comes from) outside the timed runs
+    vision_service.analysis_json_schema()
+    settings.OPENROUTER_API_KEY = settings.OPENROUTER_API_KEY or "bench-key"
+    settings.VISION_STREAMING = True
+    print(f"simulated provider: {prefill_us} us per prompt token, {token_ms} ms per generated token")
+    for structured in (False, True):
+        await run(structured, prefill_us / 1e6, token_ms / 1000)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--token-ms", type=float, default=5.0)
+    parser.add_argument("--prefill-us", type=float, default=200.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.token_ms, args.prefill_us))
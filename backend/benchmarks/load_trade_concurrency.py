@@ -0,0 +1,80 @@
+"""
+Load test: concurrent /api/orchestrate-trade calls against one worker.
+
+Fires many trade negotiations at once through the real LangGraph path, with
+partner I/O simulated by an async delay, while /health is polled in the
+background. If negotiations blocked the event loop, wall time would approach
+trades x latency and /health would stall for the duration.
+
+Run from the backend directory:
+    python -m benchmarks.load_trade_concurrency --trades 50 --partner-latency 0.2
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from app.config import settings
+from app.main import app
+from app.middleware.rate_limit import rate_limiter
+from app.services import agent_service
+from app.services.partner_client import PartnerQueryResult
+
+
+async def main(trades: int, partner_latency: float) -> None:
+    # Exercise the graph path; the LLM client is built but never called
+    settings.OPENROUTER_API_KEY = settings.OPENROUTER_API_KEY or "benchmark-key"
+    # The limiter was built at import, so settings changes no longer reach it; a zero period disables it
+    rate_limiter.period_seconds = 0
+
+    async def slow_fetch(item_id, preferred_path=None, location=None, category=None):
+        await asyncio.sleep(partner_latency)
+        return PartnerQueryResult(matches=agent_service._query_mock_apis(item_id, preferred_path, location, category))
+
+    agent_service._fetch_partner_matches = slow_fetch
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        health_latencies = []
+        done = asyncio.Event()
+
+        async def poll_health():
+            while not done.is_set():
+                start = time.perf_counter()
+                await client.get("/health")
+                health_latencies.append(time.perf_counter() - start)
+                await asyncio.sleep(0.005)
+
+        async def trade(i):
+            response = await client.post(
+                "/api/orchestrate-trade",
+                json={"item_id": f"bench-item-{i}", "user_id": "bench-user"},
+            )
+            response.raise_for_status()
+
+        poller = asyncio.create_task(poll_health())
+        start = time.perf_counter()
+        await asyncio.gather(*(trade(i) for i in range(trades)))
+        wall = time.perf_counter() - start
+        done.set()
+        await poller
+
+    health_latencies.sort()
+    print(f"trades:                 {trades}")
+    print(f"simulated partner I/O:  {partner_latency * 1000:.0f} ms per trade")
+    print(f"wall time:              {wall:.3f} s (serialized would be >= {trades * partner_latency:.3f} s)")
+    print(f"throughput:             {trades / wall:.1f} trades/s")
+    print(f"/health samples:        {len(health_latencies)}")
+    print(f"/health p50:            {statistics.median(health_latencies) * 1000:.2f} ms")
+    print(f"/health p95:            {health_latencies[int(len(health_latencies) * 0.95)] * 1000:.2f} ms")
+    print(f"/health max:            {health_latencies[-1] * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trades", type=int, default=50)
+    parser.add_argument("--partner-latency", type=float, default=0.2)
+    args = parser.parse_args()
+    asyncio.run(main(args.trades, args.partner_latency))
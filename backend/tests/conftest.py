@@ -1,8 +1,24 @@
+import os
+import tempfile
+
+# Keep the app's local SQLite stores out of the working tree during tests
+_test_data_dir = tempfile.mkdtemp(prefix="terrasync-tests-")
+os.environ.setdefault("JOB_QUEUE_DB_PATH", os.path.join(_test_data_dir, "jobs.db"))
+os.environ.setdefault("IMPACT_DB_PATH", os.path.join(_test_data_dir, "impact.db"))
+
 import pytest
 from fastapi.testclient import TestClient
 from app.main import app
 
 
+@pytest.fixture(autouse=True)
+def fresh_rate_limits(monkeypatch):
+    """Give each test its own rate limit counts, so the shared per-route quota is not used up by earlier tests."""
+    from app.middleware.rate_limit import rate_limiter
+    from app.middleware.rate_limit_backends import MemoryBackend
+    monkeypatch.setattr(rate_limiter, "backend", MemoryBackend())
+
+
 @pytest.fixture
 def client():
     """Create a test client for the FastAPI app."""
@@ -14,3 +30,45 @@ def mock_image_base64():
     """Return a minimal valid base64 encoded image for testing."""
     # This is a 1x1 transparent PNG
     return "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNk+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg=="
+
+
+@pytest.fixture
+def mock_vision(monkeypatch):
+    """Replace the upstream vision call with a stub and record each call."""
+    from app.routers import vision
+    from app.services.result_cache import vision_cache
+    from app.services.image_hash import near_duplicate_index
+    from app.services.vision_service import _get_mock_analysis
+
+    calls = []
+
+    async def fake_analyze_item_image(image_base64, content_type):
+        calls.append(content_type)
+        return _get_mock_analysis()
+
+    monkeypatch.setattr(vision, "analyze_item_image", fake_analyze_item_image)
+    vision_cache.clear()
+    near_duplicate_index.clear()
+    yield calls
+    vision_cache.clear()
+    near_duplicate_index.clear()
+
+
+@pytest.fixture
+def make_image_bytes():
+    """Build a gradient test photo with Pillow in the requested size and format."""
+    from io import BytesIO
+    from PIL import Image
+
+    def _make(size=(256, 192), fmt="PNG", seed=0):
+        image = Image.new("RGB", size)
+        width, height = size
+        image.putdata([
+            ((x * 255 // width + seed) % 256, (y * 255 // height) % 256, ((x + y) * seed) % 256)
+            for y in range(height) for x in range(width)
+        ])
+        buffer = BytesIO()
+        image.save(buffer, format=fmt)
+        return buffer.getvalue()
+
+    return _make
@@ -0,0 +1,88 @@
+"""Local stand-in for OpenRouter chat completions, served through httpx.MockTransport."""
+import json
+from typing import Optional
+
+import httpx
+
+GOOD_ANALYSIS = {
+    "category": "electronics",
+    "subcategory": "laptop_computer",
+    "description": "A used laptop in working condition with light wear.",
+    "condition": "good",
+    "circular_value": {"monetary_value": 150.0, "eco_credits": 45, "carbon_savings_kg": 12.5, "confidence_score": 0.85},
+    "recommended_paths": ["refurbish", "donate", "recycle"],
+    "environmental_impact": {"co2_saved_kg": 12.5, "waste_diverted_kg": 2.8, "water_saved_liters": 1500, "energy_saved_kwh": 85},
+}
+
+
+class OpenRouterStub:
+    """
+    Replies to each request with the next scripted completion text.
+
+    Streamed replies are sent as SSE deltas of `chunk_chars` characters,
+    generated lazily so tests can see how much of a reply was actually read.
+    `trailer_chunks` extra deltas follow the text, as if the model kept going.
+    With `reject_response_format`, requests carrying one get the 404
+    OpenRouter returns when no provider supports the requested parameters.
+    `error` is an (status, message) pair every request is answered with.
+    `usage` is reported in the reply, or in a last event after the text and
+    trailer when streaming.
+    """
+
+    def __init__(
+        self,
+        completions: list[str],
+        chunk_chars: int = 16,
+        trailer_chunks: int = 0,
+        reject_response_format: bool = False,
+        usage: Optional[dict] = None,
+        error: Optional[tuple[int, str]] = None,
+    ):
+        self.completions = list(completions)
+        self.chunk_chars = chunk_chars
+        self.trailer_chunks = trailer_chunks
+        self.reject_response_format = reject_response_format
+        self.usage = usage
+        self.error = error
+        self.requests: list[dict] = []
+        self.chunks_sent: list[int] = []
+
+    def client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(transport=httpx.MockTransport(self._handle))
+
+    async def _handle(self, request: httpx.Request) -> httpx.Response:
+        payload = json.loads(await request.aread())
+        self.requests.append(payload)
+        if self.error:
+            status, message = self.error
+            return httpx.Response(status, json={"error": {"message": message}})
+        if self.reject_response_format and "response_format" in payload:
+            return httpx.Response(404, json={"error": {"message": "No endpoints found that support the requested parameters"}})
+        text = self.completions[min(len(self.requests), len(self.completions)) - 1]
+        if not payload.get("stream"):
+            reply = {"choices": [{"message": {"role": "assistant", "content": text}}]}
+            if self.usage:
+                reply["usage"] = self.usage
+            return httpx.Response(200, json=reply)
+        self.chunks_sent.append(0)
+        return httpx.Response(
+            200,
+            headers={"Content-Type": "text/event-stream"},
+            content=self._events(text, len(self.chunks_sent) - 1),
+        )
+
+    async def _events(self, text: str, index: int):
+        yield b": OPENROUTER PROCESSING\n\n"
+        pieces = [text[i:i + self.chunk_chars] for i in range(0, len(text), self.chunk_chars)]
+        pieces += [" More commentary the caller never needed."] * self.trailer_chunks
+        for piece in pieces:
+            self.chunks_sent[index] += 1
+            yield _delta(piece)
+        if self.usage:
+            yield f"data: {json.dumps({'choices': [], 'usage': self.usage})}\n\n".encode("utf-8")
+        yield b"data: [DONE]\n\n"
+
+
+def _delta(content: Optional[str]) -> bytes:
+    event = {"choices": [{"index": 0, "delta": {"content": content}}]}
+    return f"data: {json.dumps(event)}\n\n".encode("utf-8")
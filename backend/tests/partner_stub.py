@@ -0,0 +1,49 @@
+"""Local stand-in for partner NGO/recycling APIs, served in-process over ASGI."""
+import asyncio
+import httpx
+from fastapi import FastAPI, HTTPException
+
+stub_app = FastAPI()
+
+STUB_BASE_URL = "http://partners.test"
+
+
+def _match(org_id: str, name: str, score: float) -> dict:
+    return {
+        "organization_id": org_id,
+        "organization_name": name,
+        "organization_type": "ngo",
+        "match_score": score,
+        "proposed_terms": {"credit_offer": 40, "pickup_available": True, "estimated_carbon_savings": 10.0},
+        "distance_km": 3.0,
+    }
+
+
+@stub_app.post("/fast/matches")
+async def fast_partner():
+    return {"matches": [_match("fast-001", "Fast Reuse Co", 0.9)]}
+
+
+@stub_app.post("/steady/matches")
+async def steady_partner():
+    await asyncio.sleep(0.05)
+    return {"matches": [_match("steady-001", "Steady Recyclers", 0.8)]}
+
+
+@stub_app.post("/slow/matches")
+async def slow_partner():
+    await asyncio.sleep(5)
+    return {"matches": [_match("slow-001", "Slow Hub", 0.99)]}
+
+
+@stub_app.post("/broken/matches")
+async def broken_partner():
+    raise HTTPException(status_code=503, detail="partner down")
+
+
+def stub_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=stub_app))
+
+
+def stub_url(name: str) -> str:
+    return f"{STUB_BASE_URL}/{name}"
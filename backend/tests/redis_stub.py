@@ -0,0 +1,89 @@
+"""Local stand-in for a Redis server: the handful of commands the rate limiter uses."""
+import asyncio
+import time
+
+from app.middleware.rate_limit_backends import read_reply
+
+
+class RedisStub:
+    """In-memory RESP server on a random localhost port; each reply is sent after `reply_delay` seconds."""
+
+    def __init__(self, reply_delay: float = 0.0):
+        self.reply_delay = reply_delay
+        self.data: dict[bytes, int] = {}
+        self.expires: dict[bytes, float] = {}
+        self.commands: list[str] = []
+        self._server = None
+        self._connections: set[asyncio.Task] = set()
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"redis://{host}:{port}/0"
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._serve, "127.0.0.1", 0)
+
+    async def stop(self) -> None:
+        self._server.close()
+        for task in self._connections:
+            task.cancel()
+        await asyncio.gather(*self._connections, return_exceptions=True)
+        await self._server.wait_closed()
+
+    async def __aenter__(self) -> "RedisStub":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.stop()
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._connections.add(asyncio.current_task())
+        try:
+            while True:
+                command = await read_reply(reader)
+                if self.reply_delay:
+                    await asyncio.sleep(self.reply_delay)
+                writer.write(self._reply(self._run(*command)))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def _run(self, name: bytes, *args: bytes):
+        name = name.decode().upper()
+        self.commands.append(name)
+        for key in [k for k, deadline in self.expires.items() if deadline <= time.monotonic()]:
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        if name == "PING":
+            return "PONG"
+        if name == "SELECT":
+            return "OK"
+        if name in ("INCR", "DECR", "INCRBY", "DECRBY"):
+            amount = int(args[1]) if name.endswith("BY") else 1
+            self.data[args[0]] = self.data.get(args[0], 0) + (amount if name.startswith("INCR") else -amount)
+            return self.data[args[0]]
+        if name == "PEXPIRE":
+            if args[0] not in self.data:
+                return 0
+            self.expires[args[0]] = time.monotonic() + int(args[1]) / 1000
+            return 1
+        if name == "GET":
+            value = self.data.get(args[0])
+            return None if value is None else str(value).encode()
+        return Exception(f"ERR unknown command '{name}'")
+
+    @staticmethod
+    def _reply(value) -> bytes:
+        if value is None:
+            return b"$-1\r\n"
+        if isinstance(value, Exception):
+            return f"-{value}\r\n".encode()
+        if isinstance(value, int):
+            return b":%d\r\n" % value
+        if isinstance(value, str):
+            return f"+{value}\r\n".encode()
+        return b"$%d\r\n%s\r\n" % (len(value), value)
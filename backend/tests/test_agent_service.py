@@ -0,0 +1,157 @@
+"""Tests for the negotiation agent service."""
+import asyncio
+import time
+import pytest
+from app.config import settings
+from app.services import agent_service
+from app.services.partner_client import PartnerQueryResult
+from app.services.agent_service import orchestrate_trade_negotiation
+
+
+@pytest.fixture
+def agent_enabled(monkeypatch):
+    """Run the LangGraph path; the LLM client is built but never called."""
+    monkeypatch.setattr(settings, "OPENROUTER_API_KEY", "test-key")
+
+
+@pytest.mark.asyncio
+async def test_concurrent_negotiations_overlap(agent_enabled, monkeypatch):
+    """Test that slow partner I/O in one negotiation does not serialize the others."""
+    calls = []
+
+    async def slow_fetch(item_id, preferred_path=None, location=None, category=None):
+        calls.append(item_id)
+        await asyncio.sleep(0.2)
+        return PartnerQueryResult(matches=agent_service._query_mock_apis(item_id, preferred_path))
+
+    monkeypatch.setattr(agent_service, "_fetch_partner_matches", slow_fetch)
+    # Build the graph and organization registry up front, as the app lifespan does
+    agent_service.get_negotiation_graph()
+    agent_service.organization_registry.current()
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(
+        orchestrate_trade_negotiation(item_id=f"item-{i}", user_id="user-1") for i in range(10)
+    ))
+    elapsed = time.perf_counter() - start
+
+    assert len(calls) == 10
+    assert elapsed < 1.0  # Serial execution would spend at least 2s in partner I/O alone
+    assert all(len(result["negotiation_steps"]) == 6 for result in results)
+
+
+@pytest.mark.asyncio
+async def test_event_loop_stays_responsive_during_negotiation(agent_enabled, monkeypatch):
+    """Test that other coroutines keep running while a negotiation waits on I/O."""
+    async def slow_fetch(item_id, preferred_path=None, location=None, category=None):
+        await asyncio.sleep(0.2)
+        return PartnerQueryResult(matches=agent_service._query_mock_apis(item_id, preferred_path))
+
+    monkeypatch.setattr(agent_service, "_fetch_partner_matches", slow_fetch)
+
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    ticker_task = asyncio.create_task(ticker())
+    await orchestrate_trade_negotiation(item_id="item-1", user_id="user-1")
+    ticker_task.cancel()
+
+    assert ticks >= 10
+
+
+def test_negotiation_graph_is_built_once_per_model_config(agent_enabled, monkeypatch):
+    """Test that the LLM client and compiled graph are memoized."""
+    graph = agent_service.get_negotiation_graph()
+
+    assert graph is not None
+    assert agent_service.get_negotiation_graph() is graph
+
+    monkeypatch.setattr(settings, "OPENROUTER_AGENT_MODEL", "other/model")
+    assert agent_service.get_negotiation_graph() is not graph
+
+
+def test_negotiation_graph_disabled_without_api_key(monkeypatch):
+    """Test that the mock path is used when no key is configured."""
+    monkeypatch.setattr(settings, "OPENROUTER_API_KEY", "")
+    assert agent_service.get_negotiation_graph() is None
+
+
+def test_step_reducer_appends_without_copying():
+    """Test that the history reducer shares one backing list across steps."""
+    history = agent_service.StepLog()
+    for i in range(10000):
+        history = agent_service._append_steps(history, [agent_service._record_step("negotiate", f"offer {i}")])
+
+    assert len(history) == 10000
+    assert history._items is agent_service._append_steps(history, [])._items
+
+
+def test_step_log_views_are_independent():
+    """Test that re-applied writes are reused and diverging branches do not clobber each other."""
+    base = agent_service.StepLog().extend([agent_service._record_step("initialize", "start")])
+    step = agent_service._record_step("evaluate", "pick best")
+    other = agent_service._record_step("evaluate", "no match")
+
+    fresh = base.extend([step])
+    applied = base.extend([step])
+    diverged = base.extend([other])
+
+    assert [s.details for s in fresh] == ["start", "pick best"]
+    assert applied._items is fresh._items
+    assert [s.details for s in diverged] == ["start", "no match"]
+    assert [s.details for s in fresh] == ["start", "pick best"]
+
+
+@pytest.mark.asyncio
+async def test_graph_steps_serialized_in_order(agent_enabled):
+    """Test that the step log is numbered and serialized once at the end."""
+    from datetime import datetime
+
+    result = await orchestrate_trade_negotiation(item_id="item-1", user_id="user-1")
+    steps = result["negotiation_steps"]
+
+    assert [step["step"] for step in steps] == [1, 2, 3, 4, 5, 6]
+    assert [step["action"] for step in steps] == [
+        "initialize", "query_apis", "evaluate", "negotiate", "respond", "finalize"
+    ]
+    assert steps[4]["party"] == result["best_match"]["organization_name"]
+    for step in steps:
+        datetime.fromisoformat(step["timestamp"])
+
+
+@pytest.mark.asyncio
+async def test_stream_emits_steps_as_nodes_finish(agent_enabled, monkeypatch):
+    """Test that the first step arrives before slow partner I/O completes."""
+    async def slow_fetch(item_id, preferred_path=None, location=None, category=None):
+        await asyncio.sleep(0.3)
+        return PartnerQueryResult(matches=agent_service._query_mock_apis(item_id, preferred_path))
+
+    monkeypatch.setattr(agent_service, "_fetch_partner_matches", slow_fetch)
+    agent_service.get_negotiation_graph()
+    agent_service.organization_registry.current()
+
+    start = time.perf_counter()
+    events = []
+    async for kind, payload in agent_service.stream_trade_negotiation(item_id="item-1", user_id="user-1"):
+        events.append((kind, payload, time.perf_counter() - start))
+
+    kinds = [kind for kind, _, _ in events]
+    assert kinds == ["step"] * 6 + ["result"]
+    assert events[0][2] < 0.2  # initialize lands before the partner query finishes
+    steps = [payload for kind, payload, _ in events if kind == "step"]
+    assert [step["step"] for step in steps] == list(range(1, 7))
+    assert steps == events[-1][1]["negotiation_steps"]
+
+
+def test_mock_candidates_cover_every_organization_in_category_and_radius():
+    """Test that a category constraint reaches organizations beyond the nearest few."""
+    result = agent_service._get_mock_negotiation_result("trade-1", "item-1", category="organic")
+    candidates = agent_service._query_mock_apis("item-1")
+
+    assert result["best_match"]["organization_name"] == "Queens Circular Depot"
+    assert len(candidates) == len(agent_service.organization_registry.current().geo.within(40.7128, -74.0060, 50))
@@ -0,0 +1,142 @@
+"""Tests for the combined CORS / rate limit / upload size middleware."""
+import asyncio
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from app.middleware.edge import EdgeMiddleware
+from app.middleware.rate_limit import RateLimiter
+
+ORIGIN = "http://localhost:3000"
+
+
+def make_client(requests=100, allowed_origins=(ORIGIN,), allow_credentials=True):
+    app = FastAPI()
+
+    @app.get("/api/ping")
+    async def ping():
+        return {"ok": True}
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy"}
+
+    @app.get("/api/stream")
+    async def stream():
+        async def chunks():
+            for i in range(3):
+                await asyncio.sleep(0)
+                yield f"{i}\n"
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    @app.post("/api/analyze-item")
+    async def upload():
+        return {"ok": True}
+
+    app.add_middleware(
+        EdgeMiddleware,
+        limiter=RateLimiter(requests=requests, period_seconds=60),
+        allowed_origins=allowed_origins,
+        allow_credentials=allow_credentials,
+    )
+    return TestClient(app)
+
+
+def test_preflight_is_answered_for_allowed_origin():
+    """Test that a preflight from an allowed origin short-circuits with CORS headers."""
+    response = make_client().options(
+        "/api/ping",
+        headers={
+            "Origin": ORIGIN,
+            "Access-Control-Request-Method": "POST",
+            "Access-Control-Request-Headers": "content-type, x-api-key",
+        },
+    )
+    
+    assert response.status_code == 200
+    assert response.headers["access-control-allow-origin"] == ORIGIN
+    assert response.headers["access-control-allow-credentials"] == "true"
+    assert response.headers["access-control-allow-headers"] == "content-type, x-api-key"
+    assert "POST" in response.headers["access-control-allow-methods"]
+    assert response.headers["access-control-max-age"] == "86400"
+
+
+def test_preflight_from_unknown_origin_is_rejected():
+    """Test that origins outside ALLOWED_ORIGINS get no CORS grant."""
+    response = make_client().options(
+        "/api/ping",
+        headers={"Origin": "https://evil.example", "Access-Control-Request-Method": "GET"},
+    )
+    
+    assert response.status_code == 400
+    assert "access-control-allow-origin" not in response.headers
+
+
+def test_cors_headers_follow_the_origin():
+    """Test that CORS headers are added only for allowed origins."""
+    client = make_client()
+    
+    allowed = client.get("/api/ping", headers={"Origin": ORIGIN})
+    unknown = client.get("/api/ping", headers={"Origin": "https://evil.example"})
+    
+    assert allowed.headers["access-control-allow-origin"] == ORIGIN
+    assert allowed.headers["vary"] == "Origin"
+    assert "access-control-allow-origin" not in unknown.headers
+    assert unknown.json() == {"ok": True}
+
+
+def test_wildcard_origin_without_credentials():
+    """Test that "*" allows any origin when credentials are off."""
+    response = make_client(allowed_origins=("*",), allow_credentials=False).get(
+        "/api/ping", headers={"Origin": "https://anywhere.example"}
+    )
+    
+    assert response.headers["access-control-allow-origin"] == "*"
+    assert "access-control-allow-credentials" not in response.headers
+
+
+def test_rate_limit_headers_and_rejection():
+    """Test that limited requests carry quota headers and the 429 is still readable cross-origin."""
+    client = make_client(requests=2)
+    
+    first = client.get("/api/ping")
+    client.get("/api/ping")
+    rejected = client.get("/api/ping", headers={"Origin": ORIGIN})
+    
+    assert first.headers["x-ratelimit-limit"] == "2"
+    assert first.headers["x-ratelimit-remaining"] == "1"
+    assert rejected.status_code == 429
+    assert rejected.headers["retry-after"] == "60"
+    assert rejected.headers["access-control-allow-origin"] == ORIGIN
+
+
+def test_exempt_paths_are_not_limited():
+    """Test that health checks never count against the quota."""
+    client = make_client(requests=1)
+    
+    responses = [client.get("/health") for _ in range(3)]
+    
+    assert all(response.status_code == 200 for response in responses)
+    assert "x-ratelimit-limit" not in responses[0].headers
+
+
+def test_oversized_upload_rejected_before_app():
+    """Test that a Content-Length over the upload limit gets a 413."""
+    from app.config import settings
+    response = make_client().post(
+        "/api/analyze-item",
+        content=b"x",
+        headers={"Content-Length": str(settings.MAX_UPLOAD_BYTES * 2), "Origin": ORIGIN},
+    )
+    
+    assert response.status_code == 413
+    assert response.headers["access-control-allow-origin"] == ORIGIN
+
+
+def test_streaming_body_passes_through():
+    """Test that streamed responses keep their chunks and get headers added."""
+    response = make_client().get("/api/stream", headers={"Origin": ORIGIN})
+    
+    assert response.text == "0\n1\n2\n"
+    assert response.headers["access-control-allow-origin"] == ORIGIN
+    assert "x-ratelimit-remaining" in response.headers
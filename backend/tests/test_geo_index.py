@@ -0,0 +1,71 @@
+"""Tests for the organization geospatial index."""
+import random
+import pytest
+import numpy as np
+from app.services.geo_index import GeoIndex, haversine_km
+from app.services.agent_service import _query_mock_apis
+
+
+def _random_points(count, seed=0, lat_range=(-89.0, 89.0), lng_range=(-180.0, 180.0)):
+    rng = random.Random(seed)
+    return [
+        {"id": f"org-{i}", "lat": rng.uniform(*lat_range), "lng": rng.uniform(*lng_range)}
+        for i in range(count)
+    ]
+
+
+def _brute_force(points, lat, lng):
+    distances = haversine_km(lat, lng, np.array([p["lat"] for p in points]), np.array([p["lng"] for p in points]))
+    return sorted(zip(distances.tolist(), (p["id"] for p in points)))
+
+
+def test_haversine_known_distance():
+    """Test New York to London against the published great-circle distance."""
+    distance = haversine_km(40.7128, -74.0060, np.array([51.5074]), np.array([-0.1278]))[0]
+    assert distance == pytest.approx(5570, abs=10)
+
+
+@pytest.mark.parametrize("lat,lng", [(40.7, -74.0), (0.0, 179.99), (88.5, 10.0), (-33.9, 151.2)])
+def test_nearest_matches_brute_force(lat, lng):
+    """Test k-nearest against a full scan, including the antimeridian and near the pole."""
+    points = _random_points(5000, lat_range=(-89.9, 89.9))
+    index = GeoIndex(points, cell_degrees=0.5)
+
+    result = index.nearest(lat, lng, k=10)
+    expected = _brute_force(points, lat, lng)[:10]
+
+    assert [record["id"] for _, record in result] == [org_id for _, org_id in expected]
+    assert [d for d, _ in result] == pytest.approx([d for d, _ in expected])
+
+
+def test_within_matches_brute_force():
+    """Test radius queries against a full scan on a dense regional cluster."""
+    points = _random_points(20000, seed=1, lat_range=(40.0, 41.5), lng_range=(-74.5, -73.0))
+    index = GeoIndex(points, cell_degrees=0.05)
+
+    result = index.within(40.7128, -74.0060, 12.5)
+    expected = [org_id for d, org_id in _brute_force(points, 40.7128, -74.0060) if d <= 12.5]
+
+    assert [record["id"] for _, record in result] == expected
+
+
+def test_nearest_respects_max_km():
+    """Test that k-nearest never returns points beyond max_km."""
+    points = [{"id": "near", "lat": 40.72, "lng": -74.0}, {"id": "far", "lat": 42.36, "lng": -71.06}]
+    index = GeoIndex(points)
+
+    assert [record["id"] for _, record in index.nearest(40.7128, -74.0060, k=5, max_km=50)] == ["near"]
+    assert [record["id"] for _, record in index.nearest(40.7128, -74.0060, k=5)] == ["near", "far"]
+    assert GeoIndex([]).nearest(0, 0, k=3) == []
+
+
+def test_mock_matches_use_request_location():
+    """Test that match distances are computed from where the item is."""
+    manhattan = _query_mock_apis("item-1", location={"lat": 40.7128, "lng": -74.0060})
+    bronx = _query_mock_apis("item-1", location={"lat": 40.8370, "lng": -73.8654})
+
+    assert [m["distance_km"] for m in manhattan] == sorted(m["distance_km"] for m in manhattan)
+    assert all(m["distance_km"] <= 50 for m in manhattan)
+    assert bronx[0]["organization_id"] == "ngo-004"
+    assert bronx[0]["distance_km"] == 0.0
+    assert _query_mock_apis("item-1", location={"lat": -45.0, "lng": 170.0}) == []
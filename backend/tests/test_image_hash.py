@@ -0,0 +1,80 @@
+"""Tests for perceptual hashing and the near-duplicate index."""
+from io import BytesIO
+from PIL import Image, ImageDraw
+from app.services.image_hash import (
+    BKTree,
+    NearDuplicateIndex,
+    colour_distance,
+    colour_signature,
+    dhash,
+    hamming_distance,
+)
+
+
+def _open(data):
+    return Image.open(BytesIO(data))
+
+
+def _shape(fill):
+    image = Image.new("RGB", (200, 100), (255, 255, 255))
+    ImageDraw.Draw(image).ellipse((50, 20, 150, 80), fill=fill)
+    return image
+
+
+def test_dhash_is_stable_across_resize_and_reencode(make_image_bytes):
+    """Test that visually identical images hash close together."""
+    original = _open(make_image_bytes(size=(256, 192), fmt="PNG"))
+    resized = _open(make_image_bytes(size=(100, 75), fmt="JPEG"))
+    different = _open(make_image_bytes(size=(256, 192), fmt="PNG", seed=97))
+
+    assert hamming_distance(dhash(original), dhash(resized)) <= 3
+    assert colour_distance(colour_signature(original), colour_signature(resized)) <= 24
+    assert hamming_distance(dhash(original), dhash(different)) > 6
+
+
+def test_colour_signature_separates_same_shape_in_different_colours():
+    """Test that objects dhash cannot tell apart are told apart by colour."""
+    red, green = _shape((200, 30, 30)), _shape((30, 160, 60))
+
+    assert hamming_distance(dhash(red), dhash(green)) <= 3
+    assert colour_distance(colour_signature(red), colour_signature(green)) > 24
+
+
+def test_bk_tree_radius_search_matches_brute_force():
+    """Test BK-tree results against a linear scan."""
+    hashes = [(i * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF for i in range(500)]
+    tree = BKTree()
+    for h in hashes:
+        tree.add(h, h)
+
+    query = hashes[42] ^ 0b1011
+    expected = sorted(h for h in hashes if hamming_distance(query, h) <= 20)
+    found = sorted(value for _, value in tree.search(query, 20))
+
+    assert found == expected
+    assert tree.search(query, 3)[0] == (3, hashes[42])
+
+
+def test_index_filters_by_namespace_and_stays_bounded():
+    """Test that lookups ignore other model/prompt namespaces and old entries are dropped."""
+    grey = bytes([128] * 12)
+    index = NearDuplicateIndex(max_entries=4)
+    index.add(0b1111, grey, "model-a", {"category": "electronics"})
+
+    assert index.find(0b1110, grey, "model-a", 2, 24) == (1, {"category": "electronics"})
+    assert index.find(0b1110, grey, "model-b", 2, 24) is None
+
+    for i in range(1, 6):
+        index.add(i << 32, grey, "model-a", {"n": i})
+    assert index.get_stats()["entries"] <= 4
+    assert index.find(0b1111, grey, "model-a", 0, 24) is None
+
+
+def test_index_skips_matches_in_a_different_colour():
+    """Test that a hash match whose colours differ is not reused."""
+    index = NearDuplicateIndex()
+    index.add(0b1111, bytes([200, 30, 30] * 4), "model-a", {"category": "electronics"})
+
+    assert index.find(0b1111, bytes([30, 160, 60] * 4), "model-a", 3, 24) is None
+    assert index.find(0b1111, bytes([210, 25, 35] * 4), "model-a", 3, 24) == (0, {"category": "electronics"})
+    assert index.get_stats()["colour_rejects"] == 1
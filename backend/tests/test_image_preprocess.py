@@ -0,0 +1,61 @@
+"""Tests for the image preprocessing pipeline."""
+from io import BytesIO
+from PIL import Image
+from app.services.image_preprocess import prepare_image
+
+
+def _photo_with_exif(size):
+    image = Image.new("RGB", size, (120, 80, 40))
+    exif = Image.Exif()
+    exif[0x0110] = "TestCam 9000"  # Model
+    exif[0x0112] = 6  # Orientation: rotate 90 degrees clockwise
+    buffer = BytesIO()
+    image.save(buffer, format="JPEG", quality=95, exif=exif)
+    return buffer.getvalue()
+
+
+def test_prepare_image_caps_longest_edge_and_strips_exif(monkeypatch):
+    """Test downscaling, orientation handling and metadata removal."""
+    monkeypatch.setattr("app.config.settings.IMAGE_MAX_EDGE_PX", 512)
+    data = _photo_with_exif((2000, 1000))
+
+    prepared = prepare_image(data, "image/jpeg")
+
+    assert prepared.content_type == "image/webp"
+    assert prepared.original_bytes == len(data)
+    with Image.open(BytesIO(prepared.data)) as image:
+        assert image.size == (256, 512)  # Rotated by EXIF, then capped
+        assert not image.getexif()
+
+
+def test_prepare_image_reports_perceptual_hash(make_image_bytes):
+    """Test that the hash is computed from the same decode when requested."""
+    prepared = prepare_image(make_image_bytes(), "image/png", compute_hash=True)
+    assert isinstance(prepared.perceptual_hash, int)
+    assert len(prepared.colour_signature) == 12
+
+
+def test_prepare_image_passes_through_undecodable_uploads():
+    """Test that bytes Pillow cannot read are sent unchanged."""
+    prepared = prepare_image(b"\x89PNG\r\n\x1a\ngarbage", "image/png", compute_hash=True)
+
+    assert prepared.data is None
+    assert prepared.sent_bytes == prepared.original_bytes
+    assert prepared.content_type == "image/png"
+    assert prepared.perceptual_hash is None
+
+
+def test_prepare_image_keeps_original_when_reencoding_would_grow_it():
+    """Test that an upload needing no resize or EXIF removal is not replaced by a larger copy."""
+    import os
+
+    buffer = BytesIO()
+    Image.frombytes("RGB", (200, 150), os.urandom(200 * 150 * 3)).save(buffer, format="JPEG", quality=40)
+    data = buffer.getvalue()
+
+    prepared = prepare_image(data, "image/jpeg", compute_hash=True)
+
+    assert prepared.data is None
+    assert prepared.sent_bytes == len(data)
+    assert prepared.content_type == "image/jpeg"
+    assert isinstance(prepared.perceptual_hash, int)
@@ -23,6 +23,7 @@ def test_get_impact_stats(client):
 
 def test_get_impact_stats_returns_activities(client):
     """Test that impact stats returns recent activities."""
+    client.post("/api/orchestrate-trade", json={"item_id": "item-activity", "user_id": "user-activity"})
     response = client.get("/api/impact-stats")
     
     data = response.json()
@@ -72,3 +73,34 @@ def test_root_endpoint(client):
     assert "message" in data
     assert "docs" in data
     assert "endpoints" in data
+
+
+def test_impact_stats_conditional_requests(client):
+    """Test ETag/Last-Modified validators and empty 304 responses."""
+    response = client.get("/api/impact-stats")
+    etag = response.headers["etag"]
+    
+    assert response.headers["cache-control"].startswith("public, max-age=")
+    assert "last-modified" in response.headers
+    
+    not_modified = client.get("/api/impact-stats", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert not_modified.headers["etag"] == etag
+    
+    since = client.get("/api/impact-stats", headers={"If-Modified-Since": response.headers["last-modified"]})
+    assert since.status_code == 304
+    
+    assert client.get("/api/impact-stats", headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_impact_stats_etag_changes_after_new_activity(client):
+    """Test that a completed trade invalidates the snapshot for the next poll."""
+    etag = client.get("/api/impact-stats").headers["etag"]
+    client.post("/api/orchestrate-trade", json={"item_id": "item-etag", "user_id": "user-etag"})
+    
+    response = client.get("/api/impact-stats", headers={"If-None-Match": etag})
+    
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.json()["recent_activities"][0]["type"] == "trade"
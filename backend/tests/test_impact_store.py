@@ -0,0 +1,112 @@
+"""Tests for the impact event store and its rollups."""
+import time
+import pytest
+from app.services.impact_store import ImpactEvent, ImpactStore, analysis_event, record_impact, trade_event
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ImpactStore(str(tmp_path / "impact.db"))
+    yield store
+    store.close()
+
+
+def _analysis(co2=10.0, waste=2.0, credits=40):
+    return analysis_event({
+        "category": "electronics",
+        "subcategory": "laptop_computer",
+        "recommended_paths": ["refurbish"],
+        "circular_value": {"eco_credits": credits},
+        "environmental_impact": {"co2_saved_kg": co2, "waste_diverted_kg": waste},
+    })
+
+
+def _trade(user_id, matched=True, credits=30):
+    best_match = {"organization_name": "Tech for All"} if matched else None
+    return trade_event({"best_match": best_match, "eco_credits_earned": credits}, user_id, {"lat": 40.7, "lng": -74.0})
+
+
+@pytest.mark.asyncio
+async def test_rollups_are_updated_incrementally(store):
+    """Test totals after a mix of analyses and trades."""
+    await store.record(_analysis(co2=10.0, waste=2.0))
+    await store.record(_analysis(co2=5.5, waste=1.0))
+    await store.record(_trade("user-1", credits=30))
+    await store.record(_trade("user-1", matched=False))
+    await store.record(_trade("user-2", credits=20))
+
+    totals = (await store.get_dashboard())["totals"]
+
+    assert totals["analyses"] == 2
+    assert totals["trades"] == 3
+    assert totals["trades_matched"] == 2
+    assert totals["co2_kg"] == pytest.approx(15.5)
+    assert totals["waste_kg"] == pytest.approx(3.0)
+    assert totals["eco_credits"] == 50
+    assert totals["active_users"] == 2
+
+
+@pytest.mark.asyncio
+async def test_daily_and_weekly_buckets(store):
+    """Test that events land in their UTC day and ISO week, and empty days are zero-filled."""
+    now = time.time()
+    await store.record(_analysis())
+    await store.record(ImpactEvent(type="analysis", description="old", impact=1, created_at=now - 2 * 86400))
+    await store.record(ImpactEvent(type="analysis", description="too old", impact=1, created_at=now - 30 * 86400))
+
+    dashboard = await store.get_dashboard(days=7, weeks=8)
+
+    assert [bucket["analyses"] for bucket in dashboard["daily"]] == [0, 0, 0, 0, 1, 0, 1]
+    assert len(dashboard["weekly"]) == 8
+    assert sum(bucket["analyses"] for bucket in dashboard["weekly"]) == 3
+    assert dashboard["totals"]["analyses"] == 3
+
+
+@pytest.mark.asyncio
+async def test_recent_activities_newest_first(store):
+    """Test the activity feed."""
+    first = await store.record(_analysis())
+    second = await store.record(_trade("user-1"))
+
+    recent = (await store.get_dashboard(recent=5))["recent"]
+
+    assert [activity["id"] for activity in recent] == [second.id, first.id]
+    assert recent[0]["description"] == "Item matched with Tech for All"
+    assert recent[0]["location"] == "40.7000, -74.0000"
+    assert recent[1]["description"] == "Laptop computer analyzed for refurbish"
+
+
+def test_impact_stats_reflect_recorded_trades(client):
+    """Test that a completed trade moves the dashboard numbers."""
+    before = client.get("/api/impact-stats").json()
+    client.post("/api/orchestrate-trade", json={"item_id": "item-impact", "user_id": "user-impact-new"})
+    after = client.get("/api/impact-stats").json()
+
+    assert after["stats"]["active_users"] == before["stats"]["active_users"] + 1
+    assert after["recent_activities"][0]["type"] == "trade"
+    assert sum(day["value"] for day in after["weekly_data"]) == sum(day["value"] for day in before["weekly_data"]) + 1
+
+
+def test_events_tolerate_malformed_model_and_client_output():
+    """Test that null or non-numeric fields count as zero and unusable locations are dropped."""
+    analysis = analysis_event({
+        "category": "electronics",
+        "circular_value": {"eco_credits": None},
+        "environmental_impact": {"co2_saved_kg": None, "waste_diverted_kg": "about 3 kg"},
+    })
+    loose = trade_event({"best_match": {"organization_name": "x"}, "eco_credits_earned": "30"}, "u", {"lat": "40.7", "lng": "-74.0"})
+    missing = trade_event({"best_match": None}, "u", {"lat": None, "lng": None})
+
+    assert (analysis.impact, analysis.co2_kg, analysis.waste_kg) == (0, 0.0, 0.0)
+    assert loose.location == "40.7000, -74.0000"
+    assert loose.eco_credits == 30
+    assert missing.location is None
+
+
+@pytest.mark.asyncio
+async def test_record_impact_guards_event_building():
+    """Test that an event that cannot be built is logged, not raised into the request."""
+    def broken(result):
+        raise KeyError("organization_name")
+
+    await record_impact(broken, {})
@@ -0,0 +1,81 @@
+"""Tests for the live impact event stream."""
+import asyncio
+import json
+import pytest
+from app.routers import impact
+from app.services.event_bus import EventBus, impact_events
+from app.services.impact_store import ImpactEvent, impact_store
+
+
+@pytest.mark.asyncio
+async def test_publish_fans_out_to_every_subscriber():
+    """Test one encoded message reaching thousands of subscribers."""
+    bus = EventBus(max_subscribers=5000, max_buffered=4)
+    subscriptions = [bus.subscribe() for _ in range(5000)]
+
+    assert bus.publish(b"data: 1\n\n") == 5000
+    assert all([await s.get(timeout=0.1) for s in subscriptions])
+    assert bus.subscribe() is None
+    assert bus.get_stats()["rejected_subscribers"] == 1
+
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_is_dropped_without_affecting_others():
+    """Test that a full buffer ends that subscriber's stream instead of blocking publish."""
+    bus = EventBus(max_buffered=2)
+    slow, fast = bus.subscribe(), bus.subscribe()
+
+    for i in range(3):
+        bus.publish(f"data: {i}\n\n".encode())
+        await fast.get(timeout=0.1)
+
+    assert slow.dropped
+    assert await slow.get(timeout=0.1) is None
+    assert bus.get_stats()["subscribers"] == 1
+    assert bus.publish(b"data: 3\n\n") == 1
+
+
+@pytest.mark.asyncio
+async def test_stream_sends_heartbeats_and_messages():
+    """Test the SSE generator: retry hint, heartbeat on idle, messages, cleanup on exit."""
+    bus = EventBus()
+    subscription = bus.subscribe()
+    stream = impact._impact_stream(subscription, heartbeat_seconds=0.01)
+
+    assert (await stream.__anext__()).startswith(b"retry: ")
+    assert await stream.__anext__() == b": heartbeat\n\n"
+    bus.publish(b"event: activity\ndata: {}\n\n")
+    assert await stream.__anext__() == b"event: activity\ndata: {}\n\n"
+
+    await stream.aclose()
+    assert bus.get_stats()["subscribers"] == 0
+
+
+@pytest.mark.asyncio
+async def test_recorded_events_are_published_as_activity():
+    """Test that completed work reaches live subscribers with its stat deltas."""
+    subscription = impact_events.subscribe()
+    try:
+        await impact_store.record(ImpactEvent(
+            type="analysis", description="Sofa analyzed for reuse", impact=12, co2_kg=4.5, waste_kg=30.0
+        ))
+        message = (await subscription.get(timeout=1)).decode()
+    finally:
+        subscription.close()
+
+    lines = dict(line.split(": ", 1) for line in message.strip().split("\n"))
+    data = json.loads(lines["data"])
+    assert lines["event"] == "activity"
+    assert data["activity"]["id"] == lines["id"]
+    assert data["activity"]["description"] == "Sofa analyzed for reuse"
+    assert data["stats_delta"]["items_processed"] == 1
+    assert data["stats_delta"]["waste_diverted_kg"] == 30.0
+
+
+def test_stream_rejects_when_at_capacity(client, monkeypatch):
+    """Test the per-worker subscriber cap."""
+    monkeypatch.setattr(impact_events, "max_subscribers", 0)
+
+    response = client.get("/api/impact-stream")
+
+    assert response.status_code == 503
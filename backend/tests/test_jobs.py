@@ -0,0 +1,219 @@
+"""Tests for asynchronous analysis jobs."""
+import asyncio
+import sqlite3
+import time
+from io import BytesIO
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from app.config import settings
+from app.main import app
+from app.services import http_client
+from app.services.job_queue import JobQueue
+
+
+def _wait_for_job(client, job_id, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = client.get(f"/api/jobs/{job_id}").json()
+        if job["status"] in ("succeeded", "failed"):
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+
+def test_async_analysis_returns_job_id_and_completes(mock_vision, make_image_bytes):
+    """Test submit/poll for an async analysis."""
+    with TestClient(app) as client:
+        response = client.post(
+            "/api/analyze-item?async=true",
+            files={"file": ("photo.png", BytesIO(make_image_bytes()), "image/png")}
+        )
+
+        assert response.status_code == 202
+        data = response.json()
+        assert data["status"] == "queued"
+        assert response.headers["Location"] == data["status_url"]
+
+        job = _wait_for_job(client, data["job_id"])
+        assert job["status"] == "succeeded"
+        assert job["result"]["analysis"]["category"] == "electronics"
+        assert job["started_at"] >= job["created_at"]
+
+        metrics = client.get("/api/metrics").json()["job_queue"]
+        assert metrics["succeeded"] >= 1
+        assert metrics["service_time_seconds"]["count"] >= 1
+
+
+def test_async_analysis_rejects_invalid_upload_before_queueing(client):
+    """Test that uploads are validated at submit time."""
+    response = client.post(
+        "/api/analyze-item?async=true",
+        files={"file": ("notes.txt", BytesIO(b"not an image"), "text/plain")}
+    )
+    assert response.status_code == 400
+
+
+def test_async_analysis_posts_webhook_on_completion(mock_vision, make_image_bytes, monkeypatch):
+    """Test that a completion webhook carries the job result."""
+    monkeypatch.setattr(settings, "JOB_WEBHOOK_ALLOWED_HOSTS", ["hooks.example.com"])
+    delivered = []
+
+    def webhook_handler(request):
+        delivered.append(request)
+        return httpx.Response(200)
+
+    with TestClient(app) as client:
+        http_client._client = httpx.AsyncClient(transport=httpx.MockTransport(webhook_handler))
+        response = client.post(
+            "/api/analyze-item?async=true&webhook_url=https://hooks.example.com/done",
+            files={"file": ("photo.png", BytesIO(make_image_bytes()), "image/png")}
+        )
+        job_id = response.json()["job_id"]
+        _wait_for_job(client, job_id)
+
+        deadline = time.time() + 5
+        while not delivered and time.time() < deadline:
+            time.sleep(0.02)
+
+    assert len(delivered) == 1
+    assert str(delivered[0].url) == "https://hooks.example.com/done"
+    assert b'"status":"succeeded"' in delivered[0].content.replace(b" ", b"")
+
+
+@pytest.mark.parametrize("webhook_url", [
+    "http://169.254.169.254/latest/meta-data/",
+    "http://127.0.0.1:8000/internal",
+    "http://10.0.0.5/hook",
+    "http://[::ffff:192.168.1.1]/hook",
+    "ftp://example.com/hook",
+])
+def test_async_analysis_rejects_internal_webhooks(client, make_image_bytes, webhook_url):
+    """Test that webhooks cannot target loopback, private or link-local addresses."""
+    response = client.post(
+        f"/api/analyze-item?async=true&webhook_url={webhook_url}",
+        files={"file": ("photo.png", BytesIO(make_image_bytes()), "image/png")}
+    )
+    assert response.status_code == 400
+
+
+def test_webhook_allowlist_rejects_other_hosts(client, make_image_bytes, monkeypatch):
+    """Test that with an allowlist only the listed hosts are accepted."""
+    monkeypatch.setattr(settings, "JOB_WEBHOOK_ALLOWED_HOSTS", ["hooks.example.com"])
+    response = client.post(
+        "/api/analyze-item?async=true&webhook_url=https://other.example.com/done",
+        files={"file": ("photo.png", BytesIO(make_image_bytes()), "image/png")}
+    )
+    assert response.status_code == 400
+
+
+def test_get_unknown_job_returns_404(client):
+    """Test polling a job id that does not exist."""
+    assert client.get("/api/jobs/job-missing").status_code == 404
+
+
+def _queue(tmp_path, lease_seconds=60.0):
+    queue = JobQueue(str(tmp_path / "jobs.db"), workers=1, lease_seconds=lease_seconds)
+    queue.register_handler("echo", _echo)
+    return queue
+
+
+async def _echo(payload, meta):
+    return {"echo": payload.decode()}
+
+
+@pytest.mark.asyncio
+async def test_starting_process_leaves_other_workers_jobs_alone(tmp_path):
+    """Test that a second process sharing the queue file does not re-run a job with a live lease."""
+    first, second = _queue(tmp_path), _queue(tmp_path)
+    job_id = await first.submit("echo", b"hi")
+    assert first._claim()["id"] == job_id
+
+    assert second._recover() == 0
+    assert second._claim() is None
+    assert (await second.get(job_id))["status"] == "running"
+
+
+@pytest.mark.asyncio
+async def test_expired_lease_is_taken_over_and_late_result_discarded(tmp_path):
+    """Test that a job whose worker stopped renewing is claimed again and the old worker cannot finish it."""
+    first, second = _queue(tmp_path, lease_seconds=0.05), _queue(tmp_path)
+    job_id = await first.submit("echo", b"hi")
+    first._claim()
+    time.sleep(0.1)
+
+    assert second._claim()["id"] == job_id
+    assert first._finish(job_id, "succeeded", {"late": True}, None, 200, time.time()) is False
+    assert second._finish(job_id, "succeeded", {"echo": "hi"}, None, 200, time.time()) is True
+    assert (await second.get(job_id))["result"] == {"echo": "hi"}
+
+
+@pytest.mark.asyncio
+async def test_clean_stop_hands_running_jobs_back(tmp_path):
+    """Test that jobs interrupted by a clean shutdown are queued again straight away."""
+    started = asyncio.Event()
+
+    async def blocking(payload, meta):
+        started.set()
+        await asyncio.sleep(30)
+
+    queue = _queue(tmp_path)
+    queue.register_handler("block", blocking)
+    await queue.start()
+    job_id = await queue.submit("block", b"")
+    await asyncio.wait_for(started.wait(), 5)
+    await queue.stop()
+
+    assert (await _queue(tmp_path).get(job_id))["status"] == "queued"
+    assert (await _queue(tmp_path).get_stats())["depth"] == 1
+
+
+@pytest.mark.asyncio
+async def test_worker_survives_a_queue_error(tmp_path, monkeypatch):
+    """Test that a failed claim is logged and retried instead of killing the worker."""
+    monkeypatch.setattr(settings, "JOB_QUEUE_POLL_SECONDS", 0.01)
+    queue = _queue(tmp_path)
+    claim = queue._claim
+    calls = []
+
+    def flaky_claim():
+        calls.append(1)
+        if len(calls) == 1:
+            raise sqlite3.OperationalError("database is locked")
+        return claim()
+
+    monkeypatch.setattr(queue, "_claim", flaky_claim)
+    job_ids = [await queue.submit("echo", str(i).encode()) for i in range(3)]
+    await queue.start()
+    try:
+        deadline = time.time() + 5
+        while (await queue.get_stats())["succeeded"] < 3 and time.time() < deadline:
+            await asyncio.sleep(0.01)
+    finally:
+        await queue.stop()
+
+    assert queue.stats["worker_errors"] == 1
+    assert [(await queue.get(job_id))["status"] for job_id in job_ids] == ["succeeded"] * 3
+
+
+@pytest.mark.asyncio
+async def test_webhook_is_sent_to_the_checked_address(tmp_path, monkeypatch):
+    """Test that delivery connects to the vetted IP instead of resolving the host again."""
+    delivered = []
+
+    def webhook_handler(request):
+        delivered.append(request)
+        return httpx.Response(200)
+
+    async def resolved(url):
+        return "93.184.216.34"
+
+    monkeypatch.setattr("app.services.job_queue.check_webhook_url", resolved)
+    monkeypatch.setattr(http_client, "_client", httpx.AsyncClient(transport=httpx.MockTransport(webhook_handler)))
+    queue = _queue(tmp_path)
+    await queue._send_webhook("https://hooks.example.com/done", {"status": "succeeded"})
+
+    assert str(delivered[0].url) == "https://93.184.216.34/done"
+    assert delivered[0].headers["Host"] == "hooks.example.com"
+    assert delivered[0].extensions["sni_hostname"] == "hooks.example.com"
+    assert queue.stats["webhooks_sent"] == 1
@@ -0,0 +1,99 @@
+"""Tests for the incremental JSON object parser."""
+import json
+import pytest
+from app.services.json_stream import OffSchema, StreamingObjectParser
+
+ANALYSIS = {
+    "category": "electronics",
+    "subcategory": "laptop_computer",
+    "circular_value": {"monetary_value": 150.0, "eco_credits": 45, "note": "brace } and quote \" inside"},
+    "recommended_paths": ["refurbish", "donate"],
+    "confidence": 0.85,
+    "working": True,
+}
+
+
+def feed_in_chunks(parser, text, size=3):
+    for start in range(0, len(text), size):
+        if parser.feed(text[start:start + size]):
+            return start + size
+    return None
+
+
+def test_parses_object_split_into_small_chunks():
+    """Test that the object is recovered exactly however the text is chunked."""
+    parser = StreamingObjectParser(required=ANALYSIS)
+    
+    consumed = feed_in_chunks(parser, json.dumps(ANALYSIS, indent=2))
+    
+    assert parser.complete
+    assert consumed is not None
+    assert parser.fields == ANALYSIS
+
+
+def test_uneven_and_empty_chunks_keep_text_and_fields():
+    """Test that keys and values spanning several chunks, with empty chunks between, are recovered."""
+    text = "```json\n" + json.dumps(ANALYSIS)
+    parser = StreamingObjectParser(required=ANALYSIS)
+    
+    start = 0
+    for size in [1, 0, 7, 2, 0, 13] * len(text):
+        if start >= len(text) or parser.feed(text[start:start + size]):
+            break
+        start += size
+    
+    assert parser.fields == ANALYSIS
+    assert parser.text == text[:start + size]
+
+
+def test_skips_code_fence_and_stops_at_closing_brace():
+    """Test that a markdown fence is skipped and trailing text is never needed."""
+    text = "```json\n" + json.dumps(ANALYSIS) + "\n```\nLet me know if you need anything else!" * 20
+    parser = StreamingObjectParser(required=("category",))
+    
+    consumed = feed_in_chunks(parser, text, size=8)
+    
+    assert parser.fields["category"] == "electronics"
+    assert consumed < len("```json\n" + json.dumps(ANALYSIS)) + 8
+
+
+def test_rejects_bad_field_before_the_object_ends():
+    """Test that a failed field check raises as soon as that value is complete."""
+    parser = StreamingObjectParser(checks={"category": lambda value: value in {"electronics", "other"}})
+    
+    parser.feed('{"category": "spaceship"')
+    with pytest.raises(OffSchema, match="category"):
+        parser.feed(', "subcategory": "rocket"')
+
+
+def test_rejects_malformed_nested_value():
+    """Test that a nested value that is not valid JSON is reported with its key."""
+    parser = StreamingObjectParser()
+    
+    with pytest.raises(OffSchema, match="circular_value"):
+        parser.feed('{"circular_value": {"monetary_value": $150}, "category": "other"}')
+
+
+def test_missing_required_field_fails_at_the_end():
+    """Test that required fields are enforced when the object closes."""
+    parser = StreamingObjectParser(required=("category", "circular_value"))
+    
+    with pytest.raises(OffSchema, match="circular_value"):
+        parser.feed('{"category": "other"}')
+
+
+def test_gives_up_on_long_preamble():
+    """Test that output with no object in sight is abandoned early."""
+    parser = StreamingObjectParser(max_preamble_chars=50)
+    
+    with pytest.raises(OffSchema, match="no JSON object"):
+        parser.feed("I'm sorry, but I can't determine what is in this image. " * 3)
+
+
+def test_incomplete_object_is_not_complete():
+    """Test that a truncated stream leaves the parser incomplete."""
+    parser = StreamingObjectParser()
+    
+    assert parser.feed('{"category": "other", "description": "A broken ch') is False
+    assert not parser.complete
+    assert parser.fields == {"category": "other"}
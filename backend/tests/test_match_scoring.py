@@ -0,0 +1,89 @@
+"""Tests for vectorized match scoring."""
+import random
+import numpy as np
+import pytest
+from app.config import settings
+from app.services.match_scoring import CandidateColumns, rank_matches, score_columns, top_k
+from app.services.agent_service import orchestrate_trade_negotiation
+
+
+def _candidate(org_id, distance_km=5.0, pickup=True, credit=40, capacity=100, acceptance=0.8, categories=None):
+    return {
+        "organization_id": org_id,
+        "organization_name": org_id,
+        "organization_type": "ngo",
+        "proposed_terms": {"credit_offer": credit, "pickup_available": pickup, "estimated_carbon_savings": 10.0},
+        "distance_km": distance_km,
+        "categories": categories or ["electronics"],
+        "accepted_paths": ["reuse"],
+        "capacity": capacity,
+        "acceptance_rate": acceptance,
+    }
+
+
+def test_top_k_matches_full_sort():
+    """Test argpartition selection against a full descending sort."""
+    scores = np.random.default_rng(0).random(10000)
+
+    assert top_k(scores, 25).tolist() == np.argsort(-scores)[:25].tolist()
+    assert top_k(scores[:3], 10).tolist() == np.argsort(-scores[:3]).tolist()
+    assert top_k(scores, 0).size == 0
+
+
+def test_rank_matches_prefers_better_candidates():
+    """Test that each feature moves the score in the expected direction."""
+    ranked = rank_matches([
+        _candidate("far", distance_km=45.0),
+        _candidate("near", distance_km=1.0),
+        _candidate("no-pickup", distance_km=1.0, pickup=False),
+        _candidate("wrong-category", distance_km=1.0, categories=["furniture"]),
+    ], k=4, category="electronics")
+
+    assert [m["organization_id"] for m in ranked] == ["near", "no-pickup", "far", "wrong-category"]
+    assert all(0.0 <= m["match_score"] <= 1.0 for m in ranked)
+
+
+def test_rank_matches_uses_configured_weights(monkeypatch):
+    """Test that weights come from settings and can flip the ranking."""
+    candidates = [_candidate("generous", distance_km=30.0, credit=100), _candidate("close", distance_km=1.0, credit=20)]
+
+    assert rank_matches(candidates, k=1)[0]["organization_id"] == "close"
+
+    monkeypatch.setattr(settings, "MATCH_WEIGHT_DISTANCE", 0.0)
+    assert rank_matches(candidates, k=1)[0]["organization_id"] == "generous"
+
+
+def test_unreported_fields_score_neutral():
+    """Test that partner matches without capacity or history are neither rewarded nor penalized."""
+    bare = {"organization_id": "bare", "proposed_terms": {}, "distance_km": None}
+    columns = CandidateColumns.from_matches([bare])
+
+    assert score_columns(columns).tolist() == pytest.approx([0.5])
+
+
+def test_rank_matches_large_candidate_set():
+    """Test that only the top k of a large candidate set are returned, best first."""
+    rng = random.Random(0)
+    candidates = [
+        _candidate(f"org-{i}", distance_km=rng.uniform(0, 50), credit=rng.randint(10, 100), acceptance=rng.random())
+        for i in range(5000)
+    ]
+
+    ranked = rank_matches(candidates, k=10)
+
+    assert len(ranked) == 10
+    assert [m["match_score"] for m in ranked] == sorted((m["match_score"] for m in ranked), reverse=True)
+
+
+@pytest.mark.asyncio
+async def test_trade_category_constraint_changes_best_match(monkeypatch):
+    """Test that the item category passed in constraints drives the chosen organization."""
+    monkeypatch.setattr(settings, "OPENROUTER_API_KEY", "test-key")
+
+    result = await orchestrate_trade_negotiation(
+        item_id="item-1", user_id="user-1", preferred_path="recycle", constraints={"category": "industrial_scrap"}
+    )
+
+    assert "industrial_scrap" in result["best_match"]["categories"]
+    assert "recycle" in result["best_match"]["accepted_paths"]
+    assert len(result["matches"]) <= settings.MATCH_TOP_K
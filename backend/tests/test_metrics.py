@@ -0,0 +1,27 @@
+"""Tests for the runtime metrics endpoint."""
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services import http_client
+from tests.conftest import client
+
+
+def test_metrics_reports_http_pool(client):
+    """Test that pool stats are exposed."""
+    response = client.get("/api/metrics")
+
+    assert response.status_code == 200
+    pool = response.json()["http_pool"]
+    for key in ["max_connections", "connections", "in_use", "idle", "waiting"]:
+        assert key in pool
+
+
+def test_http_client_owned_by_lifespan():
+    """Test that the shared client is created on startup and closed on shutdown."""
+    with TestClient(app) as lifespan_client:
+        shared = http_client.get_http_client()
+        assert not shared.is_closed
+        assert http_client.get_http_client() is shared
+        assert lifespan_client.get("/api/metrics").json()["http_pool"]["started"] is True
+
+    assert shared.is_closed
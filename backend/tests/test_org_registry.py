@@ -0,0 +1,113 @@
+"""Tests for the hot-reloaded organization registry."""
+import asyncio
+import json
+import os
+import pytest
+from app.services.org_registry import OrganizationRegistry
+from app.services import vision_service
+from app.services.vision_service import get_matching_organizations
+
+
+def _org(org_id, categories, subcategories=(), paths=("reuse",), lat=40.7, lng=-74.0):
+    return {
+        "id": org_id, "name": org_id, "type": "ngo", "lat": lat, "lng": lng,
+        "categories": list(categories), "subcategories": list(subcategories), "accepted_paths": list(paths),
+    }
+
+
+def _write(path, organizations, mtime_offset=0):
+    path.write_text(json.dumps(organizations))
+    # Coarse filesystem timestamps: make every rewrite visibly newer
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + mtime_offset * 1_000_000_000))
+
+
+@pytest.fixture
+def data_file(tmp_path):
+    path = tmp_path / "organizations.json"
+    _write(path, [
+        _org("a", ["electronics", "Furniture"], ["laptop_computer"], ["refurbish", "donate"]),
+        _org("b", ["electronics"], [], ["recycle"]),
+        _org("no-coords", ["electronics"], lat=None),
+    ])
+    return path
+
+
+def test_inverted_index_lookups(data_file):
+    """Test category, subcategory and path lookups, case-insensitively."""
+    snapshot = OrganizationRegistry(str(data_file)).current()
+
+    assert [org["id"] for org in snapshot.for_category("electronics")] == ["a", "b"]
+    assert [org["id"] for org in snapshot.for_category("FURNITURE")] == ["a"]
+    assert [org["id"] for org in snapshot.for_subcategory("laptop_computer")] == ["a"]
+    assert [org["id"] for org in snapshot.for_path("recycle")] == ["b"]
+    assert snapshot.for_category("textiles") == ()
+    assert len(snapshot.geo) == 2
+
+
+def test_reload_swaps_in_new_snapshot(data_file):
+    """Test that a changed file is picked up while old readers keep a consistent view."""
+    registry = OrganizationRegistry(str(data_file))
+    before = registry.current()
+
+    assert registry.reload_if_changed() is False
+    _write(data_file, [_org("c", ["textiles"])], mtime_offset=1)
+    assert registry.reload_if_changed() is True
+
+    after = registry.current()
+    assert [org["id"] for org in after.for_category("textiles")] == ["c"]
+    assert after.for_category("electronics") == ()
+    assert [org["id"] for org in before.for_category("electronics")] == ["a", "b"]
+    assert registry.stats["reloads"] == 1
+
+
+def test_invalid_file_keeps_previous_registry(data_file):
+    """Test that a half-written or malformed file never replaces a good registry."""
+    registry = OrganizationRegistry(str(data_file))
+    registry.current()
+
+    data_file.write_text('[{"id": "broken"')
+    os.utime(data_file, ns=(0, data_file.stat().st_mtime_ns + 2_000_000_000))
+
+    assert registry.reload_if_changed() is False
+    assert registry.reload_if_changed() is False
+    assert [org["id"] for org in registry.current().for_category("electronics")] == ["a", "b"]
+    assert registry.stats["reload_errors"] == 1
+
+
+@pytest.mark.asyncio
+async def test_watcher_reloads_in_background(data_file):
+    """Test the polling watcher started with the app."""
+    registry = OrganizationRegistry(str(data_file), reload_seconds=0.02)
+    await registry.start()
+    try:
+        _write(data_file, [_org("d", ["plastics"])], mtime_offset=1)
+        for _ in range(100):
+            if registry.current().for_category("plastics"):
+                break
+            await asyncio.sleep(0.02)
+    finally:
+        await registry.stop()
+
+    assert [org["id"] for org in registry.current().for_category("plastics")] == ["d"]
+
+
+def test_matching_organizations_from_registry():
+    """Test vision matches: specialists first, unknown categories fall back to general reuse."""
+    laptops = get_matching_organizations("electronics", "laptop_computer", ["refurbish"])
+    unknown = get_matching_organizations("not_a_category")
+
+    assert len(laptops) == 3
+    assert all(0.0 <= org["match_score"] <= 1.0 for org in laptops)
+    assert "ngo-011" in [org["id"] for org in unknown]
+
+
+def test_matching_organizations_rank_rows_without_distance(data_file, monkeypatch):
+    """Test that specialists lead, scores come from the precomputed columns and no distance is invented."""
+    monkeypatch.setattr(vision_service, "organization_registry", OrganizationRegistry(str(data_file)))
+
+    matches = get_matching_organizations("electronics", "laptop_computer", ["recycle"])
+
+    assert [org["id"] for org in matches] == ["a", "b"]
+    assert all("distance_km" not in org for org in matches)
+    assert get_matching_organizations("textiles") == []
@@ -0,0 +1,89 @@
+"""Tests for the partner API fan-out."""
+import time
+import pytest
+from app.config import settings
+from app.services import http_client
+from app.services.partner_client import query_partners
+from app.services.agent_service import orchestrate_trade_negotiation
+from tests.partner_stub import stub_client, stub_url
+
+
+@pytest.mark.asyncio
+async def test_query_partners_collects_matches_concurrently():
+    """Test that partners are queried in parallel, not one after another."""
+    partners = [stub_url("steady"), stub_url("steady"), stub_url("steady"), stub_url("fast")]
+
+    start = time.perf_counter()
+    async with stub_client() as client:
+        result = await query_partners("item-1", partners=partners, client=client)
+    elapsed = time.perf_counter() - start
+
+    assert len(result.matches) == 4
+    assert result.unavailable == []
+    assert elapsed < 0.15  # Serial would be at least 0.15s
+
+
+@pytest.mark.asyncio
+async def test_query_partners_reports_slow_and_failing_partners():
+    """Test per-partner timeouts and failures without losing the others' matches."""
+    partners = [stub_url("fast"), stub_url("slow"), stub_url("broken")]
+
+    start = time.perf_counter()
+    async with stub_client() as client:
+        result = await query_partners(
+            "item-1", partners=partners, client=client, timeout_seconds=0.2, deadline_seconds=1.0
+        )
+
+    assert time.perf_counter() - start < 0.5
+    assert [m["organization_id"] for m in result.matches] == ["fast-001"]
+    assert result.timed_out == ["partners.test/slow"]
+    assert result.failed == ["partners.test/broken"]
+
+
+@pytest.mark.asyncio
+async def test_query_partners_global_deadline_cuts_off_fan_out():
+    """Test that the global deadline wins over a longer per-partner timeout."""
+    async with stub_client() as client:
+        result = await query_partners(
+            "item-1", partners=[stub_url("fast"), stub_url("slow")], client=client,
+            timeout_seconds=10, deadline_seconds=0.2
+        )
+
+    assert len(result.matches) == 1
+    assert result.timed_out == ["partners.test/slow"]
+
+
+@pytest.mark.asyncio
+async def test_trade_negotiation_reports_unavailable_partners(monkeypatch):
+    """Test the graph path with real partner fan-out enabled."""
+    monkeypatch.setattr(settings, "OPENROUTER_API_KEY", "test-key")
+    monkeypatch.setattr(settings, "PARTNER_QUERY_ENABLED", True)
+    monkeypatch.setattr(settings, "MOCK_NGO_API_URL", stub_url("fast"))
+    monkeypatch.setattr(settings, "MOCK_RECYCLING_API_URL", stub_url("broken"))
+    monkeypatch.setattr(settings, "PARTNER_API_URLS", [stub_url("slow")])
+    monkeypatch.setattr(settings, "PARTNER_TIMEOUT_SECONDS", 0.2)
+
+    async with stub_client() as client:
+        monkeypatch.setattr(http_client, "_client", client)
+        result = await orchestrate_trade_negotiation(item_id="item-1", user_id="user-1")
+
+    assert result["status"] == "matched"
+    assert result["best_match"]["organization_id"] == "fast-001"
+    assert sorted(result["unavailable_partners"]) == ["partners.test/broken", "partners.test/slow"]
+
+
+@pytest.mark.asyncio
+async def test_trade_negotiation_without_matches_stops_early(monkeypatch):
+    """Test that the graph ends after evaluation when no partner answers."""
+    monkeypatch.setattr(settings, "OPENROUTER_API_KEY", "test-key")
+    monkeypatch.setattr(settings, "PARTNER_QUERY_ENABLED", True)
+    monkeypatch.setattr(settings, "MOCK_NGO_API_URL", stub_url("broken"))
+    monkeypatch.setattr(settings, "MOCK_RECYCLING_API_URL", "")
+
+    async with stub_client() as client:
+        monkeypatch.setattr(http_client, "_client", client)
+        result = await orchestrate_trade_negotiation(item_id="item-1", user_id="user-1")
+
+    assert result["status"] == "failed"
+    assert result["best_match"] is None
+    assert [step["action"] for step in result["negotiation_steps"]] == ["initialize", "query_apis", "evaluate"]
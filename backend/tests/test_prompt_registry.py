@@ -0,0 +1,46 @@
+"""Tests for the versioned prompt registry."""
+import pytest
+from app.services.prompt_registry import PromptRegistry
+
+
+@pytest.fixture
+def prompt_dir(tmp_path):
+    (tmp_path / "greeting.v1.txt").write_text("Hello.\n", encoding="utf-8")
+    (tmp_path / "greeting.v2.txt").write_text("Hello there.\n", encoding="utf-8")
+    (tmp_path / "notes.md").write_text("not a prompt", encoding="utf-8")
+    return tmp_path
+
+
+def test_latest_version_is_selected_by_default(prompt_dir):
+    """Test that the highest version wins and the file's trailing newline is dropped."""
+    prompt = PromptRegistry(str(prompt_dir)).get("greeting")
+    
+    assert prompt.id == "greeting.v2"
+    assert prompt.text == "Hello there."
+
+
+def test_pinned_version_is_selected(prompt_dir):
+    """Test that a pin rolls a prompt back and changes its fingerprint."""
+    latest = PromptRegistry(str(prompt_dir))
+    pinned = PromptRegistry(str(prompt_dir), pins={"greeting": 1})
+    
+    assert pinned.get("greeting").text == "Hello."
+    assert pinned.fingerprint("greeting") != latest.fingerprint("greeting")
+    assert pinned.get_stats()["available"] == {"greeting": [1, 2]}
+
+
+def test_missing_pin_or_prompt_raises(prompt_dir):
+    """Test that a pin to an absent version fails the load and unknown names raise KeyError."""
+    with pytest.raises(ValueError, match="pinned to v3"):
+        PromptRegistry(str(prompt_dir), pins={"greeting": 3}).load()
+    with pytest.raises(KeyError):
+        PromptRegistry(str(prompt_dir)).get("farewell")
+
+
+def test_files_are_read_once(prompt_dir):
+    """Test that edits on disk are not picked up until the next load."""
+    registry = PromptRegistry(str(prompt_dir))
+    registry.load()
+    (prompt_dir / "greeting.v2.txt").write_text("Changed.\n", encoding="utf-8")
+    
+    assert registry.get("greeting").text == "Hello there."
@@ -0,0 +1,178 @@
+"""Tests for the sliding-window rate limiter and its backends."""
+import asyncio
+import time
+import pytest
+from app.middleware.rate_limit import RateLimiter
+from app.middleware.rate_limit_backends import MemoryBackend, RateLimitBackend, RedisBackend, SQLiteBackend
+from tests.redis_stub import RedisStub
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    """A backend whose take() accepts an explicit clock."""
+    if request.param == "memory":
+        return MemoryBackend()
+    return SQLiteBackend(str(tmp_path / "rate_limit.db"))
+
+
+def test_allows_up_to_limit_then_rejects(backend):
+    """Test that the limit applies within one window."""
+    results = [backend.take("client", 3, 60, now=600.0 + i) for i in range(4)]
+    
+    assert results == [(True, 2), (True, 1), (True, 0), (False, 0)]
+
+
+def test_rejected_requests_are_not_counted(backend):
+    """Test that hammering while limited does not extend the penalty."""
+    for _ in range(10):
+        backend.take("client", 2, 60, now=600.0)
+    
+    # Two windows later nothing from the burst is left
+    assert backend.take("client", 2, 60, now=720.0) == (True, 1)
+
+
+def test_previous_window_is_weighted_by_overlap(backend):
+    """Test that the previous window's count decays as the sliding window moves on."""
+    for _ in range(10):
+        backend.take("client", 10, 60, now=610.0)
+    
+    # A quarter of the way into the next window, 7.5 of the 10 still count
+    allowed = [backend.take("client", 10, 60, now=675.0)[0] for _ in range(3)]
+    assert allowed == [True, True, True]
+    assert backend.take("client", 10, 60, now=675.0) == (False, 0)
+
+
+def test_cost_is_charged_only_if_it_fits(backend):
+    """Test that a request costing several units is all or nothing."""
+    assert backend.take("client", 5, 60, now=600.0, cost=3) == (True, 2)
+    assert backend.take("client", 5, 60, now=600.0, cost=3) == (False, 0)
+    assert backend.take("client", 5, 60, now=600.0, cost=2) == (True, 0)
+
+
+def test_clients_are_limited_independently(backend):
+    """Test that one client's usage does not affect another's."""
+    assert backend.take("a", 1, 60, now=600.0)[0] is True
+    assert backend.take("a", 1, 60, now=600.0)[0] is False
+    assert backend.take("b", 1, 60, now=600.0)[0] is True
+
+
+def test_idle_clients_are_evicted():
+    """Test that in-memory state for clients idle two windows is dropped."""
+    backend = MemoryBackend()
+    for i in range(1000):
+        backend.take(f"client-{i}", 5, 60, now=600.0)
+    assert backend.clients() == 1000
+    
+    backend.take("active", 5, 60, now=660.0)
+    assert backend.clients() == 1001
+    
+    backend.take("active", 5, 60, now=720.0)
+    assert backend.clients() == 1
+
+
+def test_sqlite_counts_are_shared_between_workers(tmp_path):
+    """Test that two processes' backends on one file enforce a single limit."""
+    path = str(tmp_path / "rate_limit.db")
+    worker_a, worker_b = SQLiteBackend(path), SQLiteBackend(path)
+    
+    results = [(worker_a if i % 2 else worker_b).take("client", 4, 60, now=600.0) for i in range(6)]
+    
+    assert [allowed for allowed, _ in results] == [True] * 4 + [False] * 2
+
+
+def test_sqlite_sweeps_old_windows(tmp_path):
+    """Test that rows older than the previous window are deleted."""
+    backend = SQLiteBackend(str(tmp_path / "rate_limit.db"))
+    for i in range(50):
+        backend.take(f"client-{i}", 5, 60, now=600.0)
+    
+    backend.take("active", 5, 60, now=720.0)
+    
+    assert backend._connection().execute("SELECT COUNT(*) FROM rate_counts").fetchone()[0] == 1
+
+
+@pytest.mark.asyncio
+async def test_redis_backend_against_stand_in():
+    """Test the Redis protocol backend, including that rejected requests are taken back."""
+    async with RedisStub() as redis_stub:
+        backend = RedisBackend(redis_stub.url)
+        results = [await backend.hit("client", 3, 60) for _ in range(5)]
+        await backend.close()
+    
+    assert [allowed for allowed, _ in results] == [True, True, True, False, False]
+    assert [remaining for _, remaining in results[:3]] == [2, 1, 0]
+    assert list(redis_stub.data.values()) == [3]
+    assert "PEXPIRE" in redis_stub.commands
+
+
+@pytest.mark.asyncio
+async def test_redis_workers_share_counts():
+    """Test that separate connections (workers) see one another's requests."""
+    async with RedisStub() as redis_stub:
+        worker_a, worker_b = RedisBackend(redis_stub.url), RedisBackend(redis_stub.url)
+        results = [await (worker_a if i % 2 else worker_b).hit("client", 2, 60) for i in range(4)]
+        await worker_a.close()
+        await worker_b.close()
+    
+    assert [allowed for allowed, _ in results] == [True, True, False, False]
+
+
+@pytest.mark.asyncio
+async def test_stalled_redis_fails_open_within_timeout():
+    """Test that a server that never answers delays each request by at most the timeout, queued ones included."""
+    async with RedisStub(reply_delay=30) as redis_stub:
+        limiter = RateLimiter(requests=5, period_seconds=60, backend=RedisBackend(redis_stub.url, timeout_seconds=0.1))
+        start = time.perf_counter()
+        results = await asyncio.gather(*(limiter.is_allowed(f"client-{i}") for i in range(5)))
+        elapsed = time.perf_counter() - start
+        await limiter.close()
+    
+    assert results == [(True, 5)] * 5
+    assert elapsed < 1.0
+
+
+@pytest.mark.asyncio
+async def test_timed_out_replies_are_not_read_by_the_next_call():
+    """Test that a timed-out round trip drops its connection instead of leaving replies behind."""
+    async with RedisStub(reply_delay=0.2) as redis_stub:
+        backend = RedisBackend(redis_stub.url, timeout_seconds=0.1)
+        with pytest.raises(asyncio.TimeoutError):
+            await backend.hit("slow", 3, 60)
+        await asyncio.sleep(0.3)  # the late replies reach the old connection
+        redis_stub.reply_delay = 0
+        allowed, remaining = await backend.hit("fresh", 3, 60)
+        await backend.close()
+    
+    assert (allowed, remaining) == (True, 2)
+
+
+@pytest.mark.asyncio
+async def test_route_limits_have_their_own_quota():
+    """Test that a per-route quota is smaller and counted apart from the default one."""
+    limiter = RateLimiter(requests=5, period_seconds=60, route_limits={"/api/analyze-item": 1})
+    
+    assert (await limiter.is_allowed("client", "/api/analyze-item"))[0] is True
+    assert (await limiter.is_allowed("client", "/api/analyze-item"))[0] is False
+    assert await limiter.is_allowed("client", "/api/impact-stats") == (True, 4)
+    assert limiter.limit_for("/api/analyze-item") == 1
+    assert limiter.limit_for("/api/impact-stats") == 5
+
+
+@pytest.mark.asyncio
+async def test_backend_failure_allows_request():
+    """Test that an unreachable backend fails open."""
+    class DownBackend(RateLimitBackend):
+        async def hit(self, key, limit, period_seconds):
+            raise ConnectionRefusedError("backend down")
+    
+    limiter = RateLimiter(requests=5, period_seconds=60, backend=DownBackend())
+    
+    assert await limiter.is_allowed("client") == (True, 5)
+
+
+@pytest.mark.asyncio
+async def test_zero_period_disables_limiting():
+    """Test that a non-positive period turns the limiter off."""
+    limiter = RateLimiter(requests=1, period_seconds=0)
+    
+    assert all([(await limiter.is_allowed("client"))[0] for _ in range(5)])
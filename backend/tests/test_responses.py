@@ -0,0 +1,43 @@
+"""Tests for the model-to-bytes JSON response."""
+import json
+from typing import Optional
+from enum import Enum
+from pydantic import BaseModel
+from app.responses import ModelResponse, dump_json
+
+
+class Status(str, Enum):
+    OK = "ok"
+
+
+class Inner(BaseModel):
+    name: str
+    score: float
+
+
+class Outer(BaseModel):
+    status: Status
+    items: list[Inner]
+    note: Optional[str] = None
+
+
+def test_model_response_matches_model_dump_json():
+    """Test that the body is the model's own JSON encoding."""
+    model = Outer(status=Status.OK, items=[Inner(name="Bronx Reuse Hub", score=0.9)])
+    
+    response = ModelResponse(model, status_code=201, headers={"X-Cache": "MISS"})
+    
+    assert response.body == model.model_dump_json().encode("utf-8")
+    assert response.status_code == 201
+    assert response.headers["content-type"] == "application/json"
+    assert response.headers["x-cache"] == "MISS"
+
+
+def test_dump_json_handles_models_inside_plain_data():
+    """Test that dicts and lists holding models serialize in the same pass."""
+    data = {"activity": Inner(name="café", score=1.0), "deltas": [1, 2.5, None]}
+    
+    encoded = dump_json(data)
+    
+    assert json.loads(encoded) == {"activity": {"name": "café", "score": 1.0}, "deltas": [1, 2.5, None]}
+    assert "café".encode("utf-8") in encoded
@@ -0,0 +1,62 @@
+"""Tests for the vision result cache."""
+import pytest
+from app.services.result_cache import ResultCache, make_cache_key
+
+
+def test_cache_key_depends_on_model_and_prompt_version():
+    """Test that changing the model or prompt version changes the key."""
+    base = make_cache_key("digest", "model-a", "v1")
+    assert base == make_cache_key("digest", "model-a", "v1")
+    assert base != make_cache_key("digest", "model-b", "v1")
+    assert base != make_cache_key("digest", "model-a", "v2")
+
+
+@pytest.mark.asyncio
+async def test_memory_tier_evicts_least_recently_used():
+    """Test size-based LRU eviction in the memory tier."""
+    cache = ResultCache(max_entries=2)
+    await cache.set("a", {"v": 1})
+    await cache.set("b", {"v": 2})
+    assert await cache.get("a") == {"v": 1}
+
+    await cache.set("c", {"v": 3})
+
+    assert await cache.get("b") is None
+    assert await cache.get("a") == {"v": 1}
+    assert cache.get_stats()["evictions"] == 1
+
+
+@pytest.mark.asyncio
+async def test_entries_expire_after_ttl():
+    """Test that expired entries are treated as misses."""
+    cache = ResultCache(ttl_seconds=-1)
+    await cache.set("a", {"v": 1})
+
+    assert await cache.get("a") is None
+    assert cache.get_stats()["expirations"] == 1
+
+
+@pytest.mark.asyncio
+async def test_disk_tier_survives_restart(tmp_path):
+    """Test that the SQLite tier serves entries to a fresh cache instance."""
+    path = str(tmp_path / "cache.db")
+    first = ResultCache(disk_path=path)
+    await first.set("a", {"v": 1})
+    first.close()
+
+    second = ResultCache(disk_path=path)
+    assert await second.get("a") == {"v": 1}
+    assert second.get_stats()["disk_hits"] == 1
+    second.close()
+
+
+@pytest.mark.asyncio
+async def test_disk_tier_evicts_over_capacity(tmp_path):
+    """Test size-based eviction in the disk tier."""
+    cache = ResultCache(max_entries=1, disk_path=str(tmp_path / "cache.db"), disk_max_entries=2)
+    for key in ["a", "b", "c"]:
+        await cache.set(key, {"k": key})
+
+    assert await cache.get("a") is None
+    assert await cache.get("c") == {"k": "c"}
+    cache.close()
@@ -1,4 +1,5 @@
 """Tests for the trade orchestration endpoint."""
+import json
 import pytest
 from tests.conftest import client
 
@@ -40,6 +41,18 @@ def test_orchestrate_trade_with_preferred_path(client):
     assert data["success"] is True
 
 
+@pytest.mark.parametrize("location", [{"lat": "40.7", "lng": "-74.0"}, {"lat": None, "lng": None}])
+def test_orchestrate_trade_with_loose_location(client, location):
+    """Test that string or null coordinates do not fail the trade (they only affect the impact feed)."""
+    response = client.post(
+        "/api/orchestrate-trade",
+        json={"item_id": "test-item-123", "user_id": "test-user-456", "location": location}
+    )
+    
+    assert response.status_code == 200
+    assert response.json()["success"] is True
+
+
 def test_orchestrate_trade_with_location(client):
     """Test trade orchestration with location."""
     response = client.post(
@@ -94,3 +107,24 @@ def test_orchestrate_trade_negotiation_steps(client):
         assert "party" in step
         assert "details" in step
         assert "timestamp" in step
+
+
+def test_orchestrate_trade_stream(client):
+    """Test that stream=true returns NDJSON steps followed by the full response."""
+    response = client.post(
+        "/api/orchestrate-trade?stream=true",
+        json={
+            "item_id": "test-item-123",
+            "user_id": "test-user-456"
+        }
+    )
+    
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["type"] for line in lines[:-1]] == ["step"] * (len(lines) - 1)
+    assert lines[-1]["type"] == "result"
+    result = lines[-1]["result"]
+    assert result["success"] is True
+    assert result["status"] == "matched"
+    assert [line["step"] for line in lines[:-1]] == result["negotiation_steps"]
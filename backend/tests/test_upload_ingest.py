@@ -0,0 +1,69 @@
+"""Tests for streaming upload ingestion."""
+import asyncio
+import base64
+import json
+from io import BytesIO
+import pytest
+from app.services.upload_ingest import sniff_image_type, encode_base64
+from app.services.vision_service import _stream_json_body, IMAGE_URL_PLACEHOLDER
+
+
+@pytest.mark.parametrize("head,expected", [
+    (b"\xff\xd8\xff\xe0\x00\x10JFIF", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n\x00\x00", "image/png"),
+    (b"GIF89a\x01\x00", "image/gif"),
+    (b"RIFF\x00\x00\x00\x00WEBPVP8 ", "image/webp"),
+    (b"\x00\x00\x00\x18ftypheic", "image/heic"),
+    (b"%PDF-1.7", None),
+    (b"not an image", None),
+])
+def test_sniff_image_type(head, expected):
+    """Test detection of image formats from magic bytes."""
+    assert sniff_image_type(head) == expected
+
+
+def test_encode_base64_matches_one_shot_encoding():
+    """Test that chunked encoding produces the same string."""
+    data = bytes(range(256)) * 41
+    assert encode_base64(BytesIO(data), chunk_size=1000) == base64.b64encode(data).decode("ascii")
+
+
+def test_stream_json_body_matches_serialized_payload():
+    """Test that the streamed request body is the JSON of the full payload."""
+    payload = {"model": "m", "messages": [{"image_url": {"url": IMAGE_URL_PLACEHOLDER}}], "note": "é"}
+    image_base64 = base64.b64encode(b"x" * 200000).decode("ascii")
+
+    length, body = _stream_json_body(payload, "data:image/webp;base64,", image_base64)
+
+    async def collect():
+        return b"".join([chunk async for chunk in body])
+
+    raw = asyncio.run(collect())
+    assert len(raw) == length
+    assert json.loads(raw)["messages"][0]["image_url"]["url"] == "data:image/webp;base64," + image_base64
+
+
+def test_analyze_item_rejects_oversized_upload(client, mock_vision, monkeypatch):
+    """Test that uploads over the limit are rejected with 413."""
+    monkeypatch.setattr("app.config.settings.MAX_UPLOAD_BYTES", 1024)
+    image = b"\x89PNG\r\n\x1a\n" + b"\x00" * 4096
+
+    response = client.post("/api/analyze-item", files={"file": ("big.png", BytesIO(image), "image/png")})
+
+    assert response.status_code == 413
+    assert mock_vision == []
+
+
+def test_analyze_item_trusts_magic_bytes_over_content_type(client, mock_vision, make_image_bytes):
+    """Test that the sniffed type wins over the client-supplied one."""
+    response = client.post(
+        "/api/analyze-item",
+        files={"file": ("photo", BytesIO(make_image_bytes()), "application/octet-stream")}
+    )
+    assert response.status_code == 200
+
+    disguised = client.post(
+        "/api/analyze-item",
+        files={"file": ("fake.png", BytesIO(b"#!/bin/sh\necho hi"), "image/png")}
+    )
+    assert disguised.status_code == 400
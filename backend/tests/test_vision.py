@@ -67,3 +67,72 @@ def test_analyze_item_returns_expected_fields(client):
     assert "recommended_paths" in analysis
     assert "matching_organizations" in analysis
     assert "environmental_impact" in analysis
+
+
+def test_analyze_item_cache_hit_skips_upstream(client, mock_vision):
+    """Test that re-uploading the same bytes is served from the result cache."""
+    image = b"\x89PNG\r\n\x1a\n" + b"same-photo" * 10
+
+    first = client.post("/api/analyze-item", files={"file": ("a.png", BytesIO(image), "image/png")})
+    second = client.post("/api/analyze-item", files={"file": ("b.png", BytesIO(image), "image/png")})
+
+    assert first.status_code == 200
+    assert second.status_code == 200
+    assert first.headers["X-Cache"] == "MISS"
+    assert second.headers["X-Cache"] == "HIT"
+    assert len(mock_vision) == 1
+    assert first.json()["analysis"]["item_id"] != second.json()["analysis"]["item_id"]
+
+
+def test_analyze_item_cache_miss_for_different_bytes(client, mock_vision):
+    """Test that different images are analyzed separately."""
+    for payload in [b"\x89PNG\r\n\x1a\nfirst", b"\x89PNG\r\n\x1a\nsecond"]:
+        response = client.post("/api/analyze-item", files={"file": ("a.png", BytesIO(payload), "image/png")})
+        assert response.headers["X-Cache"] == "MISS"
+
+    assert len(mock_vision) == 2
+
+
+def test_analyze_item_near_duplicate_reuses_analysis(client, mock_vision, make_image_bytes):
+    """Test that a resized, re-encoded copy of a known photo skips the upstream call."""
+    original = make_image_bytes(size=(256, 192), fmt="PNG")
+    reencoded = make_image_bytes(size=(128, 96), fmt="JPEG")
+
+    first = client.post("/api/analyze-item", files={"file": ("a.png", BytesIO(original), "image/png")})
+    second = client.post("/api/analyze-item", files={"file": ("b.jpg", BytesIO(reencoded), "image/jpeg")})
+
+    assert first.headers["X-Cache"] == "MISS"
+    assert second.headers["X-Cache"] == "NEAR"
+    assert int(second.headers["X-Near-Duplicate-Distance"]) <= 3
+    assert len(mock_vision) == 1
+
+
+def test_analyze_item_fresh_bypasses_caches(client, mock_vision, make_image_bytes):
+    """Test that fresh=true re-analyzes exact and near-duplicate re-uploads."""
+    original = make_image_bytes(size=(256, 192), fmt="PNG")
+    reencoded = make_image_bytes(size=(128, 96), fmt="JPEG")
+
+    client.post("/api/analyze-item", files={"file": ("a.png", BytesIO(original), "image/png")})
+    exact = client.post("/api/analyze-item?fresh=true", files={"file": ("a.png", BytesIO(original), "image/png")})
+    near = client.post("/api/analyze-item?fresh=true", files={"file": ("b.jpg", BytesIO(reencoded), "image/jpeg")})
+
+    assert exact.headers["X-Cache"] == "MISS"
+    assert near.headers["X-Cache"] == "MISS"
+    assert len(mock_vision) == 3
+
+
+def test_analyze_item_reports_preprocessed_byte_counts(client, mock_vision):
+    """Test that uploads are re-encoded before being sent to the model."""
+    import os
+    from PIL import Image
+
+    buffer = BytesIO()
+    Image.frombytes("RGB", (640, 480), os.urandom(640 * 480 * 3)).save(buffer, format="PNG")
+    image = buffer.getvalue()
+
+    response = client.post("/api/analyze-item", files={"file": ("big.png", BytesIO(image), "image/png")})
+
+    assert response.status_code == 200
+    assert int(response.headers["X-Image-Bytes-Original"]) == len(image)
+    assert int(response.headers["X-Image-Bytes-Sent"]) < len(image)
+    assert mock_vision == ["image/webp"]
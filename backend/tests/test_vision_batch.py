@@ -0,0 +1,112 @@
+"""Tests for the batch analysis endpoint."""
+import asyncio
+import json
+from io import BytesIO
+import pytest
+from app.middleware.rate_limit import rate_limiter
+from app.routers import vision
+from app.services.vision_service import _get_mock_analysis
+from tests.conftest import client
+
+
+def _batch(make_image_bytes, count):
+    return [
+        ("files", (f"item-{i}.png", BytesIO(make_image_bytes(seed=i * 40)), "image/png"))
+        for i in range(count)
+    ]
+
+
+def test_analyze_items_returns_per_item_results(client, mock_vision, make_image_bytes):
+    """Test that a bad item is reported without failing the batch."""
+    files = _batch(make_image_bytes, 2) + [("files", ("notes.txt", BytesIO(b"not an image"), "text/plain"))]
+
+    response = client.post("/api/analyze-items", files=files)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total"] == 3
+    assert data["succeeded"] == 2
+    assert data["failed"] == 1
+    bad = data["results"][2]
+    assert bad["success"] is False
+    assert bad["status_code"] == 400
+    assert bad["filename"] == "notes.txt"
+    assert data["results"][0]["analysis"]["category"] == "electronics"
+
+
+def test_analyze_items_streams_ndjson(client, mock_vision, make_image_bytes):
+    """Test that stream=true emits one JSON line per item."""
+    response = client.post("/api/analyze-items?stream=true", files=_batch(make_image_bytes, 3))
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines() if line]
+    assert sorted(line["index"] for line in lines) == [0, 1, 2]
+    assert all(line["success"] for line in lines)
+
+
+def test_analyze_items_stream_bounds_each_part(client, mock_vision, make_image_bytes, monkeypatch):
+    """Test that an oversized part fails on its own and is not copied in full for the stream."""
+    monkeypatch.setattr("app.config.settings.MAX_UPLOAD_BYTES", 200_000)
+    copied = []
+    copy_bounded = vision._copy_bounded
+
+    def recording_copy(source, target, limit):
+        copy_bounded(source, target, limit)
+        copied.append(target.tell())
+
+    monkeypatch.setattr(vision, "_copy_bounded", recording_copy)
+    oversized = b"\x89PNG\r\n\x1a\n" + bytes(500_000)
+    files = _batch(make_image_bytes, 1) + [("files", ("huge.png", BytesIO(oversized), "image/png"))]
+
+    response = client.post("/api/analyze-items?stream=true", files=files)
+
+    lines = {line["index"]: line for line in map(json.loads, response.text.splitlines())}
+    assert lines[0]["success"] is True
+    assert lines[1]["status_code"] == 413
+    assert max(copied) == 200_001
+
+
+def test_analyze_items_bounds_concurrency(client, monkeypatch, make_image_bytes):
+    """Test that items run in parallel but never above the configured cap."""
+    monkeypatch.setattr("app.config.settings.VISION_BATCH_CONCURRENCY", 2)
+    monkeypatch.setattr("app.config.settings.VISION_CACHE_ENABLED", False)
+    monkeypatch.setattr("app.config.settings.PHASH_ENABLED", False)
+    in_flight = {"now": 0, "peak": 0}
+
+    async def slow_analyze(image_base64, content_type):
+        in_flight["now"] += 1
+        in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+        await asyncio.sleep(0.05)
+        in_flight["now"] -= 1
+        return _get_mock_analysis()
+
+    monkeypatch.setattr(vision, "analyze_item_image", slow_analyze)
+
+    response = client.post("/api/analyze-items", files=_batch(make_image_bytes, 5))
+
+    assert response.json()["succeeded"] == 5
+    assert in_flight["peak"] == 2
+
+
+def test_analyze_items_rejects_oversized_batch(client, monkeypatch, make_image_bytes):
+    """Test the maximum batch size."""
+    monkeypatch.setattr("app.config.settings.VISION_BATCH_MAX_ITEMS", 2)
+
+    response = client.post("/api/analyze-items", files=_batch(make_image_bytes, 3))
+
+    assert response.status_code == 413
+
+
+def test_analyze_items_quota_counts_images(client, mock_vision, make_image_bytes, monkeypatch):
+    """Test that each image in a batch uses one unit of the route's quota."""
+    monkeypatch.setitem(rate_limiter.route_limits, "/api/analyze-items", 3)
+
+    first = client.post("/api/analyze-items", files=_batch(make_image_bytes, 2))
+    second = client.post("/api/analyze-items", files=_batch(make_image_bytes, 2))
+
+    assert first.status_code == 200
+    assert first.headers["x-ratelimit-remaining"] == "1"
+    assert second.status_code == 429
+    assert second.headers["x-ratelimit-remaining"] == "0"
+    assert len(mock_vision) == 2
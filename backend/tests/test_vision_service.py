@@ -0,0 +1,191 @@
+"""Tests for the streamed vision analysis call."""
+import json
+import pytest
+from app.config import settings
+from app.services import vision_service
+from app.services.llm_usage import UsageLog
+from app.services.prompt_registry import prompt_registry
+from tests.openrouter_stub import GOOD_ANALYSIS, OpenRouterStub
+
+
+@pytest.fixture
+def openrouter(monkeypatch):
+    """Route vision_service's HTTP calls to a scripted stub."""
+    monkeypatch.setattr(settings, "OPENROUTER_API_KEY", "test-key")
+    monkeypatch.setattr(settings, "VISION_MAX_ATTEMPTS", 2)
+
+    def install(completions, **options):
+        stub = OpenRouterStub(completions, **options)
+        client = stub.client()
+        monkeypatch.setattr(vision_service, "get_http_client", lambda: client)
+        return stub
+
+    return install
+
+
+@pytest.mark.asyncio
+async def test_stops_reading_once_analysis_is_complete(openrouter):
+    """Test that the stream is abandoned at the object's closing brace."""
+    text = "```json\n" + json.dumps(GOOD_ANALYSIS) + "\n```"
+    stub = openrouter([text], trailer_chunks=200)
+    
+    result = await vision_service.analyze_item_image("aGVsbG8=", "image/png")
+    
+    assert result["category"] == "electronics"
+    assert result["circular_value"]["eco_credits"] == 45
+    assert "item_id" in result
+    assert result["matching_organizations"]
+    assert stub.requests[0]["stream"] is True
+    assert stub.chunks_sent[0] < len(text) // stub.chunk_chars + 5  # none of the 200 trailing chunks
+
+
+@pytest.mark.asyncio
+async def test_off_schema_output_is_aborted_and_retried(openrouter):
+    """Test that a bad category stops the first stream early and the retry succeeds."""
+    bad = json.dumps({**GOOD_ANALYSIS, "category": "spaceship"})
+    stub = openrouter([bad, json.dumps(GOOD_ANALYSIS)], chunk_chars=8)
+    
+    result = await vision_service.analyze_item_image("aGVsbG8=", "image/png")
+    
+    assert result["category"] == "electronics"
+    assert len(stub.requests) == 2
+    assert stub.chunks_sent[0] < len(bad) // 8 // 2  # gave up right after the category field
+
+
+@pytest.mark.asyncio
+async def test_truncated_output_fails_after_all_attempts(openrouter):
+    """Test that a completion cut off mid-object is retried, then reported."""
+    truncated = json.dumps(GOOD_ANALYSIS)[:120]
+    stub = openrouter([truncated])
+    
+    with pytest.raises(Exception, match="Failed to parse AI response as JSON"):
+        await vision_service.analyze_item_image("aGVsbG8=", "image/png")
+    
+    assert len(stub.requests) == 2
+
+
+@pytest.mark.asyncio
+async def test_non_streaming_mode_uses_the_same_parser(openrouter, monkeypatch):
+    """Test that VISION_STREAMING=false reads the full completion and parses it the same way."""
+    monkeypatch.setattr(settings, "VISION_STREAMING", False)
+    stub = openrouter(["Here is the analysis:\n" + json.dumps(GOOD_ANALYSIS) + "\nThanks!"])
+    
+    result = await vision_service.analyze_item_image("aGVsbG8=", "image/png")
+    
+    assert result["subcategory"] == "laptop_computer"
+    assert stub.requests[0]["stream"] is False
+
+
+def test_analysis_schema_is_strict_and_derived_from_the_api_model():
+    """Test that the response_format schema mirrors AnalysisResult minus server-filled fields."""
+    schema = vision_service.analysis_json_schema()
+    
+    assert set(schema["required"]) == set(vision_service.ANALYSIS_FIELD_CHECKS)
+    assert "item_id" not in schema["properties"]
+    assert "electronics" in schema["properties"]["category"]["enum"]
+    assert schema["properties"]["circular_value"]["properties"]["eco_credits"]["type"] == "integer"
+    
+    def objects(node):
+        if isinstance(node, dict):
+            if node.get("type") == "object":
+                yield node
+            for value in node.values():
+                yield from objects(value)
+    
+    assert all(node["additionalProperties"] is False for node in objects(schema))
+    assert "$ref" not in json.dumps(schema)
+
+
+@pytest.mark.asyncio
+async def test_structured_output_sends_schema_and_compact_prompt(openrouter, monkeypatch):
+    """Test that structured mode sends response_format and the short system prompt."""
+    monkeypatch.setattr(settings, "VISION_STRUCTURED_OUTPUT", True)
+    monkeypatch.setattr(vision_service, "_structured_output_unsupported", set())
+    stub = openrouter([json.dumps(GOOD_ANALYSIS)])
+    
+    result = await vision_service.analyze_item_image("aGVsbG8=", "image/png")
+    
+    payload = stub.requests[0]
+    assert result["category"] == "electronics"
+    assert payload["response_format"]["json_schema"]["strict"] is True
+    assert payload["provider"] == {"require_parameters": True}
+    compact = prompt_registry.get("vision_structured").text
+    assert payload["messages"][0]["content"] == compact
+    assert len(compact) < len(prompt_registry.get("vision_system").text) / 2
+
+
+@pytest.mark.asyncio
+async def test_structured_output_falls_back_when_provider_rejects_it(openrouter, monkeypatch):
+    """Test that a rejected response_format retries with the full prompt and is remembered."""
+    monkeypatch.setattr(settings, "VISION_STRUCTURED_OUTPUT", True)
+    monkeypatch.setattr(vision_service, "_structured_output_unsupported", set())
+    stub = openrouter([json.dumps(GOOD_ANALYSIS)], reject_response_format=True)
+    
+    await vision_service.analyze_item_image("aGVsbG8=", "image/png")
+    await vision_service.analyze_item_image("aGVsbG8=", "image/png")
+    
+    assert ["response_format" in payload for payload in stub.requests] == [True, False, False]
+    assert stub.requests[1]["messages"][0]["content"] == prompt_registry.get("vision_system").text
+
+
+@pytest.mark.asyncio
+async def test_unrelated_error_does_not_disable_structured_output(openrouter, monkeypatch):
+    """Test that a 400 about the image is an ordinary API error, not a verdict on response_format."""
+    monkeypatch.setattr(settings, "VISION_STRUCTURED_OUTPUT", True)
+    monkeypatch.setattr(vision_service, "_structured_output_unsupported", set())
+    stub = openrouter([json.dumps(GOOD_ANALYSIS)], error=(400, "Invalid image data"))
+    
+    with pytest.raises(Exception, match="OpenRouter API error \\(400\\)"):
+        await vision_service.analyze_item_image("aGVsbG8=", "image/png")
+    
+    assert len(stub.requests) == 1
+    assert vision_service._structured_output_unsupported == set()
+
+
+@pytest.mark.asyncio
+async def test_usage_is_recorded_after_the_closing_fence(openrouter, monkeypatch):
+    """Test that the stream is read past the object for the usage report, per prompt version."""
+    usage_log = UsageLog()
+    monkeypatch.setattr(vision_service, "vision_usage", usage_log)
+    usage = {"prompt_tokens": 900, "completion_tokens": 160, "prompt_tokens_details": {"cached_tokens": 768}}
+    stub = openrouter(["```json\n" + json.dumps(GOOD_ANALYSIS) + "\n```"], usage=usage)
+    
+    await vision_service.analyze_item_image("aGVsbG8=", "image/png")
+    
+    stats = usage_log.get_stats()
+    assert stub.requests[0]["usage"] == {"include": True}
+    assert stats["unreported"] == 0
+    assert stats["by_prompt"]["vision_system.v1"]["cached_tokens"] == 768
+    assert stats["by_prompt"]["vision_system.v1"]["cached_ratio"] == round(768 / 900, 3)
+    assert stats["recent"][0]["completion_tokens"] == 160
+
+
+@pytest.mark.asyncio
+async def test_commentary_after_the_object_forfeits_the_usage_report(openrouter, monkeypatch):
+    """Test that a model that keeps talking is cut off even though its usage is then unknown."""
+    usage_log = UsageLog()
+    monkeypatch.setattr(vision_service, "vision_usage", usage_log)
+    stub = openrouter([json.dumps(GOOD_ANALYSIS)], trailer_chunks=50, usage={"prompt_tokens": 900})
+    
+    await vision_service.analyze_item_image("aGVsbG8=", "image/png")
+    
+    assert stub.chunks_sent[0] < len(json.dumps(GOOD_ANALYSIS)) // stub.chunk_chars + 3
+    assert usage_log.get_stats()["unreported"] == 1
+
+
+@pytest.mark.asyncio
+async def test_cache_breakpoint_only_for_models_that_need_it(openrouter, monkeypatch):
+    """Test that the system prompt carries cache_control for Anthropic models and stays plain otherwise."""
+    stub = openrouter([json.dumps(GOOD_ANALYSIS)])
+    monkeypatch.setattr(settings, "OPENROUTER_VISION_MODEL", "anthropic/claude-3.5-sonnet")
+    await vision_service.analyze_item_image("aGVsbG8=", "image/png")
+    monkeypatch.setattr(settings, "OPENROUTER_VISION_MODEL", "openai/gpt-4o-mini")
+    await vision_service.analyze_item_image("aGVsbG8=", "image/png")
+    
+    cached, plain = (payload["messages"][0]["content"] for payload in stub.requests)
+    assert cached == [{
+        "type": "text", "text": prompt_registry.get("vision_system").text, "cache_control": {"type": "ephemeral"}
+    }]
+    assert plain == prompt_registry.get("vision_system").text
+    # The image comes after every static part of the request
+    assert stub.requests[0]["messages"][-1]["content"][-1]["type"] == "image_url"
@@ -262,8 +262,12 @@ export default function VisionPortalPage() {
                               </div>
                             </div>
                             <div className="flex items-center gap-2">
-                              <MapPin className="w-3 h-3 text-white/40" />
-                              <span className="text-white/60 text-xs">{org.distance_km} km</span>
+                              {org.distance_km != null && (
+                                <>
+                                  <MapPin className="w-3 h-3 text-white/40" />
+                                  <span className="text-white/60 text-xs">{org.distance_km} km</span>
+                                </>
+                              )}
                               <span className="text-eco-glow text-xs font-medium">{(org.match_score * 100).toFixed(0)}%</span>
                             </div>
                           </div>
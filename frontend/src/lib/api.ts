@@ -20,7 +20,7 @@ export interface AnalysisResult {
     name: string;
     type: string;
     match_score: number;
-    distance_km: number;
+    distance_km?: number;
   }>;
   environmental_impact: {
     co2_saved_kg: number;